@@ -0,0 +1,80 @@
+"""
+Benchmarks minute data ingest against the previous string-slicing parser.
+
+Usage: `python benchmarks/bench_minute_read.py [n_days]`
+"""
+
+import logging.config
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../src')))
+
+from pyfx import read
+
+
+def make_minute_csv(fpath: str, n_days: int):
+    """Writes `n_days` of synthetic minute bars in the source csv format."""
+    index = pd.date_range('2018-01-01', periods=n_days * 1440, freq='min')
+    close = 1.2 + np.random.RandomState(0).normal(
+        0, 2e-4, len(index)).cumsum()
+    pd.DataFrame({
+        'Local time': index.strftime('%d.%m.%Y %H:%M:%S.000 GMT-0500'),
+        'Open': close.round(5), 'High': close.round(5),
+        'Low': close.round(5), 'Close': close.round(5),
+        'Volume': 100,
+    }).to_csv(fpath, index=False)
+
+
+def legacy_read_minute_data(fpath: str) -> pd.DataFrame:
+    """The minute ingest path prior to fixed-width timestamp parsing."""
+    min_df = pd.read_csv(fpath)
+    min_df.drop(columns=['Volume'], inplace=True)
+    min_df.rename({"Local time": "datetime"}, inplace=True, axis='columns')
+    min_df['date'] = min_df['datetime'].str.slice(0, 10)
+    min_df['date'] = pd.to_datetime(min_df['date'], format='%d.%m.%Y')
+    min_df['datetime'] = min_df['datetime'].str.slice(0, 19)
+    min_df['datetime'] = pd.to_datetime(
+        min_df['datetime'], format="%d.%m.%Y %H:%M:%S")
+    min_df.set_index('datetime', inplace=True)
+    return min_df
+
+
+def best_of(func, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(n_days: int):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fpath = os.path.join(tmpdir, 'BENCH_Minute.csv')
+        make_minute_csv(fpath, n_days)
+        n_rows = n_days * 1440
+
+        legacy = legacy_read_minute_data(fpath)
+        fast = read._read_and_process_minute_data(fpath, 'BENCH')
+        # The legacy path also derived a `date` column, since dropped.
+        pd.testing.assert_frame_equal(legacy.drop(columns='date'), fast)
+
+        legacy_secs = best_of(lambda: legacy_read_minute_data(fpath))
+        fast_secs = best_of(
+            lambda: read._read_and_process_minute_data(fpath, 'BENCH'))
+
+    print("{:<10} {:>12} {:>14}".format('path', 'secs', 'rows/sec'))
+    for name, secs in [('legacy', legacy_secs), ('fast', fast_secs)]:
+        print("{:<10} {:>12.3f} {:>14,.0f}".format(name, secs, n_rows / secs))
+    print("speedup: {:.2f}x".format(legacy_secs / fast_secs))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 250)
@@ -0,0 +1,256 @@
+"""
+Benchmarks each stage of a currency pair's run on synthetic source data.
+
+The stages are `read_data`, building the `DataContainer` views, each
+`analytics.include_*` and `df_to_xlsx`. Each is timed (best of `--repeat`)
+and traced for peak memory, and its output is digested, summed over the
+currency pairs. Results can be stored as a baseline, and later runs compared
+against it: the run fails if a stage is slower than the baseline by more
+than `--tolerance`, or if its output differs.
+
+Usage: `python benchmarks/bench_suite.py [--pairs 2] [--years 1]
+[--save-baseline FPATH | --baseline FPATH]`
+"""
+
+import argparse
+import hashlib
+import json
+import logging.config
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../src')))
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from common.config import Config
+from ds.datacontainer import DataContainer
+from pyfx import analytics, read, write
+
+import synthetic
+
+
+APP_CONFIG_FPATH = os.path.join(os.path.dirname(__file__),
+                                '../cfg/app_cfg.yml')
+
+# Slowdowns shorter than this are taken for timing noise.
+MIN_SLOWDOWN_SECS = 0.02
+
+# The views the analytics use, built once per container.
+VIEWS = ['fix_price_df', 'daily_price_df', 'full_minute_price_df',
+         'minute_price_df', 'minute_grid']
+
+
+def bench_config(fpaths: dict, years: float, dir: str) -> Config:
+    """The app config, with the synthetic pairs and date range."""
+    with open(APP_CONFIG_FPATH) as f:
+        cfg = yaml.safe_load(f)
+    end = pd.Timestamp(synthetic.START_DATE) + \
+        pd.Timedelta(days=max(1, int(years * 365)) - 1)
+    cfg['setup']['currency_pairs'] = list(fpaths)
+    cfg['setup']['date_range'] = {
+        'start_date': synthetic.START_DATE.replace('-', '/'),
+        'end_date': end.strftime('%Y/%m/%d')}
+
+    fpath = Path(dir) / 'bench_cfg.yml'
+    with open(fpath, 'w') as f:
+        yaml.safe_dump(cfg, f)
+    return Config(fpath)
+
+
+def stages(cp_name: str, fpaths: dict, config: Config, dir: str) -> tuple:
+    """`(name, setup, func)` of each stage, where `func` takes what `setup`
+    returns and is timed alone, and the number of minute rows processed.
+    """
+    def read_data():
+        return read.read_data(fpaths, cp_name=cp_name,
+                              date_range=config.date_range)
+
+    dfs = read_data()
+
+    def container():
+        return DataContainer(dfs, cp_name, config)
+
+    def views(data):
+        for view in VIEWS:
+            getattr(data, view)
+        return data
+
+    def built():
+        return views(container())
+
+    data = built()
+    # An output shaped like `app.exec`'s, to be written.
+    parts = [analytics.include_ohlc(data),
+             analytics.include_max_pips(data, config.benchmark_times)]
+    for part in parts:
+        part.index = pd.to_datetime(part.index)
+    output = pd.concat(parts, axis=1)
+    output.index = output.index.date
+
+    return [
+        ('read_data', None, lambda _: read_data()),
+        ('datacontainer', None, lambda _: built()),
+        ('include_ohlc', built, analytics.include_ohlc),
+        ('include_max_pips', built, lambda data: analytics.include_max_pips(
+            data, config.benchmark_times)),
+        ('include_pdfx', built, lambda data: analytics.include_max_pips(
+            data, pdfx=True, cp_name=cp_name)),
+        ('include_minute_data', built, lambda data: analytics.
+            include_minute_data(data, config.minutely_data_sections)),
+        ('include_avgs', built, lambda data: analytics.include_avgs(
+            data, config.period_average_data_sections)),
+        ('include_crossovers', built, lambda data: analytics.
+            include_crossovers(data, cp_name=cp_name)),
+        ('df_to_xlsx', None, lambda _: write.df_to_xlsx(
+            output, 'bench_{}'.format(cp_name), dir=dir + '/')),
+    ], data.full_minute_price_df.shape[0]
+
+
+def measure(setup, func, repeat: int) -> tuple:
+    """Best seconds taken by `func` over `repeat` runs, its peak traced
+    memory in bytes, and its output.
+    """
+    timings = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        output = func(arg)
+        timings.append(time.perf_counter() - start)
+
+    arg = setup() if setup else None
+    tracemalloc.start()
+    func(arg)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(timings), peak, output
+
+
+def digest(output) -> str:
+    """Digest of a stage's output: a frame, a dict of frames, a
+    DataContainer's views or a written file.
+    """
+    if isinstance(output, DataContainer):
+        output = {view: getattr(output, view) for view in VIEWS[:3]}
+    if isinstance(output, dict):
+        return hashlib.sha1(''.join(
+            digest(output[k]) for k in sorted(output, key=str))
+            .encode()).hexdigest()
+    if isinstance(output, pd.DataFrame):
+        hashes = pd.util.hash_pandas_object(output, index=True).values
+        return '{:016x}'.format(int(hashes.sum()))
+    if isinstance(output, str) and output.endswith('.xlsx'):
+        # Written files differ in their timestamps; digest their cells.
+        df = pd.read_excel(output, header=None)
+        return digest(df.astype(str))
+    return hashlib.sha1(repr(output).encode()).hexdigest()
+
+
+def run(n_pairs: int, years: float, repeat: int, data_dir: str = None):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_dir = data_dir or tmpdir
+        logging.getLogger().info(f"Generating data in {data_dir}")
+        all_fpaths = synthetic.make_dataset(data_dir, n_pairs, years)
+        config = bench_config(all_fpaths, years, tmpdir)
+
+        results = OrderedDict()
+        for cp_name, fpaths in all_fpaths.items():
+            pair_stages, n_rows = stages(cp_name, fpaths, config, tmpdir)
+            for name, setup, func in pair_stages:
+                secs, peak, output = measure(setup, func, repeat)
+                res = results.setdefault(name, {
+                    'secs': 0., 'peak_mb': 0., 'rows': 0, 'digests': []})
+                res['secs'] += secs
+                res['peak_mb'] = max(res['peak_mb'], peak / 2 ** 20)
+                res['rows'] += n_rows
+                res['digests'].append(digest(output))
+
+    for res in results.values():
+        res['rows_per_sec'] = res['rows'] / res['secs']
+        res['digest'] = hashlib.sha1(
+            ''.join(res.pop('digests')).encode()).hexdigest()
+    return {'params': {'pairs': n_pairs, 'years': years},
+            'results': results}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Prints the run against the baseline. Returns `False` if a stage got
+    slower by more than `tolerance`, or its output changed.
+    """
+    if results['params'] != baseline['params']:
+        print("Baseline was taken with {}; not comparing".format(
+            baseline['params']))
+        return True
+
+    ok = True
+    print("\n{:<22} {:>10} {:>10} {:>8}  {}".format(
+        'stage', 'base secs', 'secs', 'ratio', 'output'))
+    for name, res in results['results'].items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print("{:<22} {:>10} {:>10.3f}".format(name, '-', res['secs']))
+            continue
+        ratio = res['secs'] / base['secs']
+        same = res['digest'] == base['digest']
+        slower = (ratio > 1 + tolerance
+                  and res['secs'] - base['secs'] > MIN_SLOWDOWN_SECS)
+        flag = '  SLOWER' if slower else ''
+        print("{:<22} {:>10.3f} {:>10.3f} {:>8.2f}  {}{}".format(
+            name, base['secs'], res['secs'], ratio,
+            'same' if same else 'CHANGED', flag))
+        ok = ok and same and not slower
+    return ok
+
+
+def report(results: dict):
+    print("{} pairs x {} years".format(results['params']['pairs'],
+                                      results['params']['years']))
+    print("{:<22} {:>10} {:>14} {:>10}".format(
+        'stage', 'secs', 'rows/sec', 'peak MB'))
+    for name, res in results['results'].items():
+        print("{:<22} {:>10.3f} {:>14,.0f} {:>10.1f}".format(
+            name, res['secs'], res['rows_per_sec'], res['peak_mb']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--pairs', type=int, default=2,
+                        help="number of currency pairs generated")
+    parser.add_argument('--years', type=float, default=1,
+                        help="years of data generated per currency pair")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="runs per stage; the fastest is kept")
+    parser.add_argument('--data-dir', default=None,
+                        help="keep the generated data in this directory")
+    parser.add_argument('--baseline', default=None,
+                        help="compare against the baseline in this file")
+    parser.add_argument('--save-baseline', default=None,
+                        help="store the results as a baseline in this file")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="slowdown over the baseline allowed per stage")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run(args.pairs, args.years, args.repeat, args.data_dir)
+    report(results)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmarks the streaming xlsx writer against `DataFrame.to_excel`.
+
+Usage: `python benchmarks/bench_xlsx_write.py [n_rows] [n_groups]`
+"""
+
+import logging.config
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '../src')))
+
+from pyfx import write
+
+
+def make_output_df(n_rows: int, n_groups: int) -> pd.DataFrame:
+    """A frame shaped like `app.exec`'s output: one row per day, and groups
+    of price and time columns under a two-level header.
+    """
+    rng = np.random.RandomState(0)
+    index = [date(2018, 1, 1) + timedelta(days=i) for i in range(n_rows)]
+
+    columns = {}
+    for g in range(n_groups):
+        name = '10:{:02d}:00'.format(g % 60)
+        columns[(f'{g}_{name}', 'Close')] = 1.2 + rng.rand(n_rows) / 100
+        columns[(f'{g}_{name}', 'MaxPipUp')] = rng.rand(n_rows) * 10
+        times = np.full(n_rows, np.nan, dtype=object)
+        times[rng.rand(n_rows) > 0.1] = pd.Timestamp('10:30').time()
+        columns[(f'{g}_{name}', 'TimeAtMaxPipUp')] = times
+
+    df = pd.DataFrame(columns, index=index)
+    df.columns = pd.MultiIndex.from_tuples(columns.keys())
+    return df
+
+
+def legacy_df_to_xlsx(df: pd.DataFrame, fpath: str):
+    """The xlsx output path prior to streaming."""
+    with pd.ExcelWriter(fpath, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name='sheet1')
+        writer.sheets['sheet1'].set_column(0, len(df.columns), 20)
+
+
+def stream_df_to_xlsx(df: pd.DataFrame, fpath: str):
+    with write.XlsxStreamWriter(fpath, col_width=20) as writer:
+        writer.open_sheet('sheet1', df.columns, df.index.name).append(df)
+
+
+def measure(func) -> tuple:
+    """Seconds taken by `func`, and its peak traced memory in bytes."""
+    start = time.perf_counter()
+    func()
+    secs = time.perf_counter() - start
+
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return secs, peak
+
+
+def main(n_rows: int, n_groups: int):
+    df = make_output_df(n_rows, n_groups)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        results = [
+            (name, *measure(lambda: func(df, os.path.join(tmpdir, name))))
+            for name, func in [('legacy', legacy_df_to_xlsx),
+                               ('stream', stream_df_to_xlsx)]
+        ]
+
+    print("{} rows x {} columns".format(*df.shape))
+    print("{:<10} {:>12} {:>14} {:>14}".format(
+        'path', 'secs', 'rows/sec', 'peak MB'))
+    for name, secs, peak in results:
+        print("{:<10} {:>12.3f} {:>14,.0f} {:>14.1f}".format(
+            name, secs, n_rows / secs, peak / 2 ** 20))
+    print("speedup: {:.2f}x".format(results[0][1] / results[1][1]))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+         int(sys.argv[2]) if len(sys.argv) > 2 else 30)
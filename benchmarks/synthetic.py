@@ -0,0 +1,136 @@
+"""
+Synthetic source data in the formats `pyfx.read` expects.
+
+For each currency pair, a random walk of minute bars is written as the
+`<PAIR>_Minute.csv` export, with its daily bars as the `<PAIR>_Daily.xlsx`
+workbook; a single `fix.csv` holds the daily fixes of all the pairs. Data
+covers weekdays only, with a few bars and fixes missing, as in the real
+exports.
+"""
+
+import os
+from typing import Dict
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from pyfx import read
+
+__all__ = ['PAIRS', 'make_dataset']
+
+
+# Currency pairs, in the order they are generated, and their starting price.
+PAIRS = {
+    'EURUSD': 1.2, 'USDJPY': 110., 'GBPUSD': 1.35, 'AUDUSD': 0.75,
+    'USDCAD': 1.3, 'USDCHF': 0.98, 'NZDUSD': 0.7,
+}
+
+START_DATE = '2018-01-01'
+
+# Share of minute bars and of fixes missing from the exports.
+MISSING_BARS = 0.01
+MISSING_FIXES = 0.02
+
+
+def make_dataset(dir: str, n_pairs: int, years: float,
+                 seed: int = 0) -> Dict[str, dict]:
+    """Writes the source files of `n_pairs` currency pairs over `years`.
+
+    Returns
+    -------
+    A dict mapping each currency pair to its fpaths, as `read.read_data`
+    takes them.
+    """
+    if not 1 <= n_pairs <= len(PAIRS):
+        raise ValueError(f"Between 1 and {len(PAIRS)} pairs are supported")
+    os.makedirs(dir, exist_ok=True)
+
+    pairs = list(PAIRS)[:n_pairs]
+    days = pd.date_range(START_DATE, periods=max(1, int(years * 365)),
+                         freq='D')
+    days = days[days.dayofweek < 5]
+
+    fix_fpath = os.path.join(dir, 'fix.csv')
+    fixes = {}
+    fpaths = {}
+    for i, cp_name in enumerate(pairs):
+        rng = np.random.RandomState(seed + i)
+        minute_df = _minute_bars(cp_name, days, rng)
+
+        minute_fpath = os.path.join(dir, f'{cp_name}_Minute.csv')
+        _write_minute_csv(minute_df, minute_fpath)
+        daily_fpath = os.path.join(dir, f'{cp_name}_Daily.xlsx')
+        _write_daily_xlsx(cp_name, minute_df, daily_fpath)
+        fixes['{}-{}'.format(cp_name[:3], cp_name[3:])] = \
+            _fixes(minute_df, days, rng)
+
+        fpaths[cp_name] = {read.MINUTE: minute_fpath, read.FIX: fix_fpath,
+                           read.DAILY: daily_fpath}
+
+    fix_df = pd.DataFrame(fixes, index=days)
+    fix_df.index.name = 'datetime'
+    fix_df.to_csv(fix_fpath, date_format='%Y-%m-%d')
+    return fpaths
+
+
+def _minute_bars(cp_name: str, days: pd.DatetimeIndex,
+                 rng: np.random.RandomState) -> pd.DataFrame:
+    """OHLC minute bars of a random walk on `days`, a few of them missing."""
+    index = (np.repeat(days.values, 1440)
+             + np.tile(np.arange(1440) * np.timedelta64(1, 'm'), len(days)))
+    base, decimals = PAIRS[cp_name], 3 if cp_name[3:] == 'JPY' else 5
+
+    open_ = base + rng.normal(0, base * 2e-4, len(index)).cumsum()
+    close = open_ + rng.normal(0, base * 1e-4, len(index))
+    high = np.maximum(open_, close) + \
+        np.abs(rng.normal(0, base * 5e-5, len(index)))
+    low = np.minimum(open_, close) - \
+        np.abs(rng.normal(0, base * 5e-5, len(index)))
+
+    df = pd.DataFrame({'Open': open_, 'High': high, 'Low': low,
+                       'Close': close}, index=pd.DatetimeIndex(index))
+    df = df.round(decimals)
+    return df[rng.rand(len(df)) >= MISSING_BARS]
+
+
+def _write_minute_csv(df: pd.DataFrame, fpath: str):
+    out = pd.DataFrame({
+        'Local time': df.index.strftime('%d.%m.%Y %H:%M:%S.000 GMT-0500'),
+        'Open': df['Open'].values, 'High': df['High'].values,
+        'Low': df['Low'].values, 'Close': df['Close'].values,
+        'Volume': 100,
+    })
+    out.to_csv(fpath, index=False)
+
+
+def _write_daily_xlsx(cp_name: str, minute_df: pd.DataFrame, fpath: str):
+    """Writes the daily bars of `minute_df`, latest first, stamped at 17:00
+    with Ask columns as in the real export.
+    """
+    daily = minute_df.resample('D').agg(
+        {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last'})
+    daily = daily.dropna().iloc[::-1]
+
+    name = '{}/{}'.format(cp_name[:3], cp_name[3:])
+    prices = ['Open', 'High', 'Low', 'Close']
+    header = (['Date'] + ['{}({}, Ask)'.format(name, p) for p in prices]
+              + ['{}({}, Bid)*'.format(name, p) for p in prices]
+              + ['Tick Volume({})'.format(name)])
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(header)
+    for day, row in zip(daily.index, daily[prices].values.tolist()):
+        sheet.append([day.to_pydatetime().replace(hour=17)]
+                     + row + row + [100000])
+    workbook.save(fpath)
+
+
+def _fixes(minute_df: pd.DataFrame, days: pd.DatetimeIndex,
+           rng: np.random.RandomState) -> np.ndarray:
+    """The close at 11:00 of each of `days`, a few of them missing."""
+    closes = minute_df['Close']
+    fixes = closes.reindex(days + pd.Timedelta(hours=11)).values
+    fixes[rng.rand(len(fixes)) < MISSING_FIXES] = np.nan
+    return fixes
@@ -3,7 +3,13 @@ This file is the starting point of the program. It provides a bird's eye view
 of the operations carried out to generate key metrics and to export to excel.
 """
 
+import argparse
+import functools
 import logging
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from os.path import abspath
 
@@ -11,10 +17,13 @@ import pandas as pd
 
 from common.config import Config
 from common.decorators import timer
-from common import utils
-from common.utils import run
+from common.pipeline import run_pipeline
+from common.scheduler import Scheduler
+from common import tracing, utils
 from ds.datacontainer import DataContainer
-from pyfx import analytics, read, write
+from pyfx import analytics, fixedpoint, incremental, read, streaming, write
+from pyfx.cache import FrameCache
+from pyfx.registry import DatasetRegistry
 
 try:
     logging.config.fileConfig(utils.get_logger_config_fpath())
@@ -22,6 +31,26 @@ except FileNotFoundError as e:
     print(e)
 logger = logging.getLogger(__name__)
 
+# Rough ratio of a currency pair's peak memory use to its source files' size.
+PAIR_MEMORY_PER_SOURCE_BYTE = 6
+
+# Where, and how wide, the output is written.
+OUTPUT_DIR = 'data/dataout/'
+OUTPUT_FOLDER = 'dataout_'
+OUTPUT_COL_WIDTH = 20
+OUTPUT_SHEET = 'max_pip_mvmts'
+
+# The DataContainer views the metrics use, and the views each is built from.
+DATA_VIEWS = {
+    'fix_price_df': [],
+    'daily_price_df': [],
+    'held_minute_price_df': [],
+    'day_codes': ['held_minute_price_df'],
+    'minutes_of_day': ['held_minute_price_df'],
+    'minute_price_df': ['held_minute_price_df', 'day_codes'],
+    'minute_grid': ['held_minute_price_df', 'day_codes', 'minutes_of_day'],
+}
+
 
 def io(func):
     """Decorator that abstracts the currency data input-output logic.
@@ -35,6 +64,7 @@ def io(func):
 
     """
 
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         REQUIRED_ARGS = ['cp_name', 'config', 'folder_suffix']
         if any(k not in kwargs for k in REQUIRED_ARGS):
@@ -50,19 +80,103 @@ def io(func):
 
         logger.info(f"Processing currency pair {cp_name}")
 
-        fpaths = config.fpath(cp_name)
+        with tracing.span('pair', cp_name=cp_name):
+            dfs = _read_pair(cp_name, config)
+            df_master = _compute_pair(func, dfs, *args, **kwargs)
+            _write_pair(df_master, cp_name, suffix)
+    return wrapper
+
+
+def _read_pair(cp_name: str, config: Config) -> dict:
+    """Reads the source data of a currency pair, as `read.read_data` does."""
+    fpaths = config.required_fpaths(cp_name)
+    price_scale = fixedpoint.price_scale(cp_name) \
+        if config.should_compact_prices else None
+
+    with tracing.span('read', cp_name=cp_name):
+        return read.read_data(fpaths, cp_name=cp_name,
+                              date_range=config.date_range,
+                              cache=_frame_cache(config),
+                              registry=DatasetRegistry(),
+                              price_scale=price_scale,
+                              minutes=config.required_minutes)
+
+
+def _frame_cache(config: Config) -> FrameCache:
+    return FrameCache(config.cache_dir, config.cache_max_bytes,
+                      config.should_hash_cached_contents) \
+        if config.should_cache_data else None
 
-        dfs = read.read_data(fpaths, cp_name=cp_name)
-        data = DataContainer(dfs, cp_name, config)
 
-        df_master = func(*args, **kwargs, data=data)
+def _compute_pair(func, dfs: dict, *args, **kwargs) -> pd.DataFrame:
+    """Calls the undecorated `func` on the data of `dfs`, recomputing only
+    changed days in incremental mode.
+    """
+    cp_name = kwargs.get('cp_name')
+    config = kwargs.get('config')
+
+    if config.should_run_incrementally:
+        return incremental.update(
+            cp_name, config, dfs,
+            compute=lambda data: func(*args, **kwargs, data=data))
+
+    data = DataContainer(dfs, cp_name, config)
+    return func(*args, **kwargs, data=data)
 
+
+def _write_pair(df_master: pd.DataFrame, cp_name: str, suffix: str):
+    with tracing.span('write', cp_name=cp_name):
         write.df_to_xlsx(df=df_master,
-                         dir='data/dataout/', folder_name='dataout_',
+                         dir=OUTPUT_DIR, folder_name=OUTPUT_FOLDER,
                          fname=('dataout_{}'.format(cp_name)),
                          folder_unique_id=suffix,
-                         sheet_name='max_pip_mvmts', col_width=20)
-    return wrapper
+                         sheet_name=OUTPUT_SHEET,
+                         col_width=OUTPUT_COL_WIDTH)
+
+
+def stream_pair(cp_name: str, config: Config, folder_suffix: str):
+    """Runs `exec` on a currency pair day by day as its minute data is read
+    (see `pyfx.streaming`), writing each block's rows as they are computed.
+    """
+    logger.info(f"Streaming currency pair {cp_name}")
+
+    fpaths = config.required_fpaths(cp_name)
+    price_scale = fixedpoint.price_scale(cp_name) \
+        if config.should_compact_prices else None
+
+    with tracing.span('pair', cp_name=cp_name):
+        with tracing.span('read', cp_name=cp_name):
+            dfs = read.read_data(
+                {src: f for src, f in fpaths.items() if src != read.MINUTE},
+                cp_name=cp_name, date_range=config.date_range,
+                cache=_frame_cache(config), registry=DatasetRegistry())
+        chunks = read.read_minute_chunks(
+            fpaths[read.MINUTE], date_range=config.date_range,
+            price_scale=price_scale, minutes=config.required_minutes,
+            chunksize=streaming.CHUNKSIZE) \
+            if read.MINUTE in fpaths else None
+
+        blocks = streaming.stream(
+            cp_name, config, dfs, chunks,
+            compute=lambda data: exec.__wrapped__(
+                cp_name=cp_name, config=config,
+                folder_suffix=folder_suffix, data=data),
+            block_days=config.stream_block_days)
+
+        fpath = write.xlsx_fpath('dataout_{}'.format(cp_name),
+                                 dir=OUTPUT_DIR, folder_name=OUTPUT_FOLDER,
+                                 folder_unique_id=folder_suffix)
+        with write.XlsxStreamWriter(fpath,
+                                    col_width=OUTPUT_COL_WIDTH) as writer:
+            sheet = None
+            for df in blocks:
+                with tracing.span('write', cp_name=cp_name):
+                    if sheet is None:
+                        sheet = writer.open_sheet(OUTPUT_SHEET, df.columns,
+                                                  df.index.name)
+                    sheet.append(df)
+            if sheet is None:
+                writer.open_sheet(OUTPUT_SHEET, pd.DataFrame().columns)
 
 
 class IOParamParsingError(Exception):
@@ -72,19 +186,58 @@ class IOParamParsingError(Exception):
 
 
 @io
+@tracing.traced('exec')
 def exec(cp_name: str, config: Config, folder_suffix: str, **kwargs):
 
     data = kwargs.get('data')
 
-    output_funcs = [
-        run(analytics.include_ohlc, data),
-        run(analytics.include_max_pips, data, config.benchmark_times),
-        run(analytics.include_max_pips, data, pdfx=True, cp_name=cp_name),
-        run(analytics.include_minute_data, data, config.minutely_data_sections),
-        run(analytics.include_avgs, data, config.period_average_data_sections)
+    scheduler = Scheduler(threads=config.threads)
+
+    # Views of the data shared by the metrics, each computed once.
+    for view, inputs in DATA_VIEWS.items():
+        scheduler.add(view, _view(data, view), inputs)
+    scheduler.add('pip_extrema', lambda *_: analytics.pip_extrema(data),
+                  ['minute_price_df'])
+
+    scheduler.add(
+        'ohlc', lambda *_: analytics.include_ohlc(data), ['daily_price_df'])
+    scheduler.add(
+        'max_pips',
+        lambda extrema, *_: analytics.include_max_pips(
+            data, config.benchmark_times, extrema=extrema),
+        ['pip_extrema', 'minute_grid'])
+    scheduler.add(
+        'pdfx',
+        lambda extrema, *_: analytics.include_max_pips(
+            data, pdfx=True, cp_name=cp_name, extrema=extrema),
+        ['pip_extrema', 'fix_price_df'])
+    scheduler.add(
+        'minutely_data',
+        lambda *_: analytics.include_minute_data(
+            data, config.minutely_data_sections),
+        ['minute_grid'])
+    scheduler.add(
+        'period_avg_data',
+        lambda *_: analytics.include_avgs(
+            data, config.period_average_data_sections),
+        ['held_minute_price_df', 'day_codes', 'minutes_of_day'])
+
+    metrics = [
+        (config.should_include_ohlc, 'ohlc'),
+        (config.should_include_max_pips, 'max_pips'),
+        (config.should_include_pdfx, 'pdfx'),
+        (config.should_include_minutely_data, 'minutely_data'),
+        (config.should_include_period_average_data, 'period_avg_data'),
     ]
+    targets = [metric for enabled, metric in metrics if enabled]
+    if not targets:
+        logger.warning(f"No metrics are enabled for {cp_name}")
+        return pd.DataFrame()
+
+    results = scheduler.run(targets)
+    scheduler.log_timings()
 
-    outputs = map(lambda f: f(), output_funcs)
+    outputs = [_index_by_datetime(results[t]) for t in targets]
 
     df_master = pd.concat(outputs, axis=1)
     df_master.index = df_master.index.date
@@ -92,14 +245,239 @@ def exec(cp_name: str, config: Config, folder_suffix: str, **kwargs):
     return df_master
 
 
+def _view(data: DataContainer, view: str):
+    """Scheduler node func computing `view` of `data`."""
+    def compute(*inputs):
+        return getattr(data, view)
+    return compute
+
+
+def _index_by_datetime(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts the index of `df` into a `DatetimeIndex`, so outputs indexed
+    by `date` and by `datetime` align when concatenated.
+    """
+    df.index = pd.to_datetime(df.index)
+    return df
+
+
 @timer
-def main():
+def main(workers: int = None):
+    """Runs `exec` for each currency pair.
+
+    Parameters
+    ----------
+        workers : optional, number of worker processes; overrides the
+            configured `execution.workers`. Pairs run one after another if
+            it is 1, else in parallel.
+    """
     config = Config(utils.get_app_config_fpath())
     folder_suffix = utils.folder_timestamp_suffix()
 
+    registry = DatasetRegistry()
+    registry.share(config.shared_fpaths())
+
+    workers = _worker_count(config, workers or config.workers)
+
+    if config.should_stream:
+        for setting, enabled in [
+                ('incremental', config.should_run_incrementally),
+                ('single_workbook', config.should_write_single_workbook)]:
+            if enabled:
+                logger.warning(f"`{setting}` is ignored when streaming")
+
+    if workers > 1:
+        if config.should_write_single_workbook:
+            logger.warning("`single_workbook` is ignored with parallel "
+                           "workers; each currency pair has its own workbook")
+        if config.should_trace:
+            logger.warning("`tracing` is ignored with parallel workers")
+        failures, hits, misses = run_parallel(config, folder_suffix, workers)
+        if failures:
+            logger.error(f"{len(failures)} of {len(config.currency_pairs)} "
+                         f"currency pairs failed: {sorted(failures)}")
+    else:
+        if config.should_trace:
+            tracing.tracer.start(memory=config.should_trace_memory)
+        try:
+            if config.should_stream:
+                for cp in config.currency_pairs:
+                    stream_pair(cp_name=cp, config=config,
+                                folder_suffix=folder_suffix)
+            elif (config.should_write_single_workbook
+                  or config.pipeline_depth > 0):
+                run_pipelined(config, folder_suffix)
+            else:
+                for cp in config.currency_pairs:
+                    exec(cp_name=cp, config=config,
+                         folder_suffix=folder_suffix)
+        finally:
+            if config.should_trace:
+                _export_trace(config, folder_suffix)
+        hits, misses = registry.hits, registry.misses
+
+    logger.info(f"Shared datasets: {hits} hits, {misses} misses")
+
+
+def convert_minute_data():
+    """Converts the minute csv of each currency pair into a binary store,
+    which later runs read the minute data from instead.
+    """
+    config = Config(utils.get_app_config_fpath())
     for cp in config.currency_pairs:
-        exec(cp_name=cp, config=config, folder_suffix=folder_suffix)
+        fpath = config.fpath(cp)[read.MINUTE]
+        if not os.path.isfile(fpath):
+            logger.warning(f"No minute data to convert for {cp}: {fpath}")
+            continue
+        logger.info(f"Converting minute data of {cp}")
+        read.convert_minute_data(fpath)
+
+
+def _export_trace(config: Config, folder_suffix: str):
+    """Writes the spans traced during the run, as JSON and as a Chrome
+    trace.
+    """
+    tracing.tracer.stop()
+    fpath = os.path.join(config.trace_dir, 'trace{}'.format(folder_suffix))
+    tracing.tracer.to_json(fpath + '.json')
+    tracing.tracer.to_chrome_trace(fpath + '.chrome.json')
+    logger.info(f"Trace written to {fpath}.json and {fpath}.chrome.json")
+
+
+def run_pipelined(config: Config, folder_suffix: str):
+    """Runs the currency pairs one after another, overlapping the reading of
+    the next pairs' source data and the writing of the previous pairs' output
+    with the compute of the current pair.
+
+    With `execution.single_workbook`, all pairs are written to one workbook,
+    in a worksheet named after each pair.
+    """
+    def read_pair(cp):
+        logger.info(f"Reading currency pair {cp}")
+        return _read_pair(cp, config)
+
+    def compute_pair(cp, dfs):
+        logger.info(f"Processing currency pair {cp}")
+        with tracing.span('pair', cp_name=cp):
+            return _compute_pair(exec.__wrapped__, dfs, cp_name=cp,
+                                 config=config, folder_suffix=folder_suffix)
+
+    depth = max(1, config.pipeline_depth)
+
+    if not config.should_write_single_workbook:
+        run_pipeline(config.currency_pairs, read_pair, compute_pair,
+                     lambda cp, df: _write_pair(df, cp, folder_suffix),
+                     maxsize=depth)
+        return
+
+    fpath = write.xlsx_fpath('dataout', dir=OUTPUT_DIR,
+                             folder_name=OUTPUT_FOLDER,
+                             folder_unique_id=folder_suffix)
+    with write.XlsxStreamWriter(fpath, col_width=OUTPUT_COL_WIDTH) as writer:
+        def write_sheet(cp, df):
+            with tracing.span('write', cp_name=cp):
+                writer.open_sheet(cp, df.columns, df.index.name).append(df)
+
+        run_pipeline(config.currency_pairs, read_pair, compute_pair,
+                     write_sheet, maxsize=depth)
+
+
+def run_parallel(config: Config, folder_suffix: str, workers: int) -> tuple:
+    """Runs each currency pair end to end in its own worker process.
+
+    A pair that fails is logged and reported without affecting the others.
+    Shared datasets are loaded once per worker process.
+
+    Returns
+    -------
+    A dict mapping each failed currency pair to its formatted traceback, and
+    the hits and misses of the workers' dataset registries, summed.
+    """
+    failures = {}
+    hits = misses = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(_exec_pair, cp, config, folder_suffix): cp
+            for cp in config.currency_pairs
+        }
+
+        for future in as_completed(futures):
+            cp = futures[future]
+            try:
+                error, pair_hits, pair_misses = future.result()
+                hits, misses = hits + pair_hits, misses + pair_misses
+            except BrokenProcessPool as e:
+                # The worker died, e.g. killed for running out of memory.
+                error = repr(e)
+
+            if error is None:
+                logger.info(f"Finished currency pair {cp}")
+            else:
+                logger.error(f"Currency pair {cp} failed:\n{error}")
+                failures[cp] = error
+
+    return failures, hits, misses
+
+
+def _exec_pair(cp_name: str, config: Config, folder_suffix: str) -> tuple:
+    """Worker entry point. Returns the traceback if `exec` raised, else None,
+    and the hits and misses of the worker's dataset registry during the run.
+
+    Exceptions are returned formatted, as not all of them can be pickled back
+    to the parent process.
+    """
+    registry = DatasetRegistry()
+    hits, misses = registry.hits, registry.misses
+    error = None
+    try:
+        run = stream_pair if config.should_stream else exec
+        run(cp_name=cp_name, config=config, folder_suffix=folder_suffix)
+    except Exception:
+        error = traceback.format_exc()
+    return error, registry.hits - hits, registry.misses - misses
+
+
+def _worker_count(config: Config, workers: int) -> int:
+    """Caps `workers` so the pairs running at once fit in the configured
+    memory budget.
+    """
+    workers = max(1, min(workers, len(config.currency_pairs)))
+    budget = config.memory_budget_bytes
+    if budget is None or workers == 1:
+        return workers
+
+    per_pair = max(_estimate_pair_memory(config, cp)
+                   for cp in config.currency_pairs)
+    capped = max(1, min(workers, budget // max(per_pair, 1)))
+    if capped < workers:
+        logger.warning(f"Memory budget allows {capped} of {workers} workers "
+                       f"(~{per_pair // 2 ** 20} MB per currency pair)")
+    return capped
+
+
+def _estimate_pair_memory(config: Config, cp_name: str) -> int:
+    """Estimates a currency pair's peak memory use from its source files."""
+    minutes = config.required_minutes
+    # Only the share of the minute data at the required minutes is held.
+    shares = {read.MINUTE: len(minutes) / (24 * 60)} \
+        if minutes is not None else {}
+    return int(PAIR_MEMORY_PER_SOURCE_BYTE * sum(
+        os.path.getsize(fpath) * shares.get(src, 1)
+        for src, fpath in config.required_fpaths(cp_name).items()
+        if os.path.isfile(fpath)))
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '-w', '--workers', type=int, default=None,
+        help="number of currency pairs processed in parallel")
+    parser.add_argument(
+        '--convert-minute-data', action='store_true',
+        help="convert the minute csvs into binary stores, then exit")
+    args = parser.parse_args()
+
+    if args.convert_minute_data:
+        convert_minute_data()
+    else:
+        main(workers=args.workers)
@@ -1,10 +1,13 @@
+import copy
+import hashlib
 import json
 import logging
 import logging.config
 import os
+from collections import Counter
 from pathlib import Path
 import yaml
-from datetime import datetime, time, timedelta
+from datetime import datetime, time
 
 from common import const
 from common.decorators import singleton
@@ -51,6 +54,7 @@ class Config:
             logger.error("Failure loading config")
             raise ConfigFileTypeError(config_path)
 
+        self.__output_digest = self._digest_output_settings(self.__config)
         self._setup()
 
     def _setup(self):
@@ -58,6 +62,7 @@ class Config:
         self._setup_time_range()
         self._setup_date_range()
         self._setup_dst_hour_ahead_periods()
+        self._setup_dst_hour_delay_periods()
         self._setup_minutely_sections()
 
     def _setup_benchmark_times(self):
@@ -95,6 +100,16 @@ class Config:
 
             self.__config['data_adjustments']['daylight_saving_mode']['hour_ahead_periods'] = hour_ahead_periods
 
+    def _setup_dst_hour_delay_periods(self):
+        if ('data_adjustments' in self.__config and
+                'daylight_saving_mode' in self.__config['data_adjustments']):
+
+            dst_config = self.__config['data_adjustments']['daylight_saving_mode']
+            dst_config['hour_delay_periods'] = [
+                self._read_date_range_obj(period)
+                for period in dst_config.get('hour_delay_periods') or []
+            ]
+
     def _setup_minutely_sections(self):
         """Validate and initialize settings regarding minutely sections, if any.
         """
@@ -237,45 +252,35 @@ class Config:
     def should_enable_daylight_saving_mode(self) -> bool:
         return self.__config['data_adjustments']['daylight_saving_mode']['enabled']
 
-    @property
-    def dst_hour_ahead_period(self) -> DateRange:
-        time_period_def = self.__config['data_adjustments']['daylight_saving_mode']['hour_ahead_period']
-        return self._read_date_range_obj(time_period_def)
-
     @property
     def dst_hour_ahead_periods(self) -> [DateRange]:
         return self.__config['data_adjustments']['daylight_saving_mode']['hour_ahead_periods']
 
     @property
-    def dst_hour_ahead_time_range(self) -> DayTimeRange:
-        original_time_range = self.time_range
-
-        new_start_time = self._timedelta_by_hour(
-            time=original_time_range.start_time, hourdelta=1)
-        new_end_time = self._timedelta_by_hour(
-            time=original_time_range.end_time, hourdelta=1)
+    def dst_hour_delay_periods(self) -> [DateRange]:
+        return self.__config['data_adjustments']['daylight_saving_mode']['hour_delay_periods']
 
-        return DayTimeRange(new_start_time, new_end_time)
+    def _is_metric_enabled(self, metric: str) -> bool:
+        """Metrics are enabled unless their `enabled` flag says otherwise."""
+        metrics = self.__config.get('metrics') or {}
+        metric_config = metrics.get(metric) or {}
+        return metric_config.get('enabled', True)
 
     @property
-    def dst_hour_delay_period(self) -> DateRange:
-        time_period_def = self.__config['data_adjustments']['daylight_saving_mode']['hour_delay_period']
-        return self._read_date_range_obj(time_period_def)
+    def should_include_ohlc(self) -> bool:
+        return self._is_metric_enabled('ohlc')
 
     @property
-    def dst_hour_behind_time_range(self) -> DayTimeRange:
-        original_time_range = self.time_range
-
-        new_start_time = self._timedelta_by_hour(
-            time=original_time_range.start_time, hourdelta=1, decr=True)
-        new_end_time = self._timedelta_by_hour(
-            time=original_time_range.end_time, hourdelta=1, decr=True)
+    def should_include_max_pips(self) -> bool:
+        return self._is_metric_enabled('max_pips')
 
-        return DayTimeRange(new_start_time, new_end_time)
+    @property
+    def should_include_pdfx(self) -> bool:
+        return self._is_metric_enabled('pdfx')
 
     @property
     def should_include_minutely_data(self) -> bool:
-        return self.__config["minutely_data"]["include_minutely_data"]
+        return self._is_metric_enabled('minutely_data')
 
     @property
     def minutely_data_sections(self) -> list:
@@ -295,9 +300,206 @@ class Config:
     def time_shift(self) -> bool:
         return self.__config["time_shift"]["hour_delta"]
 
+    @property
+    def workers(self) -> int:
+        """Number of currency pairs processed in parallel."""
+        if 'execution' in self.__config:
+            return self.__config['execution'].get('workers', 1)
+        return 1
+
+    @property
+    def threads(self) -> int:
+        """Number of threads computing a currency pair's metrics."""
+        if 'execution' in self.__config:
+            return self.__config['execution'].get('threads', 4)
+        return 4
+
+    @property
+    def memory_budget_bytes(self) -> int:
+        """Memory the parallel workers may use in total, or `None` if
+        unbounded.
+        """
+        if ('execution' in self.__config and
+                'memory_budget_mb' in self.__config['execution']):
+            return int(self.__config['execution']['memory_budget_mb']
+                       * 2 ** 20)
+        return None
+
+    @property
+    def pipeline_depth(self) -> int:
+        """Number of currency pairs read ahead of, and waiting to be written
+        behind, the one being computed; pairs run strictly one after another
+        if it is 0.
+        """
+        if 'execution' in self.__config:
+            return self.__config['execution'].get('pipeline_depth', 1)
+        return 1
+
+    @property
+    def should_compact_prices(self) -> bool:
+        """Whether minute prices are held in fixed point (see
+        `pyfx.fixedpoint`) rather than in float.
+        """
+        if 'execution' in self.__config:
+            return self.__config['execution'].get('compact_prices', False)
+        return False
+
+    @property
+    def should_prune_minutes(self) -> bool:
+        """Whether minute bars at minutes of the day that no enabled metric
+        reads are dropped as the minute data is read.
+        """
+        if 'execution' in self.__config:
+            return self.__config['execution'].get('prune_minutes', True)
+        return True
+
+    @property
+    def required_minutes(self) -> set:
+        """Minutes of the day (0 to 1439) of the source minute data that the
+        enabled metrics read, or `None` if all of them are kept.
+
+        These are the minutes of the time range, as moved by the offset of
+        any DST period, of the benchmark times and of the minutely and
+        period average sections, taken back by the time shift.
+        """
+        if not self.should_prune_minutes:
+            return None
+
+        def minute(t: time) -> int:
+            return t.hour * 60 + t.minute
+
+        windows = []
+        if self.should_include_max_pips or self.should_include_pdfx:
+            start = minute(self.time_range.start_time)
+            end = minute(self.time_range.end_time)
+            offsets = [0]
+            if self.should_enable_daylight_saving_mode:
+                # Minutes are moved an hour back in hour ahead periods, and
+                # an hour forward in hour delay periods.
+                offsets += [60] if self.dst_hour_ahead_periods else []
+                offsets += [-60] if self.dst_hour_delay_periods else []
+            windows += [(start + o, end + o) for o in offsets]
+        if self.should_include_max_pips:
+            windows += [(minute(bt), minute(bt))
+                        for bt in self.benchmark_times]
+        if self.should_include_minutely_data and self.minutely_data_sections:
+            # Iterating a `DayTimeRange` yields the minutes from one after
+            # its start to one after its end.
+            windows += [(minute(s['range_start']) + 1,
+                         minute(s['range_end']) + 1)
+                        for s in self.minutely_data_sections]
+        if self.should_include_period_average_data:
+            windows += [(minute(s.start_time), minute(s.end_time))
+                        for s in self.period_average_data_sections]
+
+        shift = round(self.time_shift * 60) if self.should_time_shift else 0
+        return {(m - shift) % (24 * 60)
+                for start, end in windows for m in range(start, end + 1)}
+
+    @property
+    def should_write_single_workbook(self) -> bool:
+        """Whether all currency pairs are written to one workbook, one
+        worksheet each, rather than one workbook each.
+        """
+        if 'execution' in self.__config:
+            return self.__config['execution'].get('single_workbook', False)
+        return False
+
+    @property
+    def should_cache_data(self) -> bool:
+        if 'cache' in self.__config and 'enabled' in self.__config['cache']:
+            return self.__config['cache']['enabled']
+        return False
+
+    @property
+    def cache_dir(self) -> str:
+        return self.__config['cache'].get('dir', 'cache')
+
+    @property
+    def cache_max_bytes(self) -> int:
+        return int(self.__config['cache'].get('max_size_mb', 512) * 2 ** 20)
+
+    @property
+    def should_hash_cached_contents(self) -> bool:
+        return self.__config['cache'].get('hash_contents', False)
+
+    @property
+    def should_run_incrementally(self) -> bool:
+        if ('incremental' in self.__config and
+                'enabled' in self.__config['incremental']):
+            return self.__config['incremental']['enabled']
+        return False
+
+    @property
+    def incremental_state_dir(self) -> str:
+        return self.__config['incremental'].get('dir', 'state')
+
+    @property
+    def should_stream(self) -> bool:
+        """Whether currency pairs are computed day by day as their minute
+        data is read (see `pyfx.streaming`).
+        """
+        if ('streaming' in self.__config and
+                'enabled' in self.__config['streaming']):
+            return self.__config['streaming']['enabled']
+        return False
+
+    @property
+    def stream_block_days(self) -> int:
+        return self.__config.get('streaming', {}).get('block_days', 1)
+
+    @property
+    def should_trace(self) -> bool:
+        if ('tracing' in self.__config and
+                'enabled' in self.__config['tracing']):
+            return self.__config['tracing']['enabled']
+        return False
+
+    @property
+    def should_trace_memory(self) -> bool:
+        return self.__config['tracing'].get('memory', False)
+
+    @property
+    def trace_dir(self) -> str:
+        return self.__config['tracing'].get('dir', 'traces')
+
+    @property
+    def output_digest(self) -> str:
+        """Digest of the settings that shape the output of a day, i.e. all
+        but the date range and the execution, cache, incremental, streaming
+        and tracing sections.
+        """
+        return self.__output_digest
+
+    @staticmethod
+    def _digest_output_settings(raw_config: dict) -> str:
+        settings = copy.deepcopy(raw_config)
+        for section in ['execution', 'cache', 'incremental', 'streaming',
+                        'tracing']:
+            settings.pop(section, None)
+        settings.get('setup', {}).pop('date_range', None)
+        return hashlib.sha1(json.dumps(
+            settings, sort_keys=True, default=str).encode()).hexdigest()
+
     @property
     def should_include_period_average_data(self) -> bool:
-        return self.__config["period_avg_data"]["include_period_avg_data"]
+        return self._is_metric_enabled('period_avg_data')
+
+    @property
+    def required_sources(self) -> set:
+        """The source data (`read.MINUTE`, `read.FIX`, `read.DAILY`) that the
+        enabled metrics need.
+        """
+        sources = set()
+        if self.should_include_ohlc:
+            sources.add(read.DAILY)
+        if self.should_include_pdfx:
+            sources.update([read.FIX, read.MINUTE])
+        if (self.should_include_max_pips
+                or self.should_include_minutely_data
+                or self.should_include_period_average_data):
+            sources.add(read.MINUTE)
+        return sources
 
     @property
     def period_average_data_sections(self) -> list:
@@ -332,6 +534,22 @@ class Config:
 
         return fpaths
 
+    def required_fpaths(self, cp_name: str) -> dict:
+        """Like `fpath`, restricted to the `required_sources`."""
+        required = self.required_sources
+        return {src: fpath for src, fpath in self.fpath(cp_name).items()
+                if src in required}
+
+    def shared_fpaths(self) -> set:
+        """Resolved fpaths of the source files read by more than one of the
+        currency pairs, e.g. the fix price file.
+        """
+        counts = Counter(
+            os.path.realpath(fpath)
+            for cp_name in self.currency_pairs
+            for fpath in self.required_fpaths(cp_name).values())
+        return {fpath for fpath, count in counts.items() if count > 1}
+
     @staticmethod
     def _str_to_time(timestr: str) -> time:
         return datetime.strptime(timestr, "%H:%M").time()
@@ -344,15 +562,6 @@ class Config:
             logger.error(
                 f"date string {datestr} does not follow the %Y/%m/%d format.")
 
-    @staticmethod
-    def _timedelta_by_hour(time: time, hourdelta: int, decr=False) -> time:
-        if decr:
-            return (datetime.combine(datetime.today(), time)
-                    - timedelta(hours=hourdelta)).time()
-        else:
-            return (datetime.combine(datetime.today(), time)
-                    + timedelta(hours=hourdelta)).time()
-
     @classmethod
     def _read_date_range_obj(cls, date_range_obj: dict) -> DateRange:
 
@@ -1,12 +1,11 @@
 import logging
 import functools
 import os
-from datetime import datetime
 
 import xlrd
 from dotenv import load_dotenv
 
-from common import utils
+from common import tracing, utils
 
 try:
     logging.config.fileConfig(utils.get_logger_config_fpath())
@@ -14,15 +13,19 @@ except FileNotFoundError as e:
     print(e)
 logger = logging.getLogger(__name__)
 
+
 def timer(func):
-    """A decorator that times and prints execution time."""
+    """A decorator that times and logs execution time.
+
+    Kept for compatibility: each call is traced in a span named after the
+    func (see `common.tracing`), and its duration logged.
+    """
+    @functools.wraps(func)
     def timer_wrapper(*args, **kwargs):
-        start_time = datetime.now()
-        resp = func(*args, **kwargs)
-        end_time = datetime.now()
-        duration = end_time - start_time
-        logger.info("{:<40} runtime: {}.{} secs".format(
-            func.__name__, duration.seconds, duration.microseconds))
+        with tracing.span(func.__name__) as span:
+            resp = func(*args, **kwargs)
+        logger.info("{:<40} runtime: {:.6f} secs".format(
+            func.__name__, span.duration))
         return resp
     return timer_wrapper
 
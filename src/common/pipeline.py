@@ -0,0 +1,122 @@
+"""
+A three-stage pipeline overlapping input, compute and output.
+
+Items are read by a reader thread, computed in the calling thread and written
+by a writer thread. The stages are connected by bounded queues, so the reader
+runs at most a few items ahead of the compute stage and finished outputs wait
+for the writer without piling up in memory.
+"""
+
+import logging
+import queue
+import threading
+from typing import Callable, Iterable
+
+__all__ = ['run_pipeline']
+
+logger = logging.getLogger(__name__)
+
+
+# Marks the end of a queue's items.
+_DONE = object()
+
+# Seconds a blocked stage waits before checking whether to stop.
+_POLL_SECS = 0.1
+
+
+def run_pipeline(items: Iterable, read: Callable, compute: Callable,
+                 write: Callable, maxsize: int = 1):
+    """Runs `write(item, compute(item, read(item)))` for each item, in order.
+
+    Reading the next items and writing the previous ones overlaps with the
+    compute of the current one. If a stage raises, the pipeline stops once
+    the items in flight are dropped, and the exception is raised here; the
+    outputs of the items before it are still written.
+
+    Parameters
+    ----------
+        items : the items, e.g. currency pair names
+        read : reads an item's inputs
+        compute : computes an item's output from its inputs
+        write : writes an item's output
+        maxsize : items each queue holds at most
+    """
+    read_queue = queue.Queue(maxsize=max(1, maxsize))
+    write_queue = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                inputs = read(item)
+                if not _put(read_queue, (item, inputs), stop):
+                    break
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            _put(read_queue, _DONE, stop)
+
+    def writer():
+        failed = False
+        while True:
+            msg = write_queue.get()
+            if msg is _DONE:
+                return
+            if failed:
+                # Keep draining, so that the compute stage never blocks.
+                continue
+            try:
+                write(*msg)
+            except BaseException as e:
+                errors.append(e)
+                failed = True
+                stop.set()
+
+    threads = [threading.Thread(target=reader, name='pipeline-reader'),
+               threading.Thread(target=writer, name='pipeline-writer')]
+    for t in threads:
+        t.start()
+
+    try:
+        while not stop.is_set():
+            try:
+                msg = read_queue.get(timeout=_POLL_SECS)
+            except queue.Empty:
+                continue
+            if msg is _DONE:
+                break
+            item, inputs = msg
+            output = compute(item, inputs)
+            del inputs
+            if not _put(write_queue, (item, output), stop):
+                break
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        # The outputs already queued are written, whatever happened.
+        write_queue.put(_DONE)
+        for t in threads:
+            t.join()
+
+    if errors:
+        raise errors[0]
+
+
+def _put(q: queue.Queue, msg, stop: threading.Event) -> bool:
+    """Puts `msg` on `q`, waiting for room unless told to stop.
+
+    Returns
+    -------
+    `False` if the pipeline stopped before there was room.
+    """
+    while True:
+        try:
+            q.put(msg, timeout=_POLL_SECS)
+            return True
+        except queue.Full:
+            if stop.is_set():
+                return False
@@ -0,0 +1,145 @@
+"""
+A small dependency scheduler for the analytics of a currency pair.
+
+Nodes declare the nodes they take as inputs; each node is computed once, and
+nodes whose inputs are all available run concurrently in a thread pool. The
+heavy pandas and numpy operations release the GIL, so independent metrics
+overlap.
+"""
+
+import contextvars
+import logging
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, List
+
+from common import tracing
+
+__all__ = ['Scheduler', 'SchedulerError']
+
+logger = logging.getLogger(__name__)
+
+
+Node = namedtuple('Node', 'name func inputs')
+
+
+class Scheduler:
+    """
+    Runs nodes in dependency order, each at most once.
+
+    Args: the number of worker threads; nodes run one after another if it
+    is 1
+    """
+
+    def __init__(self, threads: int = 1):
+        self.__threads = max(1, threads)
+        self.__nodes = {}
+        self.__timings = {}
+
+    @property
+    def timings(self) -> dict:
+        """Seconds taken by each node of the last run, in completion order."""
+        return dict(self.__timings)
+
+    def add(self, name: str, func: Callable, inputs: Iterable[str] = ()):
+        """Adds a node.
+
+        Parameters
+        ----------
+            name : name of the node's output
+            func : computes the output; called with the outputs of `inputs`,
+                in order, as positional arguments
+            inputs : names of the nodes whose outputs `func` takes
+        """
+        if name in self.__nodes:
+            raise SchedulerError(f"Node `{name}` is already defined")
+        self.__nodes[name] = Node(name, func, tuple(inputs))
+
+    def run(self, targets: Iterable[str]) -> dict:
+        """Computes `targets` and the nodes they depend on.
+
+        Raises the first exception raised by a node, once the nodes already
+        running have finished.
+
+        Returns
+        -------
+        A dict mapping each of `targets` to its output.
+        """
+        targets = list(targets)
+        nodes = self._required_nodes(targets)
+        pending = {n.name: set(n.inputs) for n in nodes}
+        dependents = {n.name: [] for n in nodes}
+        for node in nodes:
+            for i in node.inputs:
+                dependents[i].append(node.name)
+
+        results = {}
+        self.__timings = {}
+
+        with ThreadPoolExecutor(max_workers=self.__threads) as pool:
+            running = {}
+
+            def submit_ready():
+                for name in [n for n, deps in pending.items() if not deps]:
+                    del pending[name]
+                    node = self.__nodes[name]
+                    args = [results[i] for i in node.inputs]
+                    # Nodes trace their spans under the span running them.
+                    running[pool.submit(contextvars.copy_context().run,
+                                        self._timed, node, args)] = name
+
+            submit_ready()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    # Raises the node's exception, if any.
+                    results[name], self.__timings[name] = future.result()
+                    for dependent in dependents[name]:
+                        pending[dependent].discard(name)
+                submit_ready()
+
+        return {t: results[t] for t in targets}
+
+    def log_timings(self):
+        for name, secs in self.__timings.items():
+            logger.info("{:<40} runtime: {:.6f} secs".format(name, secs))
+
+    def _required_nodes(self, targets: List[str]) -> List[Node]:
+        """The nodes `targets` depend on, in dependency order."""
+        ordered, visiting, visited = [], set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise SchedulerError(f"Node `{name}` depends on itself")
+            if name not in self.__nodes:
+                raise SchedulerError(f"Node `{name}` is not defined")
+
+            visiting.add(name)
+            for i in self.__nodes[name].inputs:
+                visit(i)
+            visiting.discard(name)
+            visited.add(name)
+            ordered.append(self.__nodes[name])
+
+        for t in targets:
+            visit(t)
+        return ordered
+
+    @staticmethod
+    def _timed(node: Node, args: list):
+        with tracing.span(node.name) as span:
+            result = node.func(*args)
+        return result, span.duration
+
+    def __repr__(self):
+        return f"Scheduler({len(self.__nodes)} nodes, {self.__threads} threads)"
+
+
+class SchedulerError(ValueError):
+    """Raised when a node is redefined, or depends on an undefined node or on
+    itself.
+    """
+    pass
@@ -0,0 +1,238 @@
+"""
+Hierarchical timing and memory tracing.
+
+Code is traced in spans, each timed with `time.perf_counter`. A span opened
+while another is open in the same context becomes its child, so a run reads
+as a tree, e.g. `pair > exec > max_pips > include_max_pips`. Threads started
+with a copy of the context (as the scheduler's are) nest their spans under
+the span that started them.
+
+With memory tracing, each span also records the peak memory traced by
+`tracemalloc` while it was open, above the memory in use when it opened. The
+peak is that of the process, so the peaks of spans open at once in other
+threads are approximate.
+
+Spans finished while the module's `tracer` is started are kept by it, and can
+be exported as JSON or in the Chrome trace event format, which
+chrome://tracing and Perfetto display. Otherwise spans are only timed, e.g.
+for `@timer` to log, and nothing is kept.
+"""
+
+import contextvars
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, List
+
+__all__ = ['Span', 'Tracer', 'tracer', 'span', 'traced']
+
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+# `tracemalloc.reset_peak` only exists from Python 3.9; without it, a span's
+# peak may include an earlier peak of the process.
+_reset_peak = getattr(tracemalloc, 'reset_peak', lambda: None)
+
+
+class Span:
+    """A traced section of code; times are in seconds since the tracer's
+    start.
+    """
+
+    def __init__(self, span_id: int, name: str, parent: 'Span',
+                 start: float, attrs: dict):
+        self.id = span_id
+        self.name = name
+        self.parent_id = parent.id if parent is not None else None
+        self.start = start
+        self.duration = None
+        self.thread_id = threading.get_ident()
+        self.attrs = attrs
+        self.peak_bytes = None
+
+        self._mem_start = None
+        self._mem_peak = None
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id, 'parent_id': self.parent_id, 'name': self.name,
+            'start': self.start, 'duration': self.duration,
+            'thread_id': self.thread_id, 'attrs': self.attrs,
+            'peak_bytes': self.peak_bytes,
+        }
+
+    def __repr__(self):
+        return f"Span({self.name!r}, {self.duration} secs)"
+
+
+class Tracer:
+    """
+    Keeps the spans finished between `start` and `stop`.
+
+    Spans are always timed, but kept only while started, so that code timed
+    outside of a trace holds no memory; memory is traced only if `start` is
+    called with `memory=True`, as tracemalloc slows allocations down.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__ids = itertools.count(1)
+        self.__spans = []
+        self.__epoch = time.perf_counter()
+        self.__recording = False
+        self.__trace_memory = False
+        self.__started_tracemalloc = False
+
+    @property
+    def spans(self) -> List[Span]:
+        """The finished spans, in the order they finished."""
+        with self.__lock:
+            return list(self.__spans)
+
+    @property
+    def is_recording(self) -> bool:
+        """Whether finished spans are kept, i.e. between `start` and
+        `stop`.
+        """
+        return self.__recording
+
+    @property
+    def traces_memory(self) -> bool:
+        return self.__trace_memory
+
+    def start(self, memory: bool = False):
+        """Clears the spans kept, then keeps the spans finished from now on,
+        and traces memory if `memory`.
+        """
+        self.clear()
+        self.__recording = True
+        self.__trace_memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracemalloc = True
+
+    def stop(self):
+        """Stops keeping spans and tracing memory; the spans kept so far
+        remain until the next `start` or `clear`.
+        """
+        self.__recording = False
+        self.__trace_memory = False
+        if self.__started_tracemalloc:
+            tracemalloc.stop()
+            self.__started_tracemalloc = False
+
+    def clear(self):
+        with self.__lock:
+            self.__spans = []
+            self.__epoch = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Traces the enclosed code as a child of the current span.
+
+        Yields the `Span`, whose `duration` and `peak_bytes` are set once the
+        enclosed code finishes, whether or not it raises. The span is kept
+        only if the tracer is recording.
+        """
+        parent = _current_span.get()
+        s = Span(next(self.__ids), name, parent,
+                 time.perf_counter() - self.__epoch, attrs)
+        trace_memory = self.__trace_memory and tracemalloc.is_tracing()
+        if trace_memory:
+            current = self._fold_peak(parent)
+            s._mem_start = s._mem_peak = current
+
+        token = _current_span.set(s)
+        try:
+            yield s
+        finally:
+            _current_span.reset(token)
+            s.duration = time.perf_counter() - self.__epoch - s.start
+            if trace_memory and tracemalloc.is_tracing():
+                self._fold_peak(s)
+                s.peak_bytes = s._mem_peak - s._mem_start
+                if parent is not None and parent._mem_peak is not None:
+                    parent._mem_peak = max(parent._mem_peak, s._mem_peak)
+            if self.__recording:
+                with self.__lock:
+                    self.__spans.append(s)
+
+    def traced(self, name: str = None, **attrs) -> Callable:
+        """Func decorator tracing each call in a span named `name`, by default
+        the func's name.
+        """
+        def decorator(func):
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, **attrs):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def to_json(self, fpath: str):
+        """Writes the finished spans as a JSON list, in start order."""
+        spans = sorted(self.spans, key=lambda s: s.start)
+        _dump({'spans': [s.to_dict() for s in spans]}, fpath)
+
+    def to_chrome_trace(self, fpath: str):
+        """Writes the finished spans in the Chrome trace event format."""
+        pid = os.getpid()
+        events = []
+        for s in sorted(self.spans, key=lambda s: s.start):
+            args = dict(s.attrs)
+            if s.peak_bytes is not None:
+                args['peak_bytes'] = s.peak_bytes
+            events.append({
+                'name': s.name, 'cat': 'pyfx', 'ph': 'X',
+                'ts': s.start * 1e6, 'dur': s.duration * 1e6,
+                'pid': pid, 'tid': s.thread_id,
+                'args': {k: _jsonable(v) for k, v in args.items()},
+            })
+        _dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, fpath)
+
+    @staticmethod
+    def _fold_peak(s: Span) -> int:
+        """Folds the peak traced since the last fold into `s`, then starts
+        a new peak. Returns the memory currently traced.
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        if s is not None and s._mem_peak is not None:
+            s._mem_peak = max(s._mem_peak, peak)
+        _reset_peak()
+        return current
+
+    def __repr__(self):
+        return f"Tracer({len(self.__spans)} spans)"
+
+
+# The tracer of the process.
+tracer = Tracer()
+
+
+def span(name: str, **attrs):
+    """`tracer.span`, tracing the enclosed code."""
+    return tracer.span(name, **attrs)
+
+
+def traced(name: str = None, **attrs) -> Callable:
+    """`tracer.traced`, tracing each call of the decorated func."""
+    return tracer.traced(name, **attrs)
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    return str(value)
+
+
+def _dump(obj, fpath: str):
+    os.makedirs(os.path.dirname(fpath) or '.', exist_ok=True)
+    with open(fpath, 'w') as f:
+        json.dump(obj, f, default=str)
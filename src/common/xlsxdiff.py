@@ -0,0 +1,152 @@
+"""
+Cell by cell comparison of xlsx worksheets.
+
+Both worksheets are loaded into arrays and compared at once, numbers within
+a tolerance and other values exactly. Worksheets of different shapes are
+compared over their common area, the cells only one of them has counting as
+mismatches.
+"""
+
+import math
+from typing import List, NamedTuple, Tuple, Union
+
+import numpy as np
+import openpyxl
+
+from common.utils import SheetNotFoundException
+
+__all__ = ['compare_xlsx', 'XlsxDiff']
+
+
+class Mismatch(NamedTuple):
+    """A differing cell; `row` and `col` count from 1, as in Excel."""
+    row: int
+    col: int
+    expected: object
+    actual: object
+
+
+class XlsxDiff(NamedTuple):
+    """Summary of the differences between two worksheets."""
+    sheet: Union[int, str]
+    expected_shape: Tuple[int, int]
+    actual_shape: Tuple[int, int]
+    cells_compared: int
+    mismatch_count: int
+    max_abs_diff: float
+    mismatches: List[Mismatch]
+
+    @property
+    def identical(self) -> bool:
+        return (self.mismatch_count == 0
+                and self.expected_shape == self.actual_shape)
+
+    def __str__(self):
+        lines = ["Sheet {}: {} of {} cells differ".format(
+            self.sheet, self.mismatch_count, self.cells_compared)]
+        if self.expected_shape != self.actual_shape:
+            lines.append("Shape {} != {}".format(
+                self.actual_shape, self.expected_shape))
+        if self.max_abs_diff:
+            lines.append("Max abs diff: {}".format(self.max_abs_diff))
+        lines.extend("Row {} Col {} - {!r} != {!r}".format(*m)
+                     for m in self.mismatches)
+        if self.mismatch_count > len(self.mismatches):
+            lines.append("... {} more".format(
+                self.mismatch_count - len(self.mismatches)))
+        return '\n'.join(lines)
+
+
+def compare_xlsx(expected_fpath: str, actual_fpath: str,
+                 sheet: Union[int, str] = 0, rtol: float = 0,
+                 atol: float = 0, max_mismatches: int = 20) -> XlsxDiff:
+    """Compares a worksheet of two xlsx files.
+
+    Numbers `a` and `e` match if `|a - e| <= atol + rtol * |e|`; other values,
+    e.g. strings and dates, must be equal. Empty cells match each other only.
+
+    Parameters
+    ----------
+        expected_fpath : fpath to the benchmark
+        actual_fpath : fpath to the file compared against it
+        sheet : optional, index or name of the worksheet; default to the first
+        rtol, atol : optional, relative and absolute numeric tolerance
+        max_mismatches : optional, most mismatches listed in the summary
+
+    Raises
+    ------
+        SheetNotFoundException : if either file lacks the worksheet
+    """
+    expected = _load_sheet(expected_fpath, sheet)
+    actual = _load_sheet(actual_fpath, sheet)
+
+    rows = max(expected.shape[0], actual.shape[0])
+    cols = max(expected.shape[1], actual.shape[1])
+    e, a = _pad(expected, rows, cols), _pad(actual, rows, cols)
+
+    e_num, a_num = _numbers(e), _numbers(a)
+    both_num = ~np.isnan(e_num) & ~np.isnan(a_num)
+    abs_diff = np.where(both_num, np.abs(a_num - e_num), 0.)
+    close = abs_diff <= atol + rtol * np.abs(np.where(both_num, e_num, 0.))
+
+    # Values that are not both numbers must be of the same kind and equal.
+    same = np.where(both_num, close,
+                    np.isnan(e_num) & np.isnan(a_num) & (e == a))
+
+    rr, cc = np.nonzero(~same)
+    mismatches = [Mismatch(r + 1, c + 1, e[r, c], a[r, c])
+                  for r, c in zip(rr[:max_mismatches], cc[:max_mismatches])]
+
+    return XlsxDiff(
+        sheet=sheet,
+        expected_shape=expected.shape,
+        actual_shape=actual.shape,
+        cells_compared=rows * cols,
+        mismatch_count=len(rr),
+        max_abs_diff=float(abs_diff.max()) if abs_diff.size else 0.,
+        mismatches=mismatches)
+
+
+def _load_sheet(fpath: str, sheet: Union[int, str]) -> np.ndarray:
+    """Values of a worksheet as a 2-d object array, `None` for empty cells,
+    without the empty rows and columns at its end.
+    """
+    workbook = openpyxl.load_workbook(fpath, read_only=True, data_only=True)
+    try:
+        try:
+            ws = workbook[sheet] if isinstance(sheet, str) \
+                else workbook.worksheets[sheet]
+        except (KeyError, IndexError):
+            raise SheetNotFoundException(
+                f"No worksheet {sheet!r} in {fpath}")
+        rows = [row for row in ws.iter_rows(values_only=True)]
+    finally:
+        workbook.close()
+
+    width = max((len(r) for r in rows), default=0)
+    values = np.empty((len(rows), width), dtype=object)
+    for i, row in enumerate(rows):
+        values[i, :len(row)] = row
+
+    filled = values != None  # noqa: E711, elementwise
+    nrows = filled.any(axis=1).nonzero()[0]
+    ncols = filled.any(axis=0).nonzero()[0]
+    return values[:nrows[-1] + 1 if len(nrows) else 0,
+                  :ncols[-1] + 1 if len(ncols) else 0]
+
+
+def _pad(values: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    padded = np.empty((rows, cols), dtype=object)
+    padded[:values.shape[0], :values.shape[1]] = values
+    return padded
+
+
+_to_number = np.frompyfunc(
+    lambda v: float(v) if isinstance(v, (int, float))
+    and not isinstance(v, bool) else math.nan, 1, 1)
+
+
+def _numbers(values: np.ndarray) -> np.ndarray:
+    """Numeric values as floats, NaN elsewhere."""
+    return _to_number(values).astype(float) if values.size \
+        else np.zeros(values.shape)
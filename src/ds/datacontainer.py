@@ -1,118 +1,237 @@
 import logging
-from collections import namedtuple
-from datetime import datetime, time, timedelta
+from datetime import time
 
+import numpy as np
 import pandas as pd
 
+from common import const
 from common.config import Config
-from common.decorators import singleton
-from ds.timeranges import DateRange
-from pyfx import read
+from ds.minutegrid import MinuteGrid
+from ds.timeranges import DayTimeRange
+from pyfx import fixedpoint, kernels, read
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
 
-DSTConfig = namedtuple('DSTConfig', 'mask timerange')
+class DataContainer:
+    """
+    Holds a currency pair's source price frames and the views derived from
+    them. Each view is computed on first access and memoized, so views (and
+    sources) that no metric uses cost nothing.
 
+    Source minute data may only hold the minutes of the day that the
+    metrics read (see `Config.required_minutes`).
 
-class DataContainer:
+    Source minute prices may be in fixed point (see `pyfx.fixedpoint`). The
+    minute data and its grid are then memoized in fixed point only, and
+    `full_minute_price_df` expands it into floats on each access.
+    """
 
     def __init__(self, price_dfs, currency_pair_name: str, config: Config):
+        self.__price_dfs = price_dfs
+        self.__cp_name = currency_pair_name
+        self.__config = config
+        self.__price_scale = fixedpoint.price_scale(currency_pair_name)
+
+        self.__fix_price_df = None
+        self.__daily_price_df = None
+        self.__held_minute_price_df = None
+        self.__full_minute_price_df = None
+        self.__minute_price_df = None
+        self.__day_codes = None
+        self.__minutes_of_day = None
+        self.__minute_grid = None
 
-        self.__fix_price_df = price_dfs[read.FIX]\
-            .loc[config.date_range.start_date:config.date_range.end_date]
-            
-        self.__daily_price_df = price_dfs[read.DAILY]
+    @property
+    def cp_name(self) -> str:
+        return self.__cp_name
 
-        self.__full_minute_price_df = price_dfs[read.MINUTE]\
-            .loc[config.date_range.start_date:config.date_range.end_date]
+    @property
+    def price_scale(self) -> int:
+        """Fixed-point units per unit of price of the currency pair."""
+        return self.__price_scale
 
-        self._adjust_for_time_shift(config=config)
-        self.__minute_price_df = self._adjust_for_dst(config=config)
+    @property
+    def has_compact_prices(self) -> bool:
+        """Whether the source minute prices are in fixed point."""
+        return fixedpoint.is_compact(self._source(read.MINUTE))
 
     @property
     def fix_price_df(self) -> pd.DataFrame:
+        if self.__fix_price_df is None:
+            self.__fix_price_df = self._in_date_range(self._source(read.FIX))
         return self.__fix_price_df
 
     @property
     def daily_price_df(self) -> pd.DataFrame:
+        if self.__daily_price_df is None:
+            self.__daily_price_df = self._source(read.DAILY)
         return self.__daily_price_df
 
     @property
     def full_minute_price_df(self) -> pd.DataFrame:
-        return self.__full_minute_price_df
+        """Minute prices within the date range, time shifted if configured."""
+        if self.__full_minute_price_df is not None:
+            return self.__full_minute_price_df
+
+        df = self.held_minute_price_df
+        if fixedpoint.is_compact(df):
+            # Not memoized, so that only the fixed-point prices are held.
+            return fixedpoint.expand(df, self.__price_scale)
+
+        self.__full_minute_price_df = df
+        return df
+
+    @property
+    def held_minute_price_df(self) -> pd.DataFrame:
+        """`full_minute_price_df` as held, i.e. with prices in fixed point if
+        the source's are.
+        """
+        if self.__held_minute_price_df is None:
+            self.__held_minute_price_df = self._adjust_for_time_shift(
+                self._in_date_range(self._source(read.MINUTE)),
+                config=self.__config)
+        return self.__held_minute_price_df
+
+    def minute_values(self, metric: str) -> np.ndarray:
+        """Float prices of one column of `full_minute_price_df`, without
+        expanding the others from fixed point.
+        """
+        values = self.held_minute_price_df[metric].values
+        if values.dtype == np.int32:
+            return fixedpoint.to_float(values, self.__price_scale)
+        return values
 
     @property
     def minute_price_df(self) -> pd.DataFrame:
+        """Minute prices within the time range, adjusted for DST."""
+        if self.__minute_price_df is None:
+            self.__minute_price_df = self._adjust_for_dst(config=self.__config)
         return self.__minute_price_df
 
-    def _adjust_for_time_shift(self, config: Config) -> pd.DataFrame:
+    @property
+    def day_codes(self) -> np.ndarray:
+        """int32 day code (days since 1970-01-01) of each row of
+        `full_minute_price_df`, for grouping by day without `index.date`.
+        """
+        if self.__day_codes is None:
+            self.__day_codes = kernels.day_codes(
+                self.held_minute_price_df.index)
+        return self.__day_codes
+
+    @property
+    def minutes_of_day(self) -> np.ndarray:
+        """int16 minute of the day of each row of `full_minute_price_df`, for
+        filtering by time of day without `index.time`.
+        """
+        if self.__minutes_of_day is None:
+            self.__minutes_of_day = kernels.minute_of_day(
+                self.held_minute_price_df.index)
+        return self.__minutes_of_day
+
+    @property
+    def minute_grid(self) -> MinuteGrid:
+        """Dense day x minute-of-day grid of `full_minute_price_df`'s OHLC
+        prices. Built on first access.
+        """
+        if self.__minute_grid is None:
+            df = self.held_minute_price_df
+            self.__minute_grid = MinuteGrid(
+                df, [const.OPEN, const.HIGH, const.LOW, const.CLOSE],
+                codes=self.day_codes, minutes=self.minutes_of_day,
+                price_scale=self.__price_scale
+                if fixedpoint.is_compact(df) else None)
+        return self.__minute_grid
+
+    def _source(self, src) -> pd.DataFrame:
+        if self.__price_dfs is None or src not in self.__price_dfs:
+            raise SourceNotLoadedError(src)
+        return self.__price_dfs[src]
+
+    def _in_date_range(self, df: pd.DataFrame) -> pd.DataFrame:
+        date_range = self.__config.date_range
+        return df.loc[date_range.start_date:date_range.end_date]
+
+    @staticmethod
+    def _adjust_for_time_shift(df: pd.DataFrame,
+                               config: Config) -> pd.DataFrame:
         if config.should_time_shift:
             hourdelta = config.time_shift
-            self.__full_minute_price_df.index = (
-                self.__full_minute_price_df.index
-                + pd.DateOffset(hours=hourdelta))
-
-    def _filter_minute_data(self, config: Config):
-        return self.full_minute_price_df\
-            .between_time(config.time_range.start_time,
-                          config.time_range.end_time)
+            df.index = df.index + pd.Timedelta(hours=hourdelta)
+        return df
 
     def _adjust_for_dst(self, config: Config) -> pd.DataFrame:
+        """Minute prices within the configured time range, adjusted for DST.
 
-        filtered_df = self.full_minute_price_df\
-            .between_time(config.time_range.start_time,
-                          config.time_range.end_time)
+        Each minute is moved by the hour offset of the DST period its day
+        falls in: an hour back in hour ahead periods, an hour forward in hour
+        delay periods. Offsets are looked up for all minutes in one pass, so
+        the cost does not grow with the number of periods.
+        """
+        df = self.held_minute_price_df
+        index = df.index
 
         if config.should_enable_daylight_saving_mode:
+            offsets = self._dst_hour_offsets(self.day_codes, config)
+            if offsets.any():
+                index = index + pd.to_timedelta(offsets, unit='h')
 
-            for ahead_period in config.dst_hour_ahead_periods:
-                filtered_df = self._adjust_for_ahead_period(
-                    filtered_df, ahead_period, config)
-
-        return filtered_df
-
-    def _adjust_for_ahead_period(self, filtered_df: pd.DataFrame,
-                                 ahead_period: DateRange,
-                                 config: Config) -> pd.DataFrame:
-
-        mask = (
-            (self.full_minute_price_df['date'] >=
-                self._to_datetime(ahead_period.start_date))
-            & (self.full_minute_price_df['date'] <=
-                self._to_datetime(ahead_period.end_date))
-        )
+        mask = self._within_time_range(index, config.time_range)
+        filtered_df = df[mask]
+        filtered_df.index = index[mask]
 
-        df_segment = self.full_minute_price_df.loc[mask].copy()
-        df_segment = df_segment\
-            .between_time(config.dst_hour_ahead_time_range.start_time,
-                          config.dst_hour_ahead_time_range.end_time)
-
-        df_segment.index = (df_segment.index + pd.DateOffset(hours=-1))
-
-        filtered_df.loc[mask] = df_segment
+        if not filtered_df.index.is_monotonic_increasing:
+            filtered_df = filtered_df.sort_index(kind='mergesort')
 
+        if fixedpoint.is_compact(filtered_df):
+            filtered_df = fixedpoint.expand(filtered_df, self.__price_scale)
         return filtered_df
 
     @staticmethod
-    def _to_datetime(date: datetime.date) -> datetime:
-        """Convert date to datetime."""
-        return datetime.combine(date, datetime.min.time())
-
-    @staticmethod
-    def _should_normalize_time_index(start_time: datetime.time,
-                                     config: Config) -> bool:
-        return start_time != config.time_range.start_time
-
-    @staticmethod
-    def _should_decr_hour(start_time: datetime.time,
-                          config: Config) -> bool:
-        """Should decrement hour if the time is within the hour_ahead range"""
-        return start_time == config.dst_hour_ahead_time_range.start_time
+    def _dst_hour_offsets(codes: np.ndarray, config: Config) -> np.ndarray:
+        """Hour offset of each day code in `codes`, by the DST period the day
+        falls in.
+        """
+        periods = ([(p, -1) for p in config.dst_hour_ahead_periods]
+                   + [(p, 1) for p in config.dst_hour_delay_periods])
+
+        def code(date):
+            return np.datetime64(date, 'D').astype(np.int64)
+
+        return kernels.period_values(
+            codes,
+            starts=np.array([code(p.start_date) for p, _ in periods],
+                            dtype=np.int64),
+            ends=np.array([code(p.end_date) for p, _ in periods],
+                          dtype=np.int64),
+            values=np.array([offset for _, offset in periods],
+                            dtype=np.int64))
 
     @staticmethod
-    def _should_incr_hour(start_time: datetime.time,
-                          config: Config) -> bool:
-        """Should increment hour if the time is within the hour_behind range"""
-        return start_time == config.dst_hour_behind_time_range.start_time
+    def _within_time_range(index: pd.DatetimeIndex,
+                           time_range: DayTimeRange) -> np.ndarray:
+        """Flags timestamps whose time of day is within `time_range`, both
+        ends inclusive, as in `between_time`.
+        """
+        def nanos(t: time) -> int:
+            return (((t.hour * 60 + t.minute) * 60 + t.second) * 10 ** 6
+                    + t.microsecond) * 1000
+
+        tod = index.values.astype(np.int64) % (24 * 3600 * 10 ** 9)
+        start = nanos(time_range.start_time)
+        end = nanos(time_range.end_time)
+        if start <= end:
+            return (tod >= start) & (tod <= end)
+        return (tod >= start) | (tod <= end)
+
+
+class SourceNotLoadedError(KeyError):
+    """Raised when a view needs a source price frame that was not loaded,
+    e.g. because no enabled metric requires it.
+    """
+
+    def __init__(self, src):
+        super(SourceNotLoadedError, self).__init__(
+            f"Source `{src}` was not loaded. Check that the metrics using "
+            "it are enabled in the configuration.")
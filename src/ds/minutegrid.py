@@ -0,0 +1,164 @@
+from datetime import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from pyfx import fixedpoint, kernels
+
+MINUTES_PER_DAY = 24 * 60
+
+
+class MinuteGrid:
+    """
+    Dense day x minute-of-day x metric array of minute prices.
+
+    Every day in the source frame gets a row with a column for each minute of
+    the day that has a bar on any day, i.e. only the minutes kept if the
+    source was pruned (see `Config.required_minutes`); minutes without a bar
+    hold NaN and are flagged in `has_bar`. Minutes of the day are mapped to
+    columns through a 1440-entry table, so "price at HH:MM on every day" and
+    "window HH:MM-HH:MM on every day" become O(days) slices instead of scans
+    over every minute bar.
+
+    Fixed-point prices are held as is, with `fixedpoint.MISSING` where there
+    is no bar; `prices`, `window` and `at` return float prices, expanding
+    only the slice gathered.
+
+    Args: a minute price frame indexed by datetime, the metric columns to
+    hold (e.g. Open, High, Low, Close), optionally the frame's day codes
+    and minutes of day, if already computed, and the scale of its prices if
+    they are in fixed point (see `pyfx.fixedpoint`)
+    """
+
+    def __init__(self, minute_df: pd.DataFrame, metrics: List[str],
+                 codes: np.ndarray = None, minutes: np.ndarray = None,
+                 price_scale: int = None):
+        if codes is None:
+            codes = kernels.day_codes(minute_df.index)
+        if minutes is None:
+            minutes = kernels.minute_of_day(minute_df.index)
+
+        self.__days, day_idx = np.unique(codes, return_inverse=True)
+        self.__minutes, col_idx = np.unique(minutes, return_inverse=True)
+        self.__metrics = list(metrics)
+        self.__price_scale = price_scale
+
+        # Column of each minute of the day, -1 for those without a column.
+        self.__column = np.full(MINUTES_PER_DAY, -1, dtype=np.int16)
+        self.__column[self.__minutes] = np.arange(len(self.__minutes))
+
+        shape = (len(self.__days), len(self.__minutes))
+        self.__values = np.full(shape + (len(self.__metrics),),
+                                fixedpoint.MISSING, dtype=np.int32) \
+            if price_scale else np.full(shape + (len(self.__metrics),),
+                                        np.nan)
+        for i, metric in enumerate(self.__metrics):
+            self.__values[day_idx, col_idx, i] = minute_df[metric].values
+
+        self.__has_bar = np.zeros(shape, dtype=bool)
+        self.__has_bar[day_idx, col_idx] = True
+
+    @property
+    def days(self) -> np.ndarray:
+        """Day codes (days since 1970-01-01) of the grid's rows."""
+        return self.__days
+
+    @property
+    def dates(self) -> np.ndarray:
+        """`datetime.date` of each of the grid's rows."""
+        return kernels.codes_to_dates(self.__days)
+
+    @property
+    def minutes(self) -> np.ndarray:
+        """Minute-of-day of each of the grid's columns."""
+        return self.__minutes
+
+    @property
+    def metrics(self) -> List[str]:
+        return list(self.__metrics)
+
+    @property
+    def values(self) -> np.ndarray:
+        """The (days, columns, metrics) price array as held, i.e. in fixed
+        point if the source's prices are; NaN, or `fixedpoint.MISSING`, where
+        there is no bar.
+        """
+        return self.__values
+
+    @property
+    def has_bar(self) -> np.ndarray:
+        """The (days, columns) array flagging minutes that have a bar."""
+        return self.__has_bar
+
+    def metric_index(self, metric: str) -> int:
+        return self.__metrics.index(metric)
+
+    def bars(self, minutes: List[int], days: np.ndarray = None) -> np.ndarray:
+        """(days, minutes) flags of the bars at `minutes` of the day, on the
+        rows selected by `days` (a mask or positions), by default all.
+        """
+        return self._gather(self.__has_bar, False, self._rows(days),
+                            minutes)
+
+    def prices(self, minutes: List[int], metrics: List[str],
+               days: np.ndarray = None) -> np.ndarray:
+        """(days, minutes, metrics) float prices at `minutes` of the day, on
+        the rows selected by `days` (a mask or positions), by default all;
+        NaN where there is no bar.
+        """
+        values = self._gather(
+            self.__values,
+            fixedpoint.MISSING if self.__price_scale else np.nan,
+            self._rows(days), minutes,
+            [self.metric_index(m) for m in metrics])
+        if self.__price_scale:
+            return fixedpoint.to_float(values, self.__price_scale)
+        return values
+
+    def window(self, start_time: time, end_time: time):
+        """Prices and bar flags of every day between `start_time` and
+        `end_time`, both inclusive.
+
+        Returns
+        -------
+        A (days, minutes, metrics) float array of prices and a (days, minutes)
+        array of bar flags.
+        """
+        minutes = np.arange(kernels.minute_of_time(start_time),
+                            kernels.minute_of_time(end_time) + 1)
+        return self.prices(minutes, self.__metrics), self.bars(minutes)
+
+    def at(self, t: time) -> pd.DataFrame:
+        """Prices at time `t` of every day that has a bar at `t`, indexed by
+        `datetime.date`.
+        """
+        minute = [kernels.minute_of_time(t)]
+        days = self.bars(minute)[:, 0]
+        return pd.DataFrame(self.prices(minute, self.__metrics, days)[:, 0],
+                            index=self.dates[days], columns=self.__metrics)
+
+    def _gather(self, array: np.ndarray, fill, rows: np.ndarray,
+                minutes: List[int], *rest) -> np.ndarray:
+        """`array` at `rows` and the columns of `minutes` (and at `rest` on
+        further axes); `fill` at minutes without a column.
+        """
+        cols = self.__column[np.asarray(minutes, dtype=int)]
+        present = cols >= 0
+        if present.all():
+            return array[np.ix_(rows, cols, *rest)]
+
+        ans = np.full((len(rows), len(cols)) + tuple(len(r) for r in rest),
+                      fill, dtype=array.dtype)
+        ans[:, present] = array[np.ix_(rows, cols[present], *rest)]
+        return ans
+
+    def _rows(self, days: np.ndarray) -> np.ndarray:
+        if days is None:
+            return np.arange(len(self.__days))
+        days = np.asarray(days)
+        return np.flatnonzero(days) if days.dtype == bool else days
+
+    def __repr__(self):
+        return (f"MinuteGrid({len(self.__days)} days x "
+                f"{len(self.__minutes)} minutes x {self.__metrics})")
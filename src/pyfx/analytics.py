@@ -1,12 +1,14 @@
 from datetime import time
 from typing import List
 
+import numpy as np
 import pandas as pd
 
-from common import const
+from common import const, utils
 from common.decorators import timer
 from ds.datacontainer import DataContainer
 from ds.timeranges import DayTimeRange
+from pyfx import fixedpoint, kernels
 
 __all__ = [
     'include_ohlc',
@@ -51,46 +53,34 @@ def include_avgs(data: DataContainer, periods: List):
          timestamp, not 8:30AM.)
     """
 
-    def avg_includer(period) -> pd.DataFrame:
-        """Internal logic for including average prices."""
-        df = pd.DataFrame()
-        start_time = period.start_time
-        end_time = period.end_time
-        filtered = data.full_minute_price_df.between_time(start_time, end_time)
-        filtered.insert(loc=1, column='Time', value=filtered.index.time)
-        filtered.insert(loc=1, column='Date', value=filtered.index.date)
-
-        min_time_mask = (
-            filtered['Close'] ==
-            filtered.groupby(filtered.index.date).Close.transform(min)
-        )
-
-        max_time_mask = (
-            filtered['Close'] ==
-            filtered.groupby(filtered.index.date).Close.transform(max)
-        )
-
-        df['Mean'] = filtered.groupby(
-            filtered.index.date).Close.mean().round(5)
+    minute_index = data.held_minute_price_df.index
+    stats = kernels.window_stats(values=data.minute_values('Close'),
+                                 codes=data.day_codes,
+                                 minutes=data.minutes_of_day,
+                                 windows=periods)
 
-        min_series = filtered[min_time_mask]
-        min_series.index = min_series.index.date
-        min_series = min_series[~min_series.index.duplicated(keep='last')]
+    def time_at(positions) -> np.ndarray:
+        """Time of day of each row position, NaN where there is none."""
+        times = np.full(len(positions), np.nan, dtype=object)
+        found = positions >= 0
+        times[found] = minute_index[positions[found]].time
+        return times
 
-        max_series = filtered[max_time_mask]
-        max_series.index = max_series.index.date
-        max_series = max_series[~max_series.index.duplicated(keep='last')]
-
-        df.insert(loc=1, column='TimeForMin', value=min_series['Time'])
-        df.insert(loc=2, column='TimeForMax', value=max_series['Time'])
+    def avg_includer(period, stat) -> pd.DataFrame:
+        """Internal logic for including average prices."""
+        df = pd.DataFrame(index=kernels.codes_to_dates(stat.days))
+        df['Mean'] = np.round(stat.mean, 5)
+        df['TimeForMin'] = time_at(stat.argmin)
+        df['TimeForMax'] = time_at(stat.argmax)
 
         df.columns = pd.MultiIndex.from_product([
-            ['{}_{}'.format(str(start_time), str(end_time))], df.columns
+            ['{}_{}'.format(str(period.start_time), str(period.end_time))],
+            df.columns
         ])
 
         return df
 
-    outputs = map(avg_includer, periods)
+    outputs = map(avg_includer, periods, stats)
     df_master = pd.concat(outputs, axis=1)
     return df_master
 
@@ -99,59 +89,103 @@ thresholds = [10, 15, 20, 25, 30, 35, 40]
 
 
 @timer
-def include_crossovers(data: DataContainer, thresholds=thresholds):
+def include_crossovers(data: DataContainer, thresholds=thresholds,
+                       cp_name: str = None):
     """
     crossover: v < threshold at `t` and v > threshold at `t-1`
     for each crossover in day: ctr += 1
+
+    Thresholds are in pips of `cp_name` (see `utils.pip_factor`) above and
+    below the day's open. Each minute is matched to its day's open through
+    integer day codes, and all thresholds are evaluated at once as a
+    (minutes x thresholds) comparison reduced straight to per-day counts.
     """
-    daily_df = data.daily_price_df.copy()
-    minute_df = data.full_minute_price_df.copy()
+    daily_df = data.daily_price_df
+
+    # Broadcast each day's open onto its minutes; minutes of days without a
+    # daily bar are left out.
+    daily_codes = kernels.day_codes(daily_df.index)
+    order = np.argsort(daily_codes, kind='stable')
+    daily_codes = daily_codes[order]
+    daily_open = daily_df['Open'].values[order]
+
+    codes = data.day_codes
+    matched = np.searchsorted(daily_codes, codes).clip(
+        max=max(len(daily_codes) - 1, 0))
+    has_day = (daily_codes[matched] == codes) if len(daily_codes) \
+        else np.zeros(len(codes), dtype=bool)
+
+    def shifted(values):
+        return np.r_[np.nan, values][:-1][has_day]
+
+    high, low = data.minute_values('High'), data.minute_values('Low')
+    high_bf, low_bf = shifted(high), shifted(low)
+    high, low = high[has_day], low[has_day]
+    open_d = daily_open[matched[has_day]]
+
+    trading_above = data.minute_values('Open')[has_day] > open_d
+    trading_below = ~trading_above
 
-    minute_df['High_bf'] = minute_df.High.shift(1)
-    minute_df['Low_bf'] = minute_df.Low.shift(1)
+    pips = np.asarray(thresholds, dtype=float) / utils.pip_factor(cp_name)
+    upper = open_d[:, None] + pips
+    lower = open_d[:, None] - pips
 
-    daily_df['date'] = daily_df.index.date
-    minute_df['date'] = minute_df.index.date
-    minute_df['datetime'] = minute_df.index
-    minute_df = pd.merge(daily_df, minute_df, on='date', suffixes=('_d', ''))
-    minute_df = minute_df.set_index('datetime')
+    with np.errstate(invalid='ignore'):
+        cross_up = (trading_above[:, None]
+                    & (high[:, None] > upper) & (high_bf[:, None] < upper))
+        cross_dn = (trading_below[:, None]
+                    & (low[:, None] < lower) & (low_bf[:, None] > lower))
 
-    trading_above = minute_df['Open'] > minute_df['Open_d']
-    trading_below = ~trading_above
+    days, day_idx = np.unique(codes[has_day], return_inverse=True)
+
+    def count(crossed):
+        return np.bincount(day_idx[crossed], minlength=len(days))
 
-    def ct_high(pip):
-        return ((minute_df['High'] > minute_df['t_{}'.format(pip)]) &
-                (minute_df['High_bf'] < minute_df['t_{}'.format(pip)]))
-
-    def ct_low(pip):
-        return ((minute_df['Low'] < minute_df['t_n{}'.format(pip)]) &
-                (minute_df['Low_bf'] > minute_df['t_n{}'.format(pip)]))
-
-    for t in thresholds:
-        t_pr = t / 10000
-        minute_df['t_n{}'.format(t)] = minute_df['Open_d'] - t_pr
-        minute_df['t_{}'.format(t)] = minute_df['Open_d'] + t_pr
-        minute_df['a_n{}'.format(t)] = False
-        minute_df['a_{}'.format(t)] = False
-
-        msk_h = ct_high(t)
-        msk_l = ct_low(t)
-        minute_df.at[trading_above & msk_h, 'a_{}'.format(t)] = True
-        minute_df.at[trading_below & msk_l, 'a_n{}'.format(t)] = True
-
-    raw_ans = minute_df.loc[:, minute_df.columns.str.startswith('a_')]
-    days = raw_ans.groupby(minute_df.index.date)
-    ans = days.agg(['sum'])
+    counts = {}
+    for i, t in enumerate(thresholds):
+        counts[('a_n{}'.format(t), 'sum')] = count(cross_dn[:, i])
+        counts[('a_{}'.format(t), 'sum')] = count(cross_up[:, i])
+
+    ans = pd.DataFrame(counts, index=kernels.codes_to_dates(days))
+    ans.columns = pd.MultiIndex.from_tuples(counts.keys())
     return ans
 
 
+def pip_extrema(data: DataContainer) -> pd.DataFrame:
+    """Price and time of each day's (latter, on ties) max and min close in
+    the time range, indexed by day.
+    """
+    df_min = data.minute_price_df
+    close = df_min['Close'].values
+    extrema = kernels.day_extrema(close, kernels.day_codes(df_min.index))
+
+    df = pd.DataFrame(
+        index=pd.DatetimeIndex(extrema.days.astype('datetime64[D]')))
+    for state, positions in [('Up', extrema.argmax),
+                             ('Down', extrema.argmin)]:
+        found = positions >= 0
+        prices = np.full(len(positions), np.nan)
+        prices[found] = close[positions[found]]
+        times = np.full(len(positions), np.nan, dtype=object)
+        times[found] = df_min.index[positions[found]].time
+        df['PriceAtMaxPip{}'.format(state)] = prices
+        df['TimeAtMaxPip{}'.format(state)] = times
+    return df
+
+
 @timer
 def include_max_pips(data: DataContainer,
                      benchmark_times: List[time] = None,
-                     pdfx: bool = False, cp_name: str = None):
+                     pdfx: bool = False, cp_name: str = None,
+                     extrema: pd.DataFrame = None):
     """
     For each day, find the MIN and MAX of in the time period.
 
+    The per-day extrema are computed once (or taken from `extrema`, as
+    returned by `pip_extrema`, when shared across calls), and the benchmark
+    prices of all `benchmark_times` are gathered in one lookup on the minute
+    grid, so every benchmark block is emitted together.
+
     Algorithm
     ---------
     MaxPipUp = pip(MAX((MAX(TP) - BT), 0))
@@ -175,41 +209,29 @@ def include_max_pips(data: DataContainer,
 
     assert validate_args()
 
-    df_min = data.minute_price_df   \
-        .copy()                     \
-        .drop(columns=['date', 'Open', 'High', 'Low'])
-
-    df_full_min = data.full_minute_price_df   \
-        .copy()                               \
-        .drop(columns=['date', 'Open', 'High', 'Low'])
+    df_extrema = pip_extrema(data) if extrema is None else extrema
 
-    def pip_extrema(mask, state: str):
-        assert state == 'Up' or state == 'Down' or state == 'Dn'
+    # Pips are those of the currency pair, e.g. 0.01 for pairs quoted in JPY.
+    factor = utils.pip_factor(cp_name or data.cp_name)
 
-        def inner():
-            df = df_min[mask]
-            df.columns = ['PriceAtMaxPip{}'.format(state)]
-            df.insert(loc=1, column='TimeAtMaxPip{}'.format(state),
-                      value=df.index.time)
-            df.insert(loc=1, column='date', value=df.index.date)
-            df.drop_duplicates(subset=['date'], keep='last', inplace=True)
-            df.set_index('date', inplace=True)
-            return df
+    def pips(price, benchmark):
+        if data.has_compact_prices:
+            # Exact, as prices from fixed point are whole 1/10 pips.
+            return fixedpoint.pip_difference(price, benchmark,
+                                             data.price_scale)
+        return np.round(factor * (np.asarray(price) -
+                                  np.asarray(benchmark)), 2)
 
-        return inner
-
-    def pip_mask(func):
-        return (
-            df_min['Close'] ==
-            df_min.Close.groupby(df_min.index.date).transform(func)
-        )
-
-    df_maxpip = pip_extrema(pip_mask(max), 'Up')()
-    df_minpip = pip_extrema(pip_mask(min), 'Down')()
+    def max_pips(price_up, price_dn, benchmark):
+        mpipup = pips(price_up, benchmark)
+        mpipup[mpipup < 0] = 0
+        mpipdn = pips(price_dn, benchmark)
+        mpipdn[mpipdn > 0] = 0
+        return mpipup, mpipdn
 
     def fix_benchmark() -> pd.DataFrame:
         df = pd.DataFrame()
-        f_cpname = '{}-{}'.format(cp_name[:3], cp_name[3:])
+        f_cpname = utils.fix_column(cp_name)
 
         # load data
         df['CDFX'] = data.fix_price_df[f_cpname]
@@ -217,82 +239,102 @@ def include_max_pips(data: DataContainer,
 
         # fill NaNs and drop weekends
         df.dropna(how='all', inplace=True)
-        df.BenchmarkPrice.fillna(method='ffill', inplace=True)
+        df['BenchmarkPrice'] = df['BenchmarkPrice'].fillna(method='ffill')
         df.dropna(subset=['CDFX'], inplace=True)
 
         return df
 
-    def normal_benchmark(bt: time):
-        benchmark_data = df_full_min.at_time(bt)['Close'].to_frame()
-        benchmark_data.columns = ['BenchmarkPrice']
-        benchmark_data.index = benchmark_data.index.date
-        return benchmark_data
-
-    def append_max_pips(df: pd.DataFrame) -> pd.DataFrame:
-        mpipup = (10000 * (
-            df['PriceAtMaxPipUp'] - df['BenchmarkPrice'])).round(2)
-        mpipup[mpipup < 0] = 0
-        mpipdn = (10000 * (
-            df['PriceAtMaxPipDown'] - df['BenchmarkPrice'])).round(2)
-        mpipdn[mpipdn > 0] = 0
-
+    def pdfx_block() -> pd.DataFrame:
+        df = fix_benchmark().join(df_extrema)
+        mpipup, mpipdn = max_pips(df['PriceAtMaxPipUp'],
+                                  df['PriceAtMaxPipDown'],
+                                  df['BenchmarkPrice'])
         df.insert(loc=1, column='MaxPipUp', value=mpipup)
         df.insert(loc=4, column='MaxPipDown', value=mpipdn)
+        df.columns = pd.MultiIndex.from_product([['PDFX'], df.columns])
         return df
 
-    def finder_strategy(bt=None):
-        def inner(bt):
-            bt_str = str(bt)
-            df = pd.concat([df_maxpip, df_minpip], axis=1)
-            if isinstance(bt, time):
-                benchmark_data = normal_benchmark(bt)
-            else:
-                benchmark_data = fix_benchmark()
-            df = benchmark_data.join(df)
-            df = append_max_pips(df)
-            df.columns = pd.MultiIndex.from_product([[bt_str], df.columns])
-            return df
-        return inner
-
-    finder = finder_strategy()
-    finder_pdfx = finder_strategy('PDFX')
+    def benchmark_blocks() -> pd.DataFrame:
+        grid = data.minute_grid
+        minutes = [kernels.minute_of_time(bt) for bt in benchmark_times]
+
+        # Benchmark prices of every benchmark time, in one (days, bts) slice.
+        has_bar = grid.bars(minutes)
+        days = has_bar.any(axis=1)
+        has_bar = has_bar[days]
+        benchmark = grid.prices(minutes, ['Close'], days)[:, :, 0]
+        benchmark[~has_bar] = np.nan
+
+        extrema = df_extrema.reindex(
+            pd.DatetimeIndex(grid.days[days].astype('datetime64[D]')))
+        price_up = extrema['PriceAtMaxPipUp'].values[:, None]
+        price_dn = extrema['PriceAtMaxPipDown'].values[:, None]
+        mpipup, mpipdn = max_pips(price_up, price_dn, benchmark)
+
+        def on_bar(values, i):
+            """`values`, blanked on the days without a bar at `bt`."""
+            values = values.copy()
+            values[~has_bar[:, i]] = np.nan
+            return values
+
+        columns = {}
+        for i, bt in enumerate(benchmark_times):
+            block = {
+                'BenchmarkPrice': benchmark[:, i],
+                'MaxPipUp': mpipup[:, i],
+                'PriceAtMaxPipUp': on_bar(price_up[:, 0], i),
+                'TimeAtMaxPipUp':
+                    on_bar(extrema['TimeAtMaxPipUp'].values, i),
+                'MaxPipDown': mpipdn[:, i],
+                'PriceAtMaxPipDown': on_bar(price_dn[:, 0], i),
+                'TimeAtMaxPipDown':
+                    on_bar(extrema['TimeAtMaxPipDown'].values, i),
+            }
+            columns.update({(str(bt), k): v for k, v in block.items()})
+
+        df = pd.DataFrame(columns, index=grid.dates[days])
+        df.columns = pd.MultiIndex.from_tuples(columns.keys())
+        return df
 
     if pdfx:
-        df_master = finder_pdfx('PDFX')
+        df_master = pdfx_block()
     else:
-        maxpips = map(finder, benchmark_times)
-        df_master = pd.concat(maxpips, axis=1)
+        df_master = benchmark_blocks()
 
     return df_master
 
 
 @timer
 def include_minute_data(data: DataContainer, sections: List) -> pd.DataFrame:
+    """Include the prices at each minute of the sections provided.
+
+    Each section is gathered from the minute grid in one slice, then reshaped
+    into days x (minute, metric) columns named `HH:MM:SS_Metric`.
+    """
+    grid = data.minute_grid
 
     def include(section):
         start_time = section['range_start']
         end_time = section['range_end']
-        timerange = DayTimeRange(start_time, end_time)
-
-        def get_min_data(t: time, metric_type):
-            df = data.full_minute_price_df.at_time(t)[metric_type].to_frame()
-            df.index = df.index.date
-            df.columns = [f'{t}_{metric_type}']
-            return df
-
-        outs = []
-        for minute in timerange:
-            if isinstance(section['include'], list):
-                for metric_type in section['include']:
-                    outs.append(get_min_data(minute, metric_type))
-            elif section['include'] == const.OHLC:
-                for metric_type in ['Open', 'High', 'Low', 'Close']:
-                    outs.append(get_min_data(minute, metric_type))
-            else:
-                outs.append(get_min_data(minute, section['include']))
-
-        df = pd.concat(outs, axis=1)
-        return df
+        minutes = list(DayTimeRange(start_time, end_time))
+
+        if isinstance(section['include'], list):
+            metric_types = section['include']
+        elif section['include'] == const.OHLC:
+            metric_types = ['Open', 'High', 'Low', 'Close']
+        else:
+            metric_types = [section['include']]
+
+        minute_idx = [kernels.minute_of_time(t) for t in minutes]
+
+        has_bar = grid.bars(minute_idx).any(axis=1)
+        values = grid.prices(minute_idx, metric_types, has_bar)
+
+        return pd.DataFrame(
+            values.reshape(len(values), len(minute_idx) * len(metric_types)),
+            index=grid.dates[has_bar],
+            columns=[f'{t}_{metric_type}'
+                     for t in minutes for metric_type in metric_types])
 
     outputs = map(include, sections)
     df_master = pd.concat(outputs, axis=1)
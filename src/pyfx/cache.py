@@ -0,0 +1,181 @@
+"""
+On-disk cache for processed source dataframes.
+
+Each entry is a directory holding one `.npy` file per column (plus one for
+the index) and a small `meta.json` describing how to reassemble the frame.
+Entries are keyed on the source file's path, modification time and size
+(optionally a content hash), the reader that produced the frame, and that
+reader's processing version, so a stale entry is never served.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+__all__ = ['FrameCache']
+
+logger = logging.getLogger(__name__)
+
+_META_FNAME = 'meta.json'
+_INDEX_FNAME = 'index.npy'
+
+
+class FrameCache:
+    """Columnar, size-bounded cache of processed dataframes.
+
+    Parameters
+    ----------
+        cache_dir : directory housing the cache entries
+        max_bytes : total size the cache may occupy on disk; least recently
+            used entries are evicted once it is exceeded
+        hash_contents : if `True`, the source file's content hash is part of
+            the key in addition to its modification time and size
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int,
+                 hash_contents: bool = False):
+        self.__cache_dir = os.path.abspath(cache_dir)
+        self.__max_bytes = max_bytes
+        self.__hash_contents = hash_contents
+        os.makedirs(self.__cache_dir, exist_ok=True)
+
+    @property
+    def cache_dir(self) -> str:
+        return self.__cache_dir
+
+    @property
+    def max_bytes(self) -> int:
+        return self.__max_bytes
+
+    def key(self, fpath: str, reader: str, version: int, **params) -> str:
+        """Builds the cache key of a processed source file.
+
+        `params` covers any reader argument that changes the processed
+        output (e.g. the currency pair name for daily data).
+        """
+        stat = os.stat(fpath)
+        parts = {
+            'fpath': os.path.realpath(fpath),
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'reader': reader,
+            'version': version,
+            'params': {k: str(v) for k, v in sorted(params.items())},
+        }
+        if self.__hash_contents:
+            parts['sha1'] = self._hash_file(fpath)
+        blob = json.dumps(parts, sort_keys=True).encode('utf-8')
+        return hashlib.sha1(blob).hexdigest()
+
+    def load(self, key: str) -> Optional[pd.DataFrame]:
+        """Returns the cached frame stored under `key`, or `None` on miss."""
+        entry = self._entry_path(key)
+        meta_fpath = os.path.join(entry, _META_FNAME)
+        if not os.path.isfile(meta_fpath):
+            return None
+
+        try:
+            with open(meta_fpath) as f:
+                meta = json.load(f)
+            index = pd.Index(np.load(os.path.join(entry, _INDEX_FNAME)),
+                             name=meta['index_name'])
+            columns = {
+                col: np.load(os.path.join(entry, fname))
+                for col, fname in zip(meta['columns'], meta['files'])
+            }
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Discarding unreadable cache entry {key}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        # Mark the entry as recently used so eviction spares it.
+        os.utime(meta_fpath)
+        return pd.DataFrame(columns, index=index, columns=meta['columns'])
+
+    def store(self, key: str, df: pd.DataFrame) -> bool:
+        """Stores `df` under `key`. Returns `False` if `df` can't be cached.
+
+        Only frames whose index and columns hold fixed-width numpy dtypes
+        (numbers, booleans, datetimes) are cached; object columns are skipped
+        rather than pickled.
+        """
+        arrays = [df.index.values] + [df[c].values for c in df.columns]
+        if any(arr.dtype.hasobject for arr in arrays):
+            logger.debug(f"Frame for cache entry {key} holds object columns; "
+                         "skipped")
+            return False
+
+        tmp_entry = tempfile.mkdtemp(dir=self.__cache_dir, prefix='.tmp_')
+        try:
+            fnames = ['col_{}.npy'.format(i) for i in range(len(df.columns))]
+            np.save(os.path.join(tmp_entry, _INDEX_FNAME), arrays[0])
+            for fname, arr in zip(fnames, arrays[1:]):
+                np.save(os.path.join(tmp_entry, fname), arr)
+
+            meta = {
+                'index_name': df.index.name,
+                'columns': [str(c) for c in df.columns],
+                'files': fnames,
+            }
+            with open(os.path.join(tmp_entry, _META_FNAME), 'w') as f:
+                json.dump(meta, f)
+
+            entry = self._entry_path(key)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.rename(tmp_entry, entry)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {key}: {e}")
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            return False
+
+        self.evict()
+        return True
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits within
+        `max_bytes`.
+        """
+        entries = []
+        for name in os.listdir(self.__cache_dir):
+            entry = os.path.join(self.__cache_dir, name)
+            meta_fpath = os.path.join(entry, _META_FNAME)
+            if name.startswith('.') or not os.path.isfile(meta_fpath):
+                continue
+            entries.append((os.path.getmtime(meta_fpath),
+                            self._dir_size(entry), entry))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries):
+            if total <= self.__max_bytes:
+                break
+            logger.debug(f"Evicting cache entry {os.path.basename(entry)}")
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        """Removes every entry in the cache."""
+        for name in os.listdir(self.__cache_dir):
+            shutil.rmtree(os.path.join(self.__cache_dir, name),
+                          ignore_errors=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.__cache_dir, key)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(path))
+
+    @staticmethod
+    def _hash_file(fpath: str, blocksize: int = 1 << 20) -> str:
+        sha1 = hashlib.sha1()
+        with open(fpath, 'rb') as f:
+            for block in iter(lambda: f.read(blocksize), b''):
+                sha1.update(block)
+        return sha1.hexdigest()
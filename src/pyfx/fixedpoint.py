@@ -0,0 +1,95 @@
+"""
+Compact fixed-point prices.
+
+Prices are held as int32 counts of 1/10 pip, the pip size being that of the
+currency pair (see `utils.pip_factor`), e.g. 1.12345 EURUSD is 112345 and
+110.123 USDJPY is 110123. This halves the memory of float64 price columns
+and makes pip arithmetic exact integer math. Quotes finer than 1/10 pip are
+rounded to it. Missing prices are held as `MISSING`.
+
+Converting back divides by the scale, which gives the float nearest to the
+decimal price, i.e. the same float as parsing the quote from the source.
+"""
+
+import numpy as np
+import pandas as pd
+
+from common import utils
+
+__all__ = ['UNITS_PER_PIP', 'MISSING', 'price_scale', 'to_fixed', 'to_float',
+           'compact', 'expand', 'is_compact', 'pip_difference']
+
+
+UNITS_PER_PIP = 10
+
+# Held in place of missing prices; never a valid price.
+MISSING = np.iinfo(np.int32).min
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+
+def price_scale(cp_name: str) -> int:
+    """Fixed-point units per unit of price of a currency pair."""
+    return utils.pip_factor(cp_name) * UNITS_PER_PIP
+
+
+def to_fixed(values, scale: int) -> np.ndarray:
+    """Rounds float prices to int32 fixed point; NaN becomes `MISSING`.
+
+    Raises
+    ------
+    `OverflowError`
+        if a price does not fit in int32 at `scale`
+    """
+    scaled = np.round(np.asarray(values, dtype=np.float64) * scale)
+    missing = np.isnan(scaled)
+    limit = np.iinfo(np.int32).max
+    if (np.abs(scaled[~missing]) > limit).any():
+        raise OverflowError(f"Prices exceed int32 at scale {scale}")
+    return np.where(missing, MISSING, scaled).astype(np.int32)
+
+
+def to_float(fixed: np.ndarray, scale: int) -> np.ndarray:
+    """Float prices of int32 fixed point ones; `MISSING` becomes NaN."""
+    values = fixed / scale
+    values[fixed == MISSING] = np.nan
+    return values
+
+
+def compact(df: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """`df` with its OHLC columns in fixed point, sharing its index."""
+    return _convert(df, lambda values: to_fixed(values, scale))
+
+
+def expand(df: pd.DataFrame, scale: int) -> pd.DataFrame:
+    """A compacted `df` with its OHLC columns back in float, sharing its
+    index.
+    """
+    return _convert(df, lambda values: to_float(values, scale))
+
+
+def is_compact(df: pd.DataFrame) -> bool:
+    return any(df[col].dtype == np.int32 for col in _price_columns(df))
+
+
+def pip_difference(a, b, scale: int) -> np.ndarray:
+    """Pips from prices `b` to `a`, at 1/10 pip precision, in exact integer
+    math; NaN where either is missing.
+    """
+    a = to_fixed(a, scale).astype(np.int64)
+    b = to_fixed(b, scale).astype(np.int64)
+    pips = (a - b) / UNITS_PER_PIP
+    pips[(a == MISSING) | (b == MISSING)] = np.nan
+    return pips
+
+
+def _convert(df: pd.DataFrame, convert) -> pd.DataFrame:
+    prices = set(_price_columns(df))
+    return pd.DataFrame(
+        {col: convert(df[col].values) if col in prices else df[col].values
+         for col in df.columns},
+        index=df.index, columns=df.columns)
+
+
+def _price_columns(df: pd.DataFrame) -> list:
+    return [col for col in PRICE_COLUMNS if col in df.columns]
@@ -0,0 +1,228 @@
+"""
+Incremental recompute of a currency pair's daily output.
+
+Every output row of `app.exec` depends only on the source data of its own
+day, except for PDFX, whose benchmark is the last fix before the day. The
+output of the last run is kept in a state directory along with a digest of
+each day's source data. A rerun then recomputes only the days whose source
+data is new, changed or gone (plus the fix days benchmarked against a changed
+fix) and merges them into the kept output.
+"""
+
+import logging
+import os
+import pickle
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from common import utils
+from common.config import Config
+from ds.datacontainer import DataContainer, SourceNotLoadedError
+from pyfx import kernels, read
+
+__all__ = ['update', 'day_digests']
+
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever the output of a day changes for the same source data and
+# settings, so that outputs kept by an older version are not merged into.
+STATE_VERSION = 1
+
+
+def update(cp_name: str, config: Config, price_dfs: dict,
+           compute: Callable[[DataContainer], pd.DataFrame]) -> pd.DataFrame:
+    """Brings the kept output of `cp_name` up to date with `price_dfs`.
+
+    Falls back to computing every day if there is no usable kept output, e.g.
+    on the first run or after the output settings changed.
+
+    Parameters
+    ----------
+        cp_name : currency pair name, e.g. `EURUSD`
+        config : the configuration; its state dir holds the kept output
+        price_dfs : the source data, as returned by `read.read_data`
+        compute : computes the output of the data in a DataContainer
+    """
+    data = DataContainer(price_dfs, cp_name, config)
+    digests = day_digests(data, cp_name)
+
+    state_fpath = os.path.join(config.incremental_state_dir,
+                               '{}.pkl'.format(cp_name))
+    state = _load_state(state_fpath)
+
+    if (state is None or state['version'] != STATE_VERSION
+            or state['settings'] != config.output_digest):
+        logger.info(f"Computing all days of {cp_name}")
+        df_master = compute(data)
+    else:
+        dirty = _dirty_days(state['digests'], digests, data, cp_name)
+        logger.info(f"Recomputing {len(dirty)} days of {cp_name}")
+        df_master = _merge(state['output'], dirty, lambda: compute(
+            DataContainer(_subset(price_dfs, data, cp_name, config, dirty),
+                          cp_name, config)))
+
+    _store_state(state_fpath, {
+        'version': STATE_VERSION,
+        'settings': config.output_digest,
+        'digests': digests,
+        'output': df_master,
+    })
+    return df_master
+
+
+def day_digests(data: DataContainer, cp_name: str) -> dict:
+    """Digest of each day's data in each of the loaded sources.
+
+    Minute data is digested after the date range and time shift are applied,
+    and fix data only for the currency pair's own column.
+
+    Returns
+    -------
+    A dict mapping each source to a uint64 Series of digests by day code.
+    """
+    digests = {}
+    for src, view, codes in [
+            (read.MINUTE, lambda: data.full_minute_price_df,
+             lambda: data.day_codes),
+            (read.DAILY, lambda: data.daily_price_df, None),
+            (read.FIX, lambda: data.fix_price_df[[utils.fix_column(cp_name)]],
+             None)]:
+        try:
+            df = view()
+        except SourceNotLoadedError:
+            continue
+        codes = codes() if codes else kernels.day_codes(df.index)
+        digests[src] = _digest_by_day(df, codes)
+    return digests
+
+
+def _digest_by_day(df: pd.DataFrame, codes: np.ndarray) -> pd.Series:
+    """Sums the row hashes of each day, wrapping around on overflow."""
+    hashes = pd.util.hash_pandas_object(df, index=True).values
+    order = np.argsort(codes, kind='stable')
+    codes, hashes = codes[order].astype(np.int64), hashes[order]
+    days, starts = np.unique(codes, return_index=True)
+    sums = np.add.reduceat(hashes, starts) if len(starts) \
+        else np.array([], dtype=np.uint64)
+    return pd.Series(sums, index=days)
+
+
+def _dirty_days(old: dict, new: dict, data: DataContainer,
+                cp_name: str) -> np.ndarray:
+    """Day codes whose output may differ from the kept output."""
+    dirty = set()
+    for src in set(old) | set(new):
+        if src == read.FIX:
+            continue
+        dirty |= _changed(old.get(src), new.get(src))
+
+    if read.FIX in old or read.FIX in new:
+        changed = _changed(old.get(read.FIX), new.get(read.FIX))
+        dirty |= changed
+        if changed and read.FIX in new:
+            dirty |= _benchmarked_against(
+                changed, data.fix_price_df[utils.fix_column(cp_name)])
+
+    return np.array(sorted(dirty), dtype=np.int64)
+
+
+def _changed(old: pd.Series, new: pd.Series) -> set:
+    """Days new, gone or with a different digest between `old` and `new`."""
+    old = pd.Series(dtype=np.uint64) if old is None else old
+    new = pd.Series(dtype=np.uint64) if new is None else new
+    both = old.index.intersection(new.index)
+    differ = both[old[both].values != new[both].values]
+    return (set(old.index.symmetric_difference(new.index))
+            | set(differ))
+
+
+def _benchmarked_against(days: set, fix: pd.Series) -> set:
+    """Fix days whose PDFX benchmark, the last fix before the day, may be a
+    fix of `days`: the days after each of `days`, up to and including the
+    next one with a fix.
+    """
+    codes = kernels.day_codes(fix.index).astype(np.int64)
+    valid = np.flatnonzero(fix.notna().values)
+
+    ans = set()
+    for day in days:
+        start = np.searchsorted(codes, day, side='right')
+        nxt = np.searchsorted(valid, start)
+        end = valid[nxt] + 1 if nxt < len(valid) else len(codes)
+        ans.update(codes[start:end].tolist())
+    return ans
+
+
+def _subset(price_dfs: dict, data: DataContainer, cp_name: str,
+            config: Config, days: np.ndarray) -> dict:
+    """The source data needed to compute the output of `days`.
+
+    Fix data also keeps the last fix before each of the days, which the
+    PDFX benchmark is taken from.
+    """
+    subset = {}
+
+    if read.MINUTE in price_dfs:
+        src = price_dfs[read.MINUTE]
+        index = src.index
+        if config.should_time_shift:
+            index = index + pd.Timedelta(hours=config.time_shift)
+        subset[read.MINUTE] = src[np.isin(kernels.day_codes(index), days)]
+
+    if read.DAILY in price_dfs:
+        src = price_dfs[read.DAILY]
+        subset[read.DAILY] = src[np.isin(kernels.day_codes(src.index), days)]
+
+    if read.FIX in price_dfs:
+        src = data.fix_price_df
+        codes = kernels.day_codes(src.index).astype(np.int64)
+        keep = np.flatnonzero(np.isin(codes, days))
+        valid = np.flatnonzero(src[utils.fix_column(cp_name)].notna().values)
+        before = np.searchsorted(valid, keep) - 1
+        context = valid[before[before >= 0]]
+        subset[read.FIX] = src.iloc[np.union1d(keep, context)]
+
+    return subset
+
+
+def _merge(kept: pd.DataFrame, dirty: np.ndarray,
+           compute: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """Replaces the `dirty` days of `kept` with their recomputed rows."""
+    if not len(dirty):
+        return kept
+
+    fresh = compute()
+    fresh = fresh[np.isin(kernels.date_codes(fresh.index), dirty)]
+    kept = kept[~np.isin(kernels.date_codes(kept.index), dirty)]
+
+    if not set(fresh.columns) <= set(kept.columns):
+        kept = kept.reindex(columns=kept.columns.append(
+            fresh.columns.difference(kept.columns, sort=False)))
+    fresh = fresh.reindex(columns=kept.columns)
+
+    return pd.concat([kept, fresh]).sort_index()
+
+
+def _load_state(fpath: str) -> dict:
+    if not os.path.isfile(fpath):
+        return None
+    try:
+        with open(fpath, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError) as e:
+        logger.warning(f"Ignoring unreadable state {fpath}: {e}")
+        return None
+
+
+def _store_state(fpath: str, state: dict):
+    """Writes `state` to a temporary file first, so that an interrupted run
+    never leaves a partial state behind.
+    """
+    os.makedirs(os.path.dirname(fpath) or '.', exist_ok=True)
+    tmp_fpath = '{}.tmp{}'.format(fpath, os.getpid())
+    with open(tmp_fpath, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_fpath, fpath)
@@ -0,0 +1,221 @@
+"""
+Vectorized per-day kernels shared by the analytics functions.
+
+Minute bars are addressed by integer day codes (days since 1970-01-01) and
+minute-of-day offsets instead of `datetime.date` / `datetime.time` objects,
+so that grouping and time-of-day filtering run on plain numpy integers.
+"""
+
+from collections import namedtuple
+from datetime import time
+from typing import List
+
+import numpy as np
+import pandas as pd
+
+from ds.timeranges import DayTimeRange
+
+__all__ = [
+    'day_codes',
+    'minute_of_day',
+    'minute_of_time',
+    'codes_to_dates',
+    'date_codes',
+    'period_values',
+    'day_extrema',
+    'window_stats',
+]
+
+
+DayExtrema = namedtuple('DayExtrema', 'days argmin argmax')
+DayExtrema.__doc__ = """Per-day extrema positions.
+
+    days : day codes, sorted
+    argmin : row position of each day's minimum, the latter on ties, or -1
+    argmax : row position of each day's maximum, the latter on ties, or -1
+"""
+
+WindowStats = namedtuple('WindowStats', 'days mean argmin argmax')
+WindowStats.__doc__ = """Per-day statistics of one time-of-day window.
+
+    days : day codes of the days with at least one bar in the window
+    mean : mean of the values of each day
+    argmin : row position of each day's minimum, the latter on ties, or -1
+    argmax : row position of each day's maximum, the latter on ties, or -1
+"""
+
+
+def day_codes(index: pd.DatetimeIndex) -> np.ndarray:
+    """int32 days since 1970-01-01 of each timestamp in `index`."""
+    return index.values.astype('datetime64[D]').astype(np.int32)
+
+
+def minute_of_day(index: pd.DatetimeIndex) -> np.ndarray:
+    """int16 minutes since midnight of each timestamp in `index`."""
+    minutes = index.values.astype('datetime64[m]').astype(np.int64)
+    return (minutes % (24 * 60)).astype(np.int16)
+
+
+def minute_of_time(t: time) -> int:
+    """Minutes since midnight of `t`."""
+    return t.hour * 60 + t.minute
+
+
+def codes_to_dates(codes: np.ndarray) -> np.ndarray:
+    """Object array of `datetime.date` for each day code."""
+    return np.asarray(codes, dtype=np.int64).astype('datetime64[D]')\
+        .astype(object)
+
+
+def date_codes(dates) -> np.ndarray:
+    """int64 day codes of `datetime.date`s, e.g. of an output's index."""
+    return np.array(dates, dtype='datetime64[D]').astype(np.int64)
+
+
+def period_values(codes: np.ndarray, starts: np.ndarray, ends: np.ndarray,
+                  values: np.ndarray, default=0) -> np.ndarray:
+    """Value of the period each day code falls in, or `default` outside of
+    every period.
+
+    Periods are looked up with a binary search over their sorted start codes,
+    so the cost grows with the number of rows, not of periods. Periods must
+    not overlap.
+
+    Parameters
+    ----------
+        codes : day code of each row
+        starts : first day code of each period
+        ends : last day code of each period, inclusive
+        values : value of each period
+    """
+    values = np.asarray(values)
+    ans = np.full(len(codes), default, dtype=values.dtype)
+    if not len(starts):
+        return ans
+
+    order = np.argsort(starts, kind='stable')
+    starts, ends = np.asarray(starts)[order], np.asarray(ends)[order]
+    values = values[order]
+
+    period = np.searchsorted(starts, codes, side='right') - 1
+    inside = period >= 0
+    inside[inside] = codes[inside] <= ends[period[inside]]
+    ans[inside] = values[period[inside]]
+    return ans
+
+
+def window_stats(values: np.ndarray, codes: np.ndarray,
+                 minutes: np.ndarray,
+                 windows: List[DayTimeRange]) -> List[WindowStats]:
+    """Computes per-day mean and last argmin / argmax of `values` within each
+    time-of-day window, inclusive of both ends.
+
+    Rows falling in any window are selected in a single pass; every window is
+    then reduced at once by grouping on (window, day). NaN values are ignored,
+    as in a pandas groupby. Ties for the extrema resolve to the latter row.
+
+    Parameters
+    ----------
+        values : values to aggregate, e.g. close prices
+        codes : day code of each row
+        minutes : minute-of-day of each row
+        windows : time-of-day windows
+    """
+    if not windows:
+        return []
+
+    bounds = np.array([[minute_of_time(w.start_time),
+                        minute_of_time(w.end_time)] for w in windows],
+                      dtype=np.int64).reshape(-1, 2)
+
+    # One pass over the full data, keeping rows within any of the windows.
+    candidates = np.flatnonzero((minutes >= bounds[:, 0].min())
+                                & (minutes <= bounds[:, 1].max()))
+    cand_minutes = minutes[candidates]
+
+    # Stack the rows of each window, keyed by (window, day).
+    positions, window_ids = [], []
+    for i, (start, end) in enumerate(bounds):
+        rows = candidates[(cand_minutes >= start) & (cand_minutes <= end)]
+        positions.append(rows)
+        window_ids.append(np.full(len(rows), i, dtype=np.int64))
+    positions = np.concatenate(positions)
+    window_ids = np.concatenate(window_ids)
+
+    row_codes = codes[positions]
+    base = row_codes.min() if len(row_codes) else 0
+    span = row_codes.max() - base + 1 if len(row_codes) else 1
+    keys = window_ids * span + (row_codes - base)
+
+    # A stable sort groups keys while keeping row order within each group.
+    if len(keys) and not (np.diff(keys) >= 0).all():
+        order = np.argsort(keys, kind='stable')
+        keys, positions = keys[order], positions[order]
+
+    vals = values[positions]
+    starts = _group_starts(keys)
+    group_keys = keys[starts]
+
+    # Means go through pandas so results match a groupby mean bit for bit.
+    means = pd.Series(vals).groupby(keys).mean().values
+
+    argmins = _last_extrema_positions(vals, starts, np.fmin, positions)
+    argmaxs = _last_extrema_positions(vals, starts, np.fmax, positions)
+
+    stats = []
+    for i in range(len(bounds)):
+        sel = (group_keys // span) == i
+        stats.append(WindowStats(days=group_keys[sel] % span + base,
+                                 mean=means[sel], argmin=argmins[sel],
+                                 argmax=argmaxs[sel]))
+    return stats
+
+
+def day_extrema(values: np.ndarray, codes: np.ndarray) -> DayExtrema:
+    """Row positions of each day's minimum and maximum of `values`.
+
+    NaN values are ignored; ties resolve to the latter row.
+    """
+    positions = np.arange(len(codes))
+    if len(codes) and not (np.diff(codes) >= 0).all():
+        positions = np.argsort(codes, kind='stable')
+
+    sorted_codes = codes[positions]
+    vals = values[positions]
+    starts = _group_starts(sorted_codes)
+
+    return DayExtrema(
+        days=sorted_codes[starts],
+        argmin=_last_extrema_positions(vals, starts, np.fmin, positions),
+        argmax=_last_extrema_positions(vals, starts, np.fmax, positions))
+
+
+def _group_starts(keys: np.ndarray) -> np.ndarray:
+    """Start offsets of the runs of equal values in sorted `keys`."""
+    if not len(keys):
+        return np.array([], dtype=np.int64)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+def _last_extrema_positions(vals: np.ndarray, starts: np.ndarray, reduce,
+                            positions: np.ndarray) -> np.ndarray:
+    """Position of the last row equal to each group's extremum, or -1 if the
+    group only holds NaN.
+
+    Parameters
+    ----------
+        vals : values, grouped into runs beginning at `starts`
+        starts : start offset of each group
+        reduce : `np.fmin` or `np.fmax`
+        positions : the row position of each value
+    """
+    if not len(starts):
+        return np.array([], dtype=np.int64)
+
+    sizes = np.diff(np.r_[starts, len(vals)])
+    with np.errstate(invalid='ignore'):
+        extrema = reduce.reduceat(vals, starts)
+    hits = np.where(vals == np.repeat(extrema, sizes),
+                    np.arange(len(vals)), -1)
+    last = np.maximum.reduceat(hits, starts)
+    return np.where(last >= 0, positions[np.maximum(last, 0)], -1)
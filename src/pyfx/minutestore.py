@@ -0,0 +1,293 @@
+"""
+Memory-mapped binary store of a currency pair's minute bars.
+
+A store is a directory next to the minute csv it was converted from, e.g.
+`EURUSD_Minute.store/` for `EURUSD_Minute.csv`. It holds one raw file per
+column: timestamps as int64 minutes since the epoch, and the OHLC prices as
+float64. A small day-offset index maps each day to the row its bars start
+at, and `meta.json` records the row count and the source file's size and
+modification time.
+
+Column files are opened with `numpy.memmap`, so opening a store reads only
+its index, and a date range slice is a view of the bars in that range: only
+the pages they span are ever read from disk.
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+
+__all__ = ['MinuteStore', 'store_path', 'write_store', 'find_store',
+           'at_minutes']
+
+logger = logging.getLogger(__name__)
+
+
+# Bump whenever the layout changes, so that older stores are not read.
+VERSION = 1
+
+COLUMNS = ['Open', 'High', 'Low', 'Close']
+
+_META_FNAME = 'meta.json'
+_MINUTES_FNAME = 'minutes.i8'
+_DAYS_FNAME = 'days.npy'
+_OFFSETS_FNAME = 'offsets.npy'
+
+_MINUTES_PER_DAY = 1440
+
+
+class MinuteStore:
+    """A minute bar store opened for reading; see `write_store`.
+
+    Raises
+    ------
+    `FileNotFoundError`
+        if `store_dir` holds no store
+    `ValueError`
+        if the store was written in another layout version
+    """
+
+    def __init__(self, store_dir: str):
+        meta_fpath = os.path.join(store_dir, _META_FNAME)
+        if not os.path.isfile(meta_fpath):
+            raise FileNotFoundError(f"No minute store in {store_dir}")
+        with open(meta_fpath) as f:
+            meta = json.load(f)
+        if meta.get('version') != VERSION:
+            raise ValueError(f"Minute store {store_dir} has version "
+                             f"{meta.get('version')}, not {VERSION}")
+
+        self.__store_dir = store_dir
+        self.__meta = meta
+        self.__days = np.load(os.path.join(store_dir, _DAYS_FNAME))
+        self.__offsets = np.load(os.path.join(store_dir, _OFFSETS_FNAME))
+
+        rows = meta['rows']
+        self.__minutes = self._memmap(_MINUTES_FNAME, np.int64, rows)
+        self.__columns = {
+            col: self._memmap(fname, np.float64, rows)
+            for col, fname in zip(COLUMNS, meta['files'])
+        }
+
+    @property
+    def rows(self) -> int:
+        return self.__meta['rows']
+
+    @property
+    def days(self) -> np.ndarray:
+        """Days holding bars, as `datetime64[D]`."""
+        return self.__days.astype('datetime64[D]')
+
+    def is_fresh_for(self, source_fpath: str) -> bool:
+        """Whether the store matches `source_fpath`, or that file is gone."""
+        if not os.path.isfile(source_fpath):
+            return True
+        stat = os.stat(source_fpath)
+        return (stat.st_size == self.__meta['source_size'] and
+                stat.st_mtime_ns == self.__meta['source_mtime'])
+
+    def slice(self, start: datetime = None, end: datetime = None) -> dict:
+        """Views of the bars from `start` to `end`, both included.
+
+        Returns
+        -------
+        A dict mapping `'minutes'` (int64 minutes since the epoch) and each
+        of the OHLC columns to a zero-copy view of the memory map.
+        """
+        lo = 0 if start is None else self._row(_to_minutes(start), 'left')
+        hi = self.rows if end is None else \
+            self._row(_to_minutes(end), 'right')
+        hi = max(lo, hi)
+
+        views = {'minutes': self.__minutes[lo:hi]}
+        views.update({col: arr[lo:hi] for col, arr in self.__columns.items()})
+        return views
+
+    def to_frame(self, start: datetime = None, end: datetime = None,
+                 minutes: set = None) -> pd.DataFrame:
+        """The bars from `start` to `end` as read from the minute csv, i.e.
+        OHLC columns indexed by `datetime`. If `minutes` is provided, only
+        the bars at these minutes of the day are copied out of the store.
+        """
+        return _to_frame(self.slice(start, end), minutes)
+
+    def iter_frames(self, start: datetime = None, end: datetime = None,
+                    minutes: set = None,
+                    chunksize: int = 2 ** 18) -> Iterator[pd.DataFrame]:
+        """Yields the frame of `to_frame` in chronological chunks of
+        `chunksize` bars of the store, copying out one chunk at a time.
+        """
+        views = self.slice(start, end)
+        for lo in range(0, len(views['minutes']), chunksize):
+            yield _to_frame({name: view[lo:lo + chunksize]
+                             for name, view in views.items()}, minutes)
+
+    def _row(self, minute: int, side: str) -> int:
+        """Row of `minute`, as `np.searchsorted` on the store's timestamps
+        would find it, looking at the bars of its day only.
+        """
+        day = minute // _MINUTES_PER_DAY
+        i = np.searchsorted(self.__days, day)
+        if i == len(self.__days) or self.__days[i] != day:
+            return int(self.__offsets[i])
+
+        lo, hi = self.__offsets[i], self.__offsets[i + 1]
+        return int(lo + np.searchsorted(self.__minutes[lo:hi], minute,
+                                        side=side))
+
+    def _memmap(self, fname: str, dtype, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.__store_dir, fname), dtype=dtype,
+                         mode='r', shape=(rows,))
+
+    def __repr__(self):
+        return f"MinuteStore({self.__store_dir!r}, {self.rows} rows)"
+
+
+def store_path(source_fpath: str) -> str:
+    """Directory of the store converted from the minute csv `source_fpath`."""
+    return os.path.splitext(source_fpath)[0] + '.store'
+
+
+def write_store(chunks: Iterable[pd.DataFrame], source_fpath: str) -> str:
+    """Writes minute bars into the store of `source_fpath`, replacing any.
+
+    Parameters
+    ----------
+        chunks : the bars, in chronological frames indexed by `datetime`,
+            as read from `source_fpath`
+        source_fpath : the minute csv the bars were read from
+
+    Returns
+    -------
+    The store's directory.
+
+    Raises
+    ------
+    `ValueError`
+        if the bars are not in chronological order, or not on whole minutes
+    """
+    stat = os.stat(source_fpath)
+    store_dir = store_path(source_fpath)
+    parent = os.path.dirname(os.path.abspath(store_dir))
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp_')
+
+    fnames = ['{}.f8'.format(col.lower()) for col in COLUMNS]
+    try:
+        files = [open(os.path.join(tmp_dir, fname), 'wb')
+                 for fname in [_MINUTES_FNAME] + fnames]
+        try:
+            rows, days, offsets = _write_columns(chunks, files)
+        finally:
+            for f in files:
+                f.close()
+
+        np.save(os.path.join(tmp_dir, _DAYS_FNAME), days)
+        np.save(os.path.join(tmp_dir, _OFFSETS_FNAME), offsets)
+        meta = {
+            'version': VERSION, 'rows': rows, 'files': fnames,
+            'source_size': stat.st_size, 'source_mtime': stat.st_mtime_ns,
+        }
+        with open(os.path.join(tmp_dir, _META_FNAME), 'w') as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(store_dir, ignore_errors=True)
+        os.rename(tmp_dir, store_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"Wrote {rows} minute bars to {store_dir}")
+    return store_dir
+
+
+def find_store(source_fpath: str) -> Optional[MinuteStore]:
+    """The store of the minute csv `source_fpath`, if there is one and it is
+    up to date with the csv.
+    """
+    store_dir = store_path(source_fpath)
+    if not os.path.isdir(store_dir):
+        return None
+
+    try:
+        store = MinuteStore(store_dir)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable minute store {store_dir}: {e}")
+        return None
+
+    if not store.is_fresh_for(source_fpath):
+        logger.warning(f"Ignoring minute store {store_dir}, as "
+                       f"{source_fpath} changed since it was written")
+        return None
+    return store
+
+
+def _to_frame(views: dict, minutes: set = None) -> pd.DataFrame:
+    if minutes is not None:
+        mask = at_minutes(views['minutes'], minutes)
+        views = {name: view[mask] for name, view in views.items()}
+
+    index = pd.DatetimeIndex(
+        (views['minutes'] * 60).astype('datetime64[s]')
+        .astype('datetime64[ns]'), name='datetime')
+    return pd.DataFrame({col: views[col] for col in COLUMNS},
+                        index=index, columns=COLUMNS)
+
+
+def at_minutes(times: np.ndarray, minutes: set) -> np.ndarray:
+    """Flags the `times` (int64 minutes since the epoch) at one of the
+    `minutes` of the day.
+    """
+    wanted = np.zeros(_MINUTES_PER_DAY, dtype=bool)
+    wanted[list(minutes)] = True
+    return wanted[times % _MINUTES_PER_DAY]
+
+
+def _write_columns(chunks: Iterable[pd.DataFrame], files: list) -> tuple:
+    """Appends each chunk's columns to `files`. Returns the rows written and
+    the day-offset index: the days holding bars, and the row each starts at
+    followed by the row count.
+    """
+    rows, last = 0, None
+    days, offsets = [], []
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        nanos = chunk.index.values.astype(np.int64)
+        if (nanos % (60 * 10 ** 9)).any():
+            raise ValueError("Minute bars must be on whole minutes")
+        minutes = nanos // (60 * 10 ** 9)
+        if (np.diff(minutes) < 0).any() or \
+                (last is not None and minutes[0] < last):
+            raise ValueError("Minute bars must be in chronological order")
+
+        chunk_days = minutes // _MINUTES_PER_DAY
+        starts = np.flatnonzero(np.r_[True, np.diff(chunk_days) != 0])
+        # A day may start in an earlier chunk.
+        if last is not None and chunk_days[0] == last // _MINUTES_PER_DAY:
+            starts = starts[1:]
+        days.append(chunk_days[starts])
+        offsets.append(rows + starts)
+        last = minutes[-1]
+
+        files[0].write(minutes.tobytes())
+        for f, col in zip(files[1:], COLUMNS):
+            f.write(chunk[col].values.astype(np.float64).tobytes())
+        rows += len(chunk)
+
+    days = np.concatenate(days).astype(np.int32) if days else \
+        np.empty(0, dtype=np.int32)
+    offsets = np.r_[np.concatenate(offsets) if offsets else [], rows]
+    return rows, days, offsets.astype(np.int64)
+
+
+def _to_minutes(dt: datetime) -> int:
+    return int(np.datetime64(dt, 'm').astype(np.int64))
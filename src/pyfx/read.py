@@ -1,14 +1,21 @@
-import functools
+import logging
 import os
-from datetime import datetime
-from typing import Callable, List
+from typing import Callable, Iterator, List
 
+import numpy as np
+import openpyxl
 import pandas as pd
 
 from common.decorators import timer
 from ds.timeranges import DateRange
+from pyfx import fixedpoint, minutestore
+from pyfx.cache import FrameCache
+from pyfx.registry import DatasetRegistry
 
-__all__ = ['MINUTE', 'FIX', 'DAILY', 'read_data']
+__all__ = ['MINUTE', 'FIX', 'DAILY', 'read_data', 'read_minute_chunks',
+           'convert_minute_data']
+
+logger = logging.getLogger(__name__)
 
 
 MINUTE = 0,
@@ -16,72 +23,364 @@ FIX = 1,
 DAILY = 2
 
 
-def read_data(fpaths: dict, cp_name: str) -> dict:
+# Bump a reader's version whenever its processing logic changes, so that
+# frames cached by an older version are no longer served.
+_READERS = {
+    MINUTE: ('minute', 2),
+    FIX: ('fix', 1),
+    DAILY: ('daily', 2),
+}
+
+
+# Rows per chunk when streaming minute csvs.
+MINUTE_CHUNKSIZE = 2 ** 18
+
+MINUTE_DTYPES = {
+    'Local time': str,
+    'Open': np.float64,
+    'High': np.float64,
+    'Low': np.float64,
+    'Close': np.float64,
+}
+
+# Layout of the `dd.mm.yyyy HH:MM:SS` prefix of the "Local time" field.
+_LOCAL_TIME_WIDTH = 19
+_LOCAL_TIME_DIGITS = {
+    'day': [0, 1], 'month': [3, 4], 'year': [6, 7, 8, 9],
+    'hour': [11, 12], 'minute': [14, 15], 'second': [17, 18],
+}
+_LOCAL_TIME_SEPARATORS = {2: b'.', 5: b'.', 10: b' ', 13: b':', 16: b':'}
+
+
+def read_data(fpaths: dict, cp_name: str, date_range: DateRange = None,
+              cache: FrameCache = None,
+              registry: DatasetRegistry = None,
+              price_scale: int = None, minutes: set = None) -> dict:
+    """Reads and processes the source files in `fpaths`.
+
+    Parameters
+    ----------
+        fpaths : maps `MINUTE`, `FIX` and/or `DAILY` to source fpaths
+        cp_name : currency pair name, e.g. `EURUSD`
+        date_range : optional; if provided, minute and daily data outside
+            of it is dropped while the files are being read
+        cache : optional; if provided, processed frames are served from and
+            stored to this cache. Minute data is read from its binary store
+            instead, if it was converted to one (see `convert_minute_data`)
+        registry : optional; if provided, files it marks as shared are
+            loaded once and served from it afterwards
+        price_scale : optional; if provided, minute prices are held in fixed
+            point at this scale (see `pyfx.fixedpoint`). Daily prices, a row
+            per day, are kept in float
+        minutes : optional; if provided, only minute bars at these minutes
+            of the day (0 to 1439) are kept, the rest being dropped while
+            the minute data is read
+    """
+    # Keys of frames held in float, with every minute, are those from before
+    # fixed point and minute pruning.
+    scale_key = {'price_scale': price_scale} if price_scale else {}
+    minutes_key = {'minutes': _minutes_key(minutes)} \
+        if minutes is not None else {}
+
     resp = {}
     if MINUTE in fpaths:
-        resp[MINUTE] = _read_and_process_minute_data(fpaths[MINUTE], cp_name)
+        store = minutestore.find_store(fpaths[MINUTE])
+        if store is None:
+            resp[MINUTE] = _read_shared(
+                MINUTE, fpaths[MINUTE], cache, registry,
+                lambda fpath: _compacted(_read_and_process_minute_data(
+                    fpath, cp_name, date_range=date_range, minutes=minutes),
+                    price_scale),
+                date_range=_date_range_key(date_range), **scale_key,
+                **minutes_key)
+        else:
+            # Stores are read faster than cached frames are loaded.
+            resp[MINUTE] = _read_shared(
+                MINUTE, fpaths[MINUTE], None, registry,
+                lambda _: _compacted(_read_minute_store(
+                    store, date_range=date_range, minutes=minutes),
+                    price_scale),
+                date_range=_date_range_key(date_range), **scale_key,
+                **minutes_key)
     if FIX in fpaths:
-        resp[FIX] = _read_and_process_fix_data(fpaths[FIX])
+        resp[FIX] = _read_shared(
+            FIX, fpaths[FIX], cache, registry,
+            lambda fpath: _read_and_process_fix_data(fpath))
     if DAILY in fpaths:
-        resp[DAILY] = _read_and_process_daily_data(fpaths[DAILY], cp_name)
+        resp[DAILY] = _read_shared(
+            DAILY, fpaths[DAILY], cache, registry,
+            lambda fpath: _read_and_process_daily_data(
+                fpath, cp_name, date_range=date_range),
+            cp_name=cp_name, date_range=_date_range_key(date_range))
     return None if resp == {} else resp
 
 
-def cache(cache_fname: str):
-    """Decorator for df-reading functions.
-    Speeds up data-reading process by attempting to access a cached version
-    before opening csv / xlsx.
+def read_minute_chunks(fpath: str, date_range: DateRange = None,
+                       price_scale: int = None, minutes: set = None,
+                       chunksize: int = MINUTE_CHUNKSIZE
+                       ) -> Iterator[pd.DataFrame]:
+    """Yields the minute data `read_data` reads, in chronological chunks
+    read from about `chunksize` source rows each, so that only one chunk is
+    held at a time. Reads from the binary store of `fpath`, if there is one.
+
+    Raises
+    ------
+    `ValueError`
+        if the minute csv is not in chronological order
+    """
+    store = minutestore.find_store(fpath)
+    if store is not None:
+        start, end = (date_range.start_date_dt, date_range.end_date_dt) \
+            if date_range is not None else (None, None)
+        for chunk in store.iter_frames(start, end, minutes, chunksize):
+            yield _compacted(chunk, price_scale)
+        return
+
+    if not os.path.isfile(fpath):
+        raise FileNotFoundError
+
+    last_seen = None
+    for chunk in _read_minute_chunks(fpath, chunksize=chunksize):
+        index = chunk.index.values
+        if len(index) == 0:
+            continue
+        if not chunk.index.is_monotonic_increasing or \
+                (last_seen is not None and index[0] < last_seen):
+            raise ValueError(f"{fpath} is not in chronological order")
+        last_seen = index[-1]
+
+        keep = np.ones(len(index), dtype=bool)
+        if date_range is not None:
+            if index[0] > np.datetime64(date_range.end_date_dt):
+                break
+            keep &= ((index >= np.datetime64(date_range.start_date_dt)) &
+                     (index <= np.datetime64(date_range.end_date_dt)))
+        if minutes is not None:
+            keep &= minutestore.at_minutes(
+                index.astype('datetime64[m]').astype(np.int64), minutes)
+        if keep.any():
+            yield _compacted(chunk[keep], price_scale)
+
+
+def _compacted(df: pd.DataFrame, price_scale: int) -> pd.DataFrame:
+    return fixedpoint.compact(df, price_scale) if price_scale else df
+
+
+def _minutes_key(minutes: set) -> str:
+    return ','.join(str(m) for m in sorted(minutes))
+
+
+def _date_range_key(date_range: DateRange) -> str:
+    if date_range is None:
+        return ''
+    return '{}_{}'.format(date_range.start_date, date_range.end_date)
+
+
+def _read_shared(src, fpath: str, cache: FrameCache,
+                 registry: DatasetRegistry,
+                 reader: Callable[[str], pd.DataFrame],
+                 **params) -> pd.DataFrame:
+    """Serves `reader(fpath)` from `registry` if the file is shared, falling
+    back to `_read_cached`.
+    """
+    if registry is None:
+        return _read_cached(src, fpath, cache, reader, **params)
+
+    return registry.get(
+        fpath, lambda: _read_cached(src, fpath, cache, reader, **params),
+        params=(src, tuple(sorted(params.items()))))
+
+
+def _read_cached(src, fpath: str, cache: FrameCache,
+                 reader: Callable[[str], pd.DataFrame],
+                 **params) -> pd.DataFrame:
+    """Serves `reader(fpath)` from `cache` if possible, populating it on miss.
+
+    `params` are the reader arguments, besides `fpath`, that the processed
+    frame depends on.
+    """
+    if cache is None:
+        return reader(fpath)
+
+    if not os.path.isfile(fpath):
+        raise FileNotFoundError
+
+    name, version = _READERS[src]
+    key = cache.key(fpath, name, version, **params)
+    df = cache.load(key)
+
+    if df is None:
+        logger.debug(f"Cache miss for {fpath}")
+        df = reader(fpath)
+        cache.store(key, df)
+    else:
+        logger.debug(f"Cache hit for {fpath}")
+
+    return df
 
-    Parameter
-    ---------
-        cache_fname:
-            Deserializes this file into a dataframe if the file exists.
-            Otherwise, creates a file w/ this fname and cache the dataframe
-            to this location.
+
+def convert_minute_data(fpath: str,
+                        chunksize: int = MINUTE_CHUNKSIZE) -> str:
+    """Converts the minute csv `fpath` into a binary store, which
+    `read_data` then reads the minute data from (see `pyfx.minutestore`).
+
+    The csv is streamed in chunks of `chunksize` rows, so it is converted in
+    constant memory. Returns the store's directory.
     """
-    def _cache(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            if os.path.isfile(cache_fname):
-                return pd.read_pickle(cache_fname)
-            else:
-                df = func(*args, **kwargs)
-                df.to_pickle(cache_fname)
-                return df
-        return wrapper
-    return _cache
+    if not os.path.isfile(fpath):
+        raise FileNotFoundError
+    return minutestore.write_store(
+        _read_minute_chunks(fpath, chunksize=chunksize), fpath)
+
+
+@timer
+def _read_minute_store(store: minutestore.MinuteStore,
+                       date_range: DateRange = None,
+                       minutes: set = None) -> pd.DataFrame:
+    """Reads minute data as `_read_and_process_minute_data` does, from the
+    days of `date_range` in `store` only.
+    """
+    if date_range is None:
+        return store.to_frame(minutes=minutes)
+    return store.to_frame(date_range.start_date_dt, date_range.end_date_dt,
+                          minutes=minutes)
 
 
 @timer
 def _read_and_process_minute_data(
     fpath: str, cp_name: str,
-    processor: Callable[[pd.DataFrame], pd.DataFrame] = None
+    processor: Callable[[pd.DataFrame], pd.DataFrame] = None,
+    date_range: DateRange = None, chunksize: int = MINUTE_CHUNKSIZE,
+    minutes: set = None
 ) -> pd.DataFrame:
+    """Streams the minute csv in chunks of `chunksize` rows.
 
-    # @cache('cache/min_{}'.format(cp_name))
-    def _process_minute_data(min_df: pd.DataFrame) -> pd.DataFrame:
+    Each chunk is processed as it arrives and, if `date_range` is provided,
+    rows outside of it are dropped before the next chunk is read, as are
+    rows at minutes of the day not in `minutes`, if provided. Peak memory
+    is therefore bounded by the rows kept plus one chunk, rather than by the
+    size of the file.
+    """
+    if not os.path.isfile(fpath):
+        raise FileNotFoundError
 
-        if 'Volume' in min_df.columns:
-            min_df.drop(columns=['Volume'], inplace=True)
+    def keep(chunk):
+        if minutes is not None:
+            chunk = chunk[minutestore.at_minutes(
+                chunk.index.values.astype('datetime64[m]').astype(np.int64),
+                minutes)]
+        kept.append(chunk)
+
+    kept = []
+    is_sorted, last_seen = True, None
+    for chunk in _read_minute_chunks(fpath, processor, chunksize):
+        if date_range is None or len(chunk) == 0:
+            keep(chunk)
+            continue
+
+        index = chunk.index.values
+        is_sorted = (is_sorted and chunk.index.is_monotonic_increasing and
+                     (last_seen is None or last_seen <= index[0]))
+        last_seen = index[-1]
+
+        in_range = ((index >= np.datetime64(date_range.start_date_dt)) &
+                    (index <= np.datetime64(date_range.end_date_dt)))
+        keep(chunk[in_range])
+
+        # Minute csvs are chronological; stop once past the end of the range.
+        if is_sorted and index[0] > np.datetime64(date_range.end_date_dt):
+            break
+
+    return pd.concat(kept) if len(kept) > 1 else kept[0]
+
+
+def _read_minute_chunks(
+    fpath: str, processor: Callable[[pd.DataFrame], pd.DataFrame] = None,
+    chunksize: int = MINUTE_CHUNKSIZE
+) -> Iterator[pd.DataFrame]:
+    """Yields the rows of the minute csv in processed chunks of `chunksize`
+    rows.
+    """
 
-        min_df.rename({"Local time": "datetime"},
-                        inplace=True, axis='columns')
+    def _process_minute_data(min_df: pd.DataFrame) -> pd.DataFrame:
 
-        min_df['date'] = min_df['datetime'].str.slice(0, 10)
-        min_df['date'] = pd.to_datetime(min_df['date'], format='%d.%m.%Y')
-        min_df['datetime'] = min_df['datetime'].str.slice(0, 19)
+        min_df.rename({"Local time": "datetime"},
+                      inplace=True, axis='columns')
 
-        min_df['datetime'] = pd.to_datetime(
-            min_df['datetime'], format="%d.%m.%Y %H:%M:%S")
+        min_df['datetime'] = _parse_local_time(min_df['datetime'].values)
 
         min_df.set_index('datetime', inplace=True)
 
         return min_df
 
-    if not os.path.isfile(fpath):
-        raise FileNotFoundError
-    df = pd.read_csv(fpath)
-    return _process_minute_data(df) if processor == None else processor(df)
+    if processor is None:
+        processor = _process_minute_data
+
+    chunks = pd.read_csv(fpath, usecols=list(MINUTE_DTYPES),
+                         dtype=MINUTE_DTYPES, chunksize=chunksize)
+    for chunk in chunks:
+        yield processor(chunk)
+
+
+def _parse_local_time(values: np.ndarray) -> np.ndarray:
+    """Parses "Local time" strings into `datetime64[ns]` in one vectorized
+    pass.
+
+    Only the leading `dd.mm.yyyy HH:MM:SS` characters are decoded; anything
+    after them (milliseconds, UTC offset) is ignored, as before. Falls back to
+    `pd.to_datetime` if any value does not follow the fixed-width layout.
+    """
+    try:
+        raw = values.astype('S{}'.format(_LOCAL_TIME_WIDTH))
+    except UnicodeEncodeError:
+        raw = None
+
+    if raw is not None and len(raw) > 0:
+        chars = raw.view(np.uint8).reshape(len(raw), _LOCAL_TIME_WIDTH)
+        digits = chars.astype(np.int64) - ord('0')
+
+        digit_pos = sum(_LOCAL_TIME_DIGITS.values(), [])
+        is_valid = (
+            ((digits[:, digit_pos] >= 0) & (digits[:, digit_pos] <= 9)).all()
+            and all((chars[:, pos] == ord(sep)).all()
+                    for pos, sep in _LOCAL_TIME_SEPARATORS.items()))
+
+        if is_valid:
+            def field(name):
+                positions = _LOCAL_TIME_DIGITS[name]
+                weights = 10 ** np.arange(len(positions) - 1, -1, -1)
+                return digits[:, positions] @ weights
+
+            year, month, day = field('year'), field('month'), field('day')
+            hour, minute, second = \
+                field('hour'), field('minute'), field('second')
+            days = _days_from_civil(year, month, day)
+            is_valid = (
+                ((month >= 1) & (month <= 12) & (day >= 1)).all()
+                and (days < _days_from_civil(year + month // 12,
+                                             month % 12 + 1, 1)).all()
+                and ((hour < 24) & (minute < 60) & (second < 60)).all())
+
+        if is_valid:
+            seconds = days * 86400 + hour * 3600 + minute * 60 + second
+            return seconds.astype('datetime64[s]').astype('datetime64[ns]')
+
+    truncated = pd.Series(values).str.slice(0, _LOCAL_TIME_WIDTH)
+    return pd.to_datetime(truncated, format="%d.%m.%Y %H:%M:%S").values
+
+
+def _days_from_civil(year: np.ndarray, month: np.ndarray,
+                     day: np.ndarray) -> np.ndarray:
+    """Days since 1970-01-01 of proleptic Gregorian dates, vectorized.
+
+    See http://howardhinnant.github.io/date_algorithms.html#days_from_civil
+    """
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    yoe = year - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
 
 
 @timer
@@ -89,7 +388,6 @@ def _read_and_process_fix_data(
     fpath: str, processor: Callable[[pd.DataFrame], pd.DataFrame] = None
 ) -> pd.DataFrame:
 
-    # @cache('cache/fix')
     def _process_fix_data(fix_df: pd.DataFrame) -> pd.DataFrame:
 
         fix_df['datetime'] = pd.to_datetime(
@@ -107,42 +405,38 @@ def _read_and_process_fix_data(
 @timer
 def _read_and_process_daily_data(
     fpath: str, cp_name: str,
-    processor: Callable[[pd.DataFrame], pd.DataFrame] = None
+    processor: Callable[[pd.DataFrame], pd.DataFrame] = None,
+    date_range: DateRange = None
 ) -> pd.DataFrame:
+    """Streams the daily workbook's first sheet in read-only mode.
+
+    Only the date and Bid columns are kept; Ask and volume cells are skipped
+    as the rows stream past. If `date_range` is provided, days outside of it
+    are dropped.
+    """
 
-    # @cache('cache/day_{}'.format(cp_name))
     def process_daily_data(day_df: pd.DataFrame,
                            cp_name: str) -> pd.DataFrame:
 
         f_cpname = reformat_cpname(cp_name)
-        assert validate_day_df(day_df, f_cpname)
-        day_df.rename(columns={'Date': 'datetime'}, inplace=True)
-
-        day_df = drop_cols(day_df, f_cpname)
         day_df = rename_cols(day_df, f_cpname)
 
-        day_df = day_df.loc[(day_df['datetime'] > "2018-01-01") &
-                            (day_df['datetime'] <= "2019-01-01")]
+        # Timestamps are truncated to their date in one vectorized step.
+        day_df['datetime'] = day_df['datetime'].values\
+            .astype('datetime64[D]').astype('datetime64[ns]')
 
-        day_df['datetime'] = day_df['datetime'].apply(
-            lambda dt: datetime.strptime(str(dt), "%Y-%m-%d %H:%M:%S").date())
+        if date_range is not None:
+            day_df = day_df.loc[
+                (day_df['datetime'] >= date_range.start_date_dt) &
+                (day_df['datetime'] <= date_range.end_date_dt)]
 
-        day_df.datetime = pd.to_datetime(day_df.datetime)
         day_df = day_df.set_index('datetime')
 
         return day_df
 
-    def drop_cols(df: pd.DataFrame, f_cpname: str) -> pd.DataFrame:
-        return df.drop(columns=[
-            '{}(Open, Ask)'     .format(f_cpname),
-            '{}(High, Ask)'     .format(f_cpname),
-            '{}(Low, Ask)'      .format(f_cpname),
-            '{}(Close, Ask)'    .format(f_cpname),
-            'Tick Volume({})'   .format(f_cpname)
-        ])
-
     def rename_cols(df: pd.DataFrame, f_cpname: str) -> pd.DataFrame:
         return df.rename(columns={
+            'Date': 'datetime',
             '{}(Open, Bid)*'    .format(f_cpname): 'Open',
             '{}(High, Bid)*'    .format(f_cpname): 'High',
             '{}(Low, Bid)*'     .format(f_cpname): 'Low',
@@ -153,24 +447,54 @@ def _read_and_process_daily_data(
         assert len(cp_name) == 6
         return '{}/{}'.format(cp_name[:3], cp_name[3:])
 
-    @timer
-    def validate_day_df(day_df: pd.DataFrame, f_cpname: str) -> bool:
+    def required_cols(f_cpname: str) -> List[str]:
         assert len(f_cpname) == 7 and '/' in f_cpname
-        required = set([
-            '{}(Open, Ask)'     .format(f_cpname),
-            '{}(High, Ask)'     .format(f_cpname),
-            '{}(Low, Ask)'      .format(f_cpname),
-            '{}(Close, Ask)'    .format(f_cpname),
+        return [
+            'Date',
             '{}(Open, Bid)*'    .format(f_cpname),
             '{}(High, Bid)*'    .format(f_cpname),
             '{}(Low, Bid)*'     .format(f_cpname),
             '{}(Close, Bid)*'   .format(f_cpname),
-            'Tick Volume({})'   .format(f_cpname),
-        ])
-        return (required.issubset(set(day_df.columns)))
+        ]
 
     if not os.path.isfile(fpath):
         raise FileNotFoundError
-    df = pd.read_excel(fpath)
+    df = _read_xlsx_columns(fpath, required_cols(reformat_cpname(cp_name)))
     return process_daily_data(df, cp_name) \
         if processor == None else processor(df)
+
+
+def _read_xlsx_columns(fpath: str, columns: List[str]) -> pd.DataFrame:
+    """Reads `columns` of the first worksheet in `fpath`, streaming its rows.
+
+    The first row is the header. The first requested column holds dates and
+    the rest hold numbers; rows without a date are skipped.
+
+    Raises
+    ------
+    `KeyError`
+        if any of `columns` is not in the header
+    """
+    workbook = openpyxl.load_workbook(fpath, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = list(next(rows, ()))
+
+        missing = [col for col in columns if col not in header]
+        if missing:
+            raise KeyError(f"Columns {missing} not found in {fpath}")
+
+        positions = [header.index(col) for col in columns]
+        values = [[] for _ in columns]
+        for row in rows:
+            if len(row) <= positions[0] or row[positions[0]] is None:
+                continue
+            for vals, pos in zip(values, positions):
+                vals.append(row[pos] if pos < len(row) else None)
+    finally:
+        workbook.close()
+
+    df = pd.DataFrame({columns[0]: pd.to_datetime(values[0])})
+    for col, vals in zip(columns[1:], values[1:]):
+        df[col] = np.array(vals, dtype=float)
+    return df
@@ -0,0 +1,105 @@
+"""
+Process-wide registry of source datasets shared across currency pairs.
+
+Some source files, such as the fix price csv, are read by every currency
+pair. Datasets whose fpath is marked as shared are loaded once, held by the
+registry and handed out to every consumer, which must treat them as
+read-only.
+"""
+
+import logging
+import os
+import threading
+from typing import Callable, Hashable, Iterable
+
+import pandas as pd
+
+from common.decorators import singleton
+
+__all__ = ['DatasetRegistry']
+
+logger = logging.getLogger(__name__)
+
+
+@singleton
+class DatasetRegistry:
+
+    def __init__(self):
+        self.__shared_fpaths = set()
+        self.__datasets = {}
+        self.__load_locks = {}
+        self.__lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    @property
+    def hits(self) -> int:
+        """Number of lookups served by an already loaded dataset."""
+        return self.__hits
+
+    @property
+    def misses(self) -> int:
+        """Number of lookups that required loading the dataset."""
+        return self.__misses
+
+    @property
+    def shared_fpaths(self) -> set:
+        return set(self.__shared_fpaths)
+
+    def share(self, fpaths: Iterable[str]):
+        """Marks `fpaths` as shared, i.e. worth holding once loaded."""
+        with self.__lock:
+            self.__shared_fpaths.update(os.path.realpath(f) for f in fpaths)
+
+    def is_shared(self, fpath: str) -> bool:
+        return os.path.realpath(fpath) in self.__shared_fpaths
+
+    def get(self, fpath: str, loader: Callable[[], pd.DataFrame],
+            params: Hashable = None) -> pd.DataFrame:
+        """Returns the dataset at `fpath`, calling `loader` to load it unless
+        it is shared and already held.
+
+        Parameters
+        ----------
+            fpath : source fpath; symlinks and relative paths are resolved
+            loader : loads and processes the dataset
+            params : optional, reader arguments the loaded dataset depends on
+        """
+        fpath = os.path.realpath(fpath)
+        key = (fpath, params)
+
+        if fpath not in self.__shared_fpaths:
+            with self.__lock:
+                self.__misses += 1
+            return loader()
+
+        with self.__lock:
+            load_lock = self.__load_locks.setdefault(key, threading.Lock())
+
+        # Concurrent lookups of the same dataset wait for a single load.
+        with load_lock:
+            with self.__lock:
+                if key in self.__datasets:
+                    self.__hits += 1
+                    return self.__datasets[key]
+                self.__misses += 1
+
+            logger.debug(f"Loading shared dataset {fpath}")
+            df = loader()
+
+            with self.__lock:
+                self.__datasets[key] = df
+            return df
+
+    def clear(self):
+        """Drops all held datasets, shared fpaths and counters."""
+        with self.__lock:
+            self.__shared_fpaths.clear()
+            self.__datasets.clear()
+            self.__load_locks.clear()
+            self.__hits = 0
+            self.__misses = 0
+
+    def __repr__(self):
+        return (f"DatasetRegistry({len(self.__datasets)} held, "
+                f"{self.__hits} hits, {self.__misses} misses)")
@@ -0,0 +1,175 @@
+"""
+Out-of-core, day by day computation of a currency pair's daily output.
+
+Every output row of `app.exec` depends only on the source data of its own
+day, except for PDFX, whose benchmark is the last fix before the day (see
+`pyfx.incremental`). Minute data is therefore read as a stream of chunks and
+cut into blocks of whole days, in the time of the output, i.e. after the time
+shift. Each block is computed along with the daily and fix rows of its days,
+and its output rows are passed on before the next block is read. The minute
+data held is thus that of one block, however long the history; daily and fix
+data, a row per day, are held whole.
+"""
+
+import logging
+from typing import Callable, Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+
+from common import utils
+from common.config import Config
+from ds.datacontainer import DataContainer, SourceNotLoadedError
+from pyfx import kernels, read
+
+__all__ = ['CHUNKSIZE', 'stream']
+
+logger = logging.getLogger(__name__)
+
+
+# Source minute rows read at a time: a day of minute bars.
+CHUNKSIZE = 24 * 60
+
+
+def stream(cp_name: str, config: Config, price_dfs: dict,
+           minute_chunks: Iterable[pd.DataFrame],
+           compute: Callable[[DataContainer], pd.DataFrame],
+           block_days: int = 1) -> Iterator[pd.DataFrame]:
+    """Yields the output of `compute` block by block, in chronological order.
+
+    Days with daily or fix data but no minute data are computed along with
+    the next block, or the last one.
+
+    Parameters
+    ----------
+        cp_name : currency pair name, e.g. `EURUSD`
+        config : the configuration
+        price_dfs : the daily and fix data, as returned by `read.read_data`
+        minute_chunks : the minute data in chronological chunks, as yielded
+            by `read.read_minute_chunks`, or `None` if no metric needs it
+        compute : computes the output of the data in a DataContainer
+        block_days : days of minute data computed at once
+    """
+    data = DataContainer(price_dfs, cp_name, config)
+    by_day = _by_day(data, cp_name)
+    other_days = np.unique(np.concatenate(
+        [codes for _, codes, _ in by_day.values()]
+        or [np.empty(0, dtype=np.int64)]))
+
+    def run(days: np.ndarray, minute_df: pd.DataFrame) -> pd.DataFrame:
+        dfs = {src: _between(*df_codes, days[0], days[-1])
+               for src, df_codes in by_day.items()}
+        if minute_df is not None:
+            dfs[read.MINUTE] = minute_df
+        output = compute(DataContainer(dfs, cp_name, config))
+        return output[np.isin(kernels.date_codes(output.index), days)]
+
+    blocks = iter(()) if minute_chunks is None else \
+        _minute_blocks(minute_chunks, config, block_days)
+
+    taken = 0   # days of `other_days` computed so far
+    block = next(blocks, None)
+    while block is not None:
+        days, minute_df = block
+        block = next(blocks, None)
+
+        # Take the days without minute data up to the block's last day, or
+        # all of them after the last block.
+        end = len(other_days) if block is None else \
+            np.searchsorted(other_days, days[-1], side='right')
+        owned, taken = other_days[taken:end], max(taken, end)
+
+        output = run(np.union1d(days, owned), minute_df)
+        if len(output):
+            yield output
+
+    if taken == 0 and len(other_days):
+        output = run(other_days, None if minute_chunks is None
+                     else _empty_minute_df())
+        if len(output):
+            yield output
+
+
+def _minute_blocks(chunks: Iterable[pd.DataFrame], config: Config,
+                   block_days: int) -> Iterator[tuple]:
+    """Cuts chronological minute chunks into blocks of `block_days` whole
+    days, in the time of the output. Yields the day codes of each block and
+    its minute data, as read.
+    """
+    shift = pd.Timedelta(hours=config.time_shift) \
+        if config.should_time_shift else None
+
+    def day_codes(df: pd.DataFrame) -> np.ndarray:
+        index = df.index + shift if shift is not None else df.index
+        return kernels.day_codes(index).astype(np.int64)
+
+    # Chunks read since the last block, their day codes and distinct days.
+    frames, codes, days = [], [], []
+    for chunk in chunks:
+        if not len(chunk):
+            continue
+        frames.append(chunk)
+        codes.append(day_codes(chunk))
+        new = np.unique(codes[-1])
+        days.extend(new[1:] if days and new[0] == days[-1] else new)
+
+        # The last day may continue in the next chunk.
+        if len(days) > block_days:
+            buf, buf_codes = pd.concat(frames), np.concatenate(codes)
+            while len(days) > block_days:
+                n = np.searchsorted(buf_codes, days[block_days])
+                yield np.array(days[:block_days]), buf.iloc[:n]
+                buf, buf_codes = buf.iloc[n:], buf_codes[n:]
+                days = days[block_days:]
+            frames, codes = [buf], [buf_codes]
+
+    if not days:
+        return
+    buf, buf_codes = pd.concat(frames), np.concatenate(codes)
+    for i in range(0, len(days), block_days):
+        block = days[i:i + block_days]
+        lo = np.searchsorted(buf_codes, block[0])
+        hi = np.searchsorted(buf_codes, block[-1], side='right')
+        yield np.array(block), buf.iloc[lo:hi]
+
+
+def _by_day(data: DataContainer, cp_name: str) -> dict:
+    """The loaded daily and fix data in day order, with the day code of each
+    row and, for fix data, the positions of the rows with a fix of
+    `cp_name`.
+    """
+    ans = {}
+    for src, view in [(read.DAILY, lambda: data.daily_price_df),
+                      (read.FIX, lambda: data.fix_price_df)]:
+        try:
+            df = view()
+        except SourceNotLoadedError:
+            continue
+        codes = kernels.day_codes(df.index).astype(np.int64)
+        order = np.argsort(codes, kind='stable')
+        df, codes = df.iloc[order], codes[order]
+        valid = np.flatnonzero(df[utils.fix_column(cp_name)].notna().values) \
+            if src == read.FIX else None
+        ans[src] = (df, codes, valid)
+    return ans
+
+
+def _between(df: pd.DataFrame, codes: np.ndarray, valid: np.ndarray,
+             first: int, last: int) -> pd.DataFrame:
+    """The rows of `df` from day `first` to day `last`. Rows of fix data also
+    keep the last fix before `first`, which the PDFX benchmark of the first
+    days is taken from.
+    """
+    lo = np.searchsorted(codes, first)
+    hi = np.searchsorted(codes, last, side='right')
+    if valid is not None:
+        before = np.searchsorted(valid, lo) - 1
+        if before >= 0:
+            return df.iloc[np.r_[valid[before], lo:hi]]
+    return df.iloc[lo:hi]
+
+
+def _empty_minute_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {col: np.empty(0) for col in ['Open', 'High', 'Low', 'Close']},
+        index=pd.DatetimeIndex([], name='datetime'))
@@ -1,19 +1,38 @@
 import functools
+import math
 import os
+from datetime import date, datetime
 from pathlib import Path
 from typing import List
 
+import numpy as np
 import pandas as pd
+import xlsxwriter
 
-from common.utils import xlsx_diff
+from common.xlsxdiff import compare_xlsx
 
-__all__ = ['df_to_xlsx', 'merge_dfs']
+__all__ = ['df_to_xlsx', 'merge_dfs', 'XlsxStreamWriter']
 
 
-def check_xlsx_consistency(benchmark_fname: str):
+# Excel's limits per worksheet.
+EXCEL_MAX_ROWS = 1048576
+EXCEL_MAX_COLS = 16384
+EXCEL_MAX_SHEET_NAME_LEN = 31
+
+# Cell styles, matching those pandas gives to headers and index cells.
+HEADER_FORMAT = {'bold': True, 'border': 1, 'align': 'center',
+                 'valign': 'top'}
+DATE_FORMAT = 'YYYY-MM-DD'
+DATETIME_FORMAT = 'YYYY-MM-DD HH:MM:SS'
+
+
+def check_xlsx_consistency(benchmark_fname: str, sheet=0, rtol: float = 0,
+                           atol: float = 0, strict: bool = False):
     """
     Func decorator that checks if the excel produced by the function is the 
-    same as the benchmark. Result is printed.
+    same as the benchmark, numbers within the given tolerance. The diff
+    summary is printed; with `strict`, a difference raises
+    `XlsxInconsistencyError`.
     """
     if not os.path.isfile(benchmark_fname):
         raise FileNotFoundError
@@ -22,13 +41,22 @@ def check_xlsx_consistency(benchmark_fname: str):
         @functools.wraps(xlsx_writing_func)
         def wrapper(*args, **kwargs):
             fpath = xlsx_writing_func(*args, **kwargs)
-            is_consistent = xlsx_diff(
-                original_fname=benchmark_fname, new_fname=fpath)
-            print("Consistency check: {}".format(is_consistent))
+            diff = compare_xlsx(benchmark_fname, fpath, sheet=sheet,
+                                rtol=rtol, atol=atol)
+            print("Consistency check: {}\n{}".format(diff.identical, diff))
+            if strict and not diff.identical:
+                raise XlsxInconsistencyError(
+                    f"{fpath} differs from {benchmark_fname}:\n{diff}")
+            return fpath
         return wrapper
     return _test
 
 
+class XlsxInconsistencyError(AssertionError):
+    """Raised when an output differs from its benchmark."""
+    pass
+
+
 # @check_xlsx_consistency("data/dataout/dataout__20190606_230751/dataout_GBPUSD.xlsx")
 def df_to_xlsx(df: pd.DataFrame, fname: str, dir: str = '',
                folder_name: str = '', folder_unique_id: str = '',
@@ -53,18 +81,249 @@ def df_to_xlsx(df: pd.DataFrame, fname: str, dir: str = '',
         `.xlsx` will be appended to fname if not provided.
     """
 
+    fname = xlsx_fpath(fname, dir, folder_name, folder_unique_id,
+                       fname_unique_id)
+
+    with XlsxStreamWriter(fname, col_width=col_width) as writer:
+        writer.open_sheet(sheet_name, df.columns, df.index.name).append(df)
+
+    return fname
+
+
+def xlsx_fpath(fname: str, dir: str = '', folder_name: str = '',
+               folder_unique_id: str = '', fname_unique_id: str = '') -> str:
+    """Builds the output fpath the way `df_to_xlsx` does, creating its
+    folder if needed.
+    """
     path = _build_path(dir, folder_name, folder_unique_id)
     fname += fname_unique_id
-    if fname[-5] != '.xlsx':
+    if fname[-5:] != '.xlsx':
         fname += '.xlsx'
-    fname = '/'.join([path, fname])
+    return '/'.join([path, fname])
 
-    with pd.ExcelWriter(fname, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name=sheet_name)
-        sheet = writer.sheets[sheet_name]
-        sheet.set_column(0, len(df.columns), col_width)
 
-    return fname
+class XlsxStreamWriter:
+    """
+    Streams frames into a xlsx workbook row by row.
+
+    The workbook is written in xlsxwriter's `constant_memory` mode, so rows
+    are flushed to disk as soon as they are complete and memory stays flat
+    however many rows are written. The layout is that of `DataFrame.to_excel`:
+    one header row per column level, with repeated labels merged, a blank row
+    under multi-level headers, and the index in the first column. Tables
+    wider than a worksheet continue on further worksheets.
+
+    Args: the output fpath, and the width of every column
+    """
+
+    def __init__(self, fpath: str, col_width: int = 15):
+        self.__fpath = fpath
+        self.__col_width = col_width
+        self.__workbook = xlsxwriter.Workbook(
+            fpath, {'constant_memory': True})
+        self.__formats = {
+            'header': self.__workbook.add_format(HEADER_FORMAT),
+            'date': self.__workbook.add_format(
+                dict(HEADER_FORMAT, num_format=DATE_FORMAT)),
+            'datetime': self.__workbook.add_format(
+                dict(HEADER_FORMAT, num_format=DATETIME_FORMAT)),
+            'value_date': self.__workbook.add_format(
+                {'num_format': DATE_FORMAT}),
+            'value_datetime': self.__workbook.add_format(
+                {'num_format': DATETIME_FORMAT}),
+        }
+        self.__sheet_names = set()
+
+    @property
+    def fpath(self) -> str:
+        return self.__fpath
+
+    def open_sheet(self, sheet_name: str, columns: pd.Index,
+                   index_name: str = None) -> 'SheetStream':
+        """Starts a table with the given columns, and writes its header.
+
+        The table takes worksheet `sheet_name`, and if it has more columns
+        than fit, worksheets `sheet_name_2`, `sheet_name_3`, ... Level-0
+        column groups are kept on one worksheet where possible.
+        """
+        sheets = []
+        for i, cols in enumerate(_split_columns(columns)):
+            name = sheet_name if i == 0 else '{}_{}'.format(sheet_name, i + 1)
+            sheets.append((self._add_worksheet(name), cols))
+        return SheetStream(sheets, columns, index_name, self.__formats,
+                           self.__col_width)
+
+    def close(self):
+        self.__workbook.close()
+
+    def _add_worksheet(self, name: str):
+        name = name[:EXCEL_MAX_SHEET_NAME_LEN]
+        if name.lower() in self.__sheet_names:
+            raise ValueError(f"Duplicate worksheet name `{name}`")
+        self.__sheet_names.add(name.lower())
+        return self.__workbook.add_worksheet(name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SheetStream:
+    """A table being streamed into one or more worksheets; see
+    `XlsxStreamWriter.open_sheet`.
+    """
+
+    def __init__(self, sheets: list, columns: pd.Index, index_name,
+                 formats: dict, col_width: int):
+        self.__sheets = sheets
+        self.__columns = columns
+        self.__formats = formats
+
+        nlevels = columns.nlevels
+        # Multi-level headers are followed by a row holding the index name.
+        self.__row = nlevels + 1 if nlevels > 1 else nlevels
+
+        for sheet, cols in sheets:
+            sheet.set_column(0, len(cols), col_width)
+            self._write_header(sheet, columns[cols], index_name)
+
+    @property
+    def rows_written(self) -> int:
+        return self.__row
+
+    def append(self, df: pd.DataFrame):
+        """Writes the rows of `df`, whose columns must be the table's."""
+        if not df.columns.equals(self.__columns):
+            raise ValueError("Columns differ from those of the sheet")
+        if self.__row + len(df) > EXCEL_MAX_ROWS:
+            raise ValueError(
+                f"{self.__row + len(df)} rows exceed Excel's limit of "
+                f"{EXCEL_MAX_ROWS}")
+
+        index = [self._index_cell(v) for v in df.index]
+        blocks = [(sheet, [_column_writer(sheet, df.iloc[:, c],
+                                          self.__formats)
+                           for c in cols])
+                  for sheet, cols in self.__sheets]
+
+        # In constant memory mode, each row must be complete before the next
+        # is started.
+        for i, (value, fmt) in enumerate(index):
+            row = self.__row + i
+            for sheet, writers in blocks:
+                if value is not None:
+                    sheet.write(row, 0, value, fmt)
+                for col, write in enumerate(writers, start=1):
+                    write(row, col, i)
+
+        self.__row += len(df)
+
+    def _write_header(self, sheet, columns: pd.Index, index_name):
+        header = self.__formats['header']
+        nlevels = columns.nlevels
+        labels = list(columns) if nlevels > 1 else [(c,) for c in columns]
+
+        for level in range(nlevels):
+            sheet.write_blank(level, 0, None, header)
+            if level < nlevels - 1:
+                # Merge runs of repeated labels under the same parents.
+                start = 0
+                for end in range(1, len(labels) + 1):
+                    if (end < len(labels) and labels[end][:level + 1]
+                            == labels[start][:level + 1]):
+                        continue
+                    value = _header_value(labels[start][level])
+                    if end - start > 1:
+                        sheet.merge_range(level, start + 1, level, end,
+                                          value, header)
+                    else:
+                        sheet.write(level, start + 1, value, header)
+                    start = end
+            else:
+                for col, label in enumerate(labels, start=1):
+                    sheet.write(level, col, _header_value(label[level]),
+                                header)
+
+        if index_name is not None:
+            row = nlevels if nlevels > 1 else 0
+            sheet.write(row, 0, str(index_name), header)
+
+    def _index_cell(self, value):
+        if isinstance(value, datetime):
+            return value, self.__formats['datetime']
+        if isinstance(value, date):
+            return value, self.__formats['date']
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return None, None
+        return _header_value(value), self.__formats['header']
+
+
+def _split_columns(columns: pd.Index) -> List[np.ndarray]:
+    """Positions of the columns of each worksheet, keeping level-0 groups
+    whole unless a group alone is wider than a worksheet.
+    """
+    width = EXCEL_MAX_COLS - 1
+    if len(columns) <= width:
+        return [np.arange(len(columns))]
+
+    labels = columns.get_level_values(0) if columns.nlevels > 1 else columns
+    starts = [0] + [i for i in range(1, len(labels))
+                    if labels[i] != labels[i - 1]] + [len(labels)]
+
+    sheets, start = [], 0
+    for end in starts[1:]:
+        if end - start <= width:
+            continue
+        # Close the sheet at the last group boundary that fits, or mid-group.
+        fitting = [s for s in starts if start < s <= start + width]
+        cut = fitting[-1] if fitting else start + width
+        while end - cut > width:
+            sheets.append(np.arange(start, cut))
+            start, cut = cut, cut + width
+        sheets.append(np.arange(start, cut))
+        start = cut
+    sheets.append(np.arange(start, len(labels)))
+    return sheets
+
+
+def _column_writer(sheet, column: pd.Series, formats: dict):
+    """Returns `write(row, col, i)`, writing the i-th value of `column`."""
+    values = column.tolist()
+
+    if column.dtype.kind in 'fiu':
+        write_number = sheet.write_number
+
+        def write(row, col, i):
+            v = values[i]
+            if v == v and v not in (math.inf, -math.inf):
+                write_number(row, col, v)
+        return write
+
+    def write(row, col, i):
+        v = values[i]
+        if v is None or (isinstance(v, float) and (v != v or math.isinf(v))):
+            return
+        if isinstance(v, (bool, np.bool_)):
+            sheet.write_boolean(row, col, bool(v))
+        elif isinstance(v, (int, float, np.number)):
+            sheet.write_number(row, col, v)
+        elif isinstance(v, datetime):
+            sheet.write_datetime(row, col, v, formats['value_datetime'])
+        elif isinstance(v, date):
+            sheet.write_datetime(row, col, v, formats['value_date'])
+        else:
+            # As in pandas, e.g. `datetime.time` is written as text.
+            sheet.write_string(row, col, str(v))
+    return write
+
+
+def _header_value(label):
+    if isinstance(label, (int, float, np.number)) \
+            and not isinstance(label, bool):
+        return label
+    return str(label)
 
 
 def _build_path(dir: str, folder_name: str, folder_uid: str) -> str:
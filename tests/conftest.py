@@ -0,0 +1,70 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+import yaml
+
+from tests.context import common
+from common.config import Config
+from pyfx import read
+
+DEFAULT_CONFIG_FPATH = 'tests/testdata/config/cfg_default1.yml'
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Writes the default test config with the given sections merged into
+    it, and loads it. Dict settings are merged into the default's, others
+    replace them.
+    """
+    def merge(into: dict, changes: dict):
+        for key, value in changes.items():
+            if isinstance(value, dict) and isinstance(into.get(key), dict):
+                merge(into[key], value)
+            else:
+                into[key] = value
+
+    def make(**sections) -> Config:
+        with open(DEFAULT_CONFIG_FPATH) as f:
+            cfg = yaml.safe_load(f)
+        merge(cfg, sections)
+        fpath = tmp_path / 'cfg.yml'
+        with open(fpath, 'w') as f:
+            yaml.safe_dump(cfg, f)
+        return Config(fpath)
+    return make
+
+
+@pytest.fixture
+def make_sources():
+    """Makes `n_days` of synthetic EURUSD data from 2018-03-05, weekends
+    included, across the start of the DST hour ahead period. Fixes are
+    missing on weekends, and minute data on the days from `minute_gap[0]`
+    up to `minute_gap[1]`, if given.
+    """
+    def make(n_days: int, minute_gap: tuple = None) -> dict:
+        rng = np.random.RandomState(0)
+
+        index = pd.date_range('2018-03-05', periods=n_days * 1440,
+                              freq='min', name='datetime')
+        keep = rng.rand(len(index)) > 0.05
+        if minute_gap is not None:
+            keep &= (index < minute_gap[0]) | (index >= minute_gap[1])
+        index = index[keep]
+        close = (1.2 + rng.normal(0, 2e-4, len(index)).cumsum()).round(4)
+        minute_df = pd.DataFrame({
+            'Open': close, 'High': close + 1e-4, 'Low': close - 1e-4,
+            'Close': close
+        }, index=index)
+
+        days = pd.date_range('2018-03-05', periods=n_days, name='datetime')
+        daily_df = pd.DataFrame({
+            'Open': 1.2, 'High': 1.21, 'Low': 1.19, 'Close': 1.2
+        }, index=days[::-1])
+        fix = pd.Series(np.linspace(1.19, 1.21, n_days), index=days)
+        fix[days.dayofweek >= 5] = np.nan
+        fix_df = pd.DataFrame({'EUR-USD': fix, 'USD-JPY': 110.0})
+
+        return {read.MINUTE: minute_df, read.DAILY: daily_df,
+                read.FIX: fix_df}
+    return make
@@ -0,0 +1,151 @@
+import pytest
+
+from datetime import date
+
+import openpyxl
+import pandas as pd
+
+from tests.context import app
+from common.config import Config
+from common.xlsxdiff import compare_xlsx
+from pyfx import read
+from pyfx.registry import DatasetRegistry
+
+
+@pytest.fixture
+def execution_config(make_config):
+    """Writes a config whose `execution` section is set by the caller."""
+    def make(**execution) -> Config:
+        return make_config(execution=execution)
+    return make
+
+
+def test_worker_count_capped_by_pairs(execution_config):
+    """Tests there are never more workers than currency pairs."""
+    config = execution_config(workers=64)
+    assert app._worker_count(config, config.workers) == \
+        len(config.currency_pairs)
+
+
+def test_worker_count_capped_by_memory_budget(execution_config):
+    """Tests the memory budget caps the number of workers, leaving at least
+    one.
+    """
+    config = execution_config(workers=4, memory_budget_mb=0)
+    assert app._worker_count(config, config.workers) == 1
+
+    per_pair = max(app._estimate_pair_memory(config, cp)
+                   for cp in config.currency_pairs)
+    config = execution_config(
+        workers=4, memory_budget_mb=(3 * per_pair + 1) / 2 ** 20)
+    assert app._worker_count(config, config.workers) == 3
+
+
+@pytest.mark.parametrize('single_workbook', [False, True])
+def test_run_pipelined_writes_each_pair(execution_config, tmp_path,
+                                        monkeypatch, single_workbook):
+    """Tests each currency pair's output is written, to a workbook each or
+    to a worksheet each of one workbook.
+    """
+    config = execution_config(single_workbook=single_workbook)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app, '_read_pair', lambda cp, config: cp)
+    monkeypatch.setattr(
+        app, '_compute_pair', lambda func, cp, **kwargs: pd.DataFrame(
+            {'Open': [1.0, 2.0]}, index=[date(2019, 1, 1), date(2019, 1, 2)]))
+
+    app.run_pipelined(config, folder_suffix='x')
+
+    folder = tmp_path / app.OUTPUT_DIR / (app.OUTPUT_FOLDER + 'x')
+    if single_workbook:
+        workbook = openpyxl.load_workbook(folder / 'dataout.xlsx')
+        assert workbook.sheetnames == config.currency_pairs
+    else:
+        assert sorted(p.name for p in folder.iterdir()) == sorted(
+            'dataout_{}.xlsx'.format(cp) for cp in config.currency_pairs)
+
+
+
+@pytest.mark.parametrize('fails', [False, True])
+def test_exec_pair_returns_registry_counts(execution_config, tmp_path,
+                                           monkeypatch, fails):
+    """Tests a worker returns the traceback of a failed run, and the hits
+    and misses of its dataset registry during the run only.
+    """
+    config = execution_config()
+    registry = DatasetRegistry()
+    registry.clear()
+    shared = str(tmp_path / 'fix.csv')
+    registry.share([shared])
+    registry.get(shared, pd.DataFrame)
+
+    def run(**kwargs):
+        for _ in range(2):
+            registry.get(shared, pd.DataFrame)
+        registry.get(str(tmp_path / 'min.csv'), pd.DataFrame)
+        if fails:
+            raise ValueError('no data')
+
+    monkeypatch.setattr(app, 'exec', run)
+    try:
+        error, hits, misses = app._exec_pair('EURUSD', config, 'x')
+    finally:
+        registry.clear()
+
+    assert (error is not None and 'no data' in error) == fails
+    assert (hits, misses) == (2, 1)
+
+
+@pytest.fixture
+def write_sources(make_sources, tmp_path):
+    """Writes synthetic EURUSD sources in the layout of the source files,
+    and returns their fpaths by the keys of `overridden_filepaths`.
+    """
+    def write(n_days: int, minute_gap: tuple = None) -> dict:
+        sources = make_sources(n_days, minute_gap)
+        fpaths = {key: str(tmp_path / fname) for key, fname in [
+            ('Minute', 'EURUSD_Minute.csv'), ('Fix', 'fix.csv'),
+            ('Daily', 'EURUSD_Daily.xlsx')]}
+
+        minute_df = sources[read.MINUTE]
+        minute_df.assign(**{'Local time': minute_df.index.strftime(
+            '%d.%m.%Y %H:%M:%S.000 GMT-0500')}).to_csv(
+            fpaths['Minute'], index=False)
+
+        sources[read.FIX].to_csv(fpaths['Fix'], index_label='datetime',
+                                 date_format='%Y-%m-%d')
+
+        workbook = openpyxl.Workbook()
+        workbook.active.append(['Date'] + [
+            'EUR/USD({}, Bid)*'.format(col) for col in
+            ['Open', 'High', 'Low', 'Close']])
+        for day, row in sources[read.DAILY].iterrows():
+            workbook.active.append([day.to_pydatetime()] + list(row))
+        workbook.save(fpaths['Daily'])
+        return fpaths
+    return write
+
+
+@pytest.mark.parametrize('block_days', [1, 5])
+def test_stream_pair_matches_exec(make_config, write_sources, tmp_path,
+                                  monkeypatch, block_days):
+    """Tests streaming a currency pair writes the workbook `exec` writes from
+    the same source files, including days without minute data.
+    """
+    config = make_config(
+        streaming={'block_days': block_days},
+        overridden_filepaths={'EURUSD': write_sources(
+            12, minute_gap=('2018-03-09', '2018-03-11'))})
+    monkeypatch.setattr(app, 'OUTPUT_DIR', str(tmp_path / 'dataout') + '/')
+
+    app.exec(cp_name='EURUSD', config=config, folder_suffix='batch')
+    app.stream_pair('EURUSD', config, folder_suffix='stream')
+
+    def fpath(suffix: str) -> str:
+        return app.OUTPUT_DIR + app.OUTPUT_FOLDER + suffix \
+            + '/dataout_EURUSD.xlsx'
+
+    diff = compare_xlsx(fpath('batch'), fpath('stream'))
+
+    assert diff.identical, str(diff)
+    assert diff.expected_shape[0] > 12
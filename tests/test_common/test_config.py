@@ -1,5 +1,6 @@
 import pytest
 
+import os
 from pathlib import Path
 from typing import Iterator
 
@@ -8,6 +9,7 @@ import yaml
 from tests.context import common
 from common import config
 from common.config import Config
+from pyfx import read
 
 
 def test_config_handles_file_not_found():
@@ -126,3 +128,77 @@ def test_config_src_metric_validation():
                 / 'config' / 'cfg_src_metric_err1.yml')
     with pytest.raises(config.ConfigSrcMetricTypeError):
         cfg = Config(testpath)
+
+
+def test_config_shared_fpaths(config_test_paths):
+    """Tests the fix price file, read by every currency pair, is the only
+    shared source file.
+    """
+    for cfgpath in config_test_paths:
+        test_cfg = Config(cfgpath)
+        fix_fpath = test_cfg.fpath(test_cfg.currency_pairs[0])[read.FIX]
+        assert test_cfg.shared_fpaths() == {os.path.realpath(fix_fpath)}
+
+
+def test_config_property_dst_periods(config_test_paths):
+    """Tests Config loads hour ahead and hour delay periods"""
+    for cfgpath in config_test_paths:
+        with open(cfgpath) as cfg:
+            expected_cfg = yaml.safe_load(cfg)
+        dst_cfg = expected_cfg['data_adjustments']['daylight_saving_mode']
+        test_cfg = Config(cfgpath)
+
+        for key, periods in [
+                ('hour_ahead_periods', test_cfg.dst_hour_ahead_periods),
+                ('hour_delay_periods', test_cfg.dst_hour_delay_periods)]:
+            expected = dst_cfg.get(key) or []
+            assert len(periods) == len(expected)
+            for period, expected_period in zip(periods, expected):
+                assert period.start_date.strftime('%Y/%m/%d') == \
+                    expected_period['start_date']
+                assert period.end_date.strftime('%Y/%m/%d') == \
+                    expected_period['end_date']
+
+
+@pytest.mark.parametrize('disabled, expected', [
+    ([], {read.MINUTE, read.FIX, read.DAILY}),
+    (['ohlc'], {read.MINUTE, read.FIX}),
+    (['pdfx'], {read.MINUTE, read.DAILY}),
+    (['max_pips', 'pdfx', 'minutely_data', 'period_avg_data'], {read.DAILY}),
+])
+def test_config_required_sources(make_config, disabled, expected):
+    """Tests only the sources of enabled metrics are required."""
+    test_cfg = make_config(
+        metrics={metric: {'enabled': False} for metric in disabled})
+    assert test_cfg.required_sources == expected
+    assert set(test_cfg.required_fpaths('EURUSD')) == expected
+
+
+def _minutes(start: str, end: str) -> set:
+    def minute(hhmm):
+        return int(hhmm[:2]) * 60 + int(hhmm[3:])
+    return set(range(minute(start), minute(end) + 1))
+
+
+@pytest.mark.parametrize('changes, expected', [
+    # The time range, moved by DST, the benchmark times, the minutely
+    # sections from a minute after their start, and the period averages.
+    ({}, _minutes('09:50', '10:02') | _minutes('10:30', '10:31')
+     | _minutes('10:45', '10:46') | _minutes('10:50', '11:03')
+     | _minutes('11:50', '12:02')),
+    ({'metrics': {'max_pips': {'enabled': False},
+                  'pdfx': {'enabled': False},
+                  'minutely_data': {'enabled': False}}},
+     _minutes('10:58', '11:02')),
+    ({'metrics': {'max_pips': {'enabled': False},
+                  'pdfx': {'enabled': False},
+                  'minutely_data': {'enabled': False}},
+      'time_shift': {'should_shift_time': True, 'hour_delta': 11}},
+     _minutes('23:58', '23:59') | _minutes('00:00', '00:02')),
+    ({'execution': {'prune_minutes': False}}, None),
+])
+def test_config_required_minutes(make_config, changes, expected):
+    """Tests the required minutes are those the enabled metrics read, in
+    the time of the source data.
+    """
+    assert make_config(**changes).required_minutes == expected
@@ -0,0 +1,76 @@
+import pytest
+
+import threading
+
+from tests.context import common
+from common.pipeline import run_pipeline
+
+
+def test_pipeline_writes_each_output_in_order():
+    """Tests each item flows through the stages, and outputs are written in
+    item order.
+    """
+    written = []
+    run_pipeline(range(5), read=lambda i: i * 10,
+                 compute=lambda i, x: (i, x + 1),
+                 write=lambda i, out: written.append(out))
+    assert written == [(i, i * 10 + 1) for i in range(5)]
+
+
+def test_pipeline_reads_ahead_while_computing():
+    """Tests the next item is read while the current one is computed, but
+    no further ahead than the queue allows.
+    """
+    read_next = threading.Event()
+    reads = []
+
+    def read(i):
+        reads.append(i)
+        if i == 2:
+            read_next.set()
+        return i
+
+    def compute(i, x):
+        if i == 0:
+            assert read_next.wait(timeout=5)
+            # Item 1 is queued and item 2 read, waiting for room.
+            assert reads == [0, 1, 2]
+        return x
+
+    run_pipeline(range(4), read, compute, lambda i, out: None, maxsize=1)
+    assert reads == [0, 1, 2, 3]
+
+
+def test_pipeline_writes_while_computing():
+    """Tests an output is written while the next item is computed."""
+    written = threading.Event()
+
+    def compute(i, x):
+        if i == 1:
+            assert written.wait(timeout=5)
+        return x
+
+    run_pipeline(range(2), lambda i: i, compute,
+                 lambda i, out: written.set())
+
+
+@pytest.mark.parametrize('stage', ['read', 'compute', 'write'])
+def test_pipeline_raises_stage_error(stage):
+    """Tests an exception in any stage stops the pipeline and is raised,
+    after the outputs of the items before it are written.
+    """
+    written = []
+
+    def fail_on(name, func):
+        def call(i, *args):
+            if name == stage and i == 2:
+                raise RuntimeError(name)
+            return func(i, *args)
+        return call
+
+    with pytest.raises(RuntimeError, match=stage):
+        run_pipeline(range(100), fail_on('read', lambda i: i),
+                     fail_on('compute', lambda i, x: x),
+                     fail_on('write', lambda i, out: written.append(out)))
+    assert written[:2] == [0, 1]
+    assert 2 not in written and len(written) < 100
@@ -0,0 +1,64 @@
+import pytest
+
+import threading
+from collections import Counter
+
+from tests.context import common
+from common.scheduler import Scheduler, SchedulerError
+
+
+@pytest.fixture
+def calls() -> Counter:
+    return Counter()
+
+
+@pytest.fixture
+def scheduler(calls) -> Scheduler:
+    """A diamond: `a` feeds `b` and `c`, which both feed `d`."""
+    def node(name, func):
+        def counted(*args):
+            calls[name] += 1
+            return func(*args)
+        return counted
+
+    s = Scheduler(threads=4)
+    s.add('a', node('a', lambda: 1))
+    s.add('b', node('b', lambda a: a + 1), ['a'])
+    s.add('c', node('c', lambda a: a * 10), ['a'])
+    s.add('d', node('d', lambda b, c: (b, c)), ['b', 'c'])
+    s.add('unused', node('unused', lambda: 0))
+    return s
+
+
+def test_scheduler_runs_dependencies_once(scheduler, calls):
+    """Tests inputs are passed in order, and each node runs once."""
+    assert scheduler.run(['d', 'b']) == {'d': (2, 10), 'b': 2}
+    assert calls == Counter({'a': 1, 'b': 1, 'c': 1, 'd': 1})
+    assert set(scheduler.timings) == {'a', 'b', 'c', 'd'}
+
+
+def test_scheduler_runs_independent_nodes_concurrently():
+    """Tests nodes whose inputs are available run at the same time."""
+    barrier = threading.Barrier(2, timeout=5)
+    s = Scheduler(threads=2)
+    s.add('x', lambda: barrier.wait())
+    s.add('y', lambda: barrier.wait())
+    s.run(['x', 'y'])
+
+
+def test_scheduler_raises_node_errors(scheduler):
+    scheduler.add('e', lambda d: 1 / 0, ['d'])
+    with pytest.raises(ZeroDivisionError):
+        scheduler.run(['e'])
+
+
+@pytest.mark.parametrize('nodes', [
+    [('x', ['y']), ('y', ['x'])],
+    [('x', ['missing'])],
+])
+def test_scheduler_rejects_bad_graphs(nodes):
+    s = Scheduler()
+    for name, inputs in nodes:
+        s.add(name, lambda *args: None, inputs)
+    with pytest.raises(SchedulerError):
+        s.run(['x'])
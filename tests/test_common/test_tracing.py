@@ -0,0 +1,145 @@
+import pytest
+
+import json
+import time
+
+import numpy as np
+
+from tests.context import common
+from common import decorators, tracing
+from common.scheduler import Scheduler
+from common.tracing import Tracer
+
+
+def paths(tracer: Tracer) -> list:
+    """`parent > child` names of the spans, in start order."""
+    spans = {s.id: s for s in tracer.spans}
+
+    def path(s):
+        parent = spans.get(s.parent_id)
+        return s.name if parent is None else path(parent) + ' > ' + s.name
+    return [path(s) for s in sorted(spans.values(), key=lambda s: s.start)]
+
+
+def test_spans_nest():
+    tracer = Tracer()
+    tracer.start()
+
+    @tracer.traced()
+    def child():
+        time.sleep(0.01)
+
+    with tracer.span('pair', cp_name='EURUSD') as pair:
+        with tracer.span('exec'):
+            child()
+            child()
+    with pytest.raises(ValueError):
+        with tracer.span('failing'):
+            raise ValueError
+
+    assert paths(tracer) == ['pair', 'pair > exec', 'pair > exec > child',
+                             'pair > exec > child', 'failing']
+    assert pair.attrs == {'cp_name': 'EURUSD'}
+    assert pair.duration >= 0.02
+    assert all(s.peak_bytes is None for s in tracer.spans)
+
+
+def test_scheduler_nodes_nest_under_caller():
+    """Tests spans in the scheduler's threads nest under the span that ran
+    it.
+    """
+    traced = tracing.traced()(lambda: 1)
+    s = Scheduler(threads=2)
+    s.add('a', lambda: traced())
+    s.add('b', lambda a: a, ['a'])
+
+    tracing.tracer.start()
+    try:
+        with tracing.span('exec'):
+            s.run(['b'])
+    finally:
+        tracing.tracer.stop()
+
+    assert sorted(paths(tracing.tracer)) == \
+        ['exec', 'exec > a', 'exec > a > <lambda>', 'exec > b']
+
+
+def test_spans_kept_only_while_started():
+    """Tests spans are timed but not kept outside of `start` and `stop`."""
+    tracer = Tracer()
+    with tracer.span('before') as before:
+        time.sleep(0.01)
+    assert before.duration >= 0.01
+    assert tracer.spans == []
+
+    tracer.start()
+    with tracer.span('traced'):
+        pass
+    tracer.stop()
+    with tracer.span('after'):
+        pass
+
+    assert [s.name for s in tracer.spans] == ['traced']
+
+
+def test_spans_trace_peak_memory():
+    tracer = Tracer()
+    tracer.start(memory=True)
+    try:
+        with tracer.span('outer') as outer:
+            with tracer.span('allocates') as inner:
+                block = np.ones(2 ** 20)
+                del block
+            with tracer.span('small') as small:
+                pass
+    finally:
+        tracer.stop()
+
+    assert inner.peak_bytes >= 8 * 2 ** 20
+    assert outer.peak_bytes >= inner.peak_bytes
+    assert small.peak_bytes < 2 ** 20
+
+
+def test_export(tmp_path):
+    tracer = Tracer()
+    tracer.start()
+    with tracer.span('pair', cp_name='EURUSD'):
+        with tracer.span('exec'):
+            pass
+
+    tracer.to_json(str(tmp_path / 'trace.json'))
+    with open(tmp_path / 'trace.json') as f:
+        spans = json.load(f)['spans']
+    assert [s['name'] for s in spans] == ['pair', 'exec']
+    assert spans[1]['parent_id'] == spans[0]['id']
+
+    tracer.to_chrome_trace(str(tmp_path / 'trace.chrome.json'))
+    with open(tmp_path / 'trace.chrome.json') as f:
+        events = json.load(f)['traceEvents']
+    assert [(e['name'], e['ph']) for e in events] == \
+        [('pair', 'X'), ('exec', 'X')]
+    assert events[0]['args'] == {'cp_name': 'EURUSD'}
+    assert events[0]['ts'] <= events[1]['ts']
+    assert events[1]['ts'] + events[1]['dur'] <= \
+        events[0]['ts'] + events[0]['dur']
+
+
+def test_timer_logs_seconds(monkeypatch):
+    """Tests `@timer` traces a span and logs its duration in seconds."""
+    logged = []
+    monkeypatch.setattr(decorators.logger, 'info', logged.append)
+
+    @decorators.timer
+    def sleeper():
+        time.sleep(0.05)
+        return 1
+
+    tracing.tracer.start()
+    try:
+        assert sleeper() == 1
+    finally:
+        tracing.tracer.stop()
+
+    secs = float(logged[-1].split()[-2])
+    assert 0.05 <= secs < 0.5
+    assert [s.name for s in tracing.tracer.spans] == ['sleeper']
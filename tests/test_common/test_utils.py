@@ -8,4 +8,10 @@ from common import utils
 
 def test_get_logger_cfg_fpath():
     """Tests that logger config fpath indeed leads to a file"""
-    assert utils.get_logger_config_fpath().is_file()
\ No newline at end of file
+    assert utils.get_logger_config_fpath().is_file()
+
+
+@pytest.mark.parametrize('cp_name, factor', [
+    ('EURUSD', 10000), ('USDJPY', 100), ('USDMXN', 10000)])
+def test_pip_factor(cp_name, factor):
+    assert utils.pip_factor(cp_name) == factor
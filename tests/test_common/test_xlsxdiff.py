@@ -0,0 +1,87 @@
+import pytest
+
+from datetime import datetime
+
+import openpyxl
+
+from tests.context import common
+from common.utils import SheetNotFoundException
+from common.xlsxdiff import compare_xlsx
+
+
+ROWS = [
+    ['date', 'Open', 'Close'],
+    [datetime(2019, 1, 1), 1.1234, 1.1250],
+    [datetime(2019, 1, 2), 1.1250, None],
+]
+
+
+@pytest.fixture
+def make_xlsx(tmp_path):
+    """Writes rows to a one-sheet workbook, returning its fpath."""
+    def make(rows, name='expected') -> str:
+        workbook = openpyxl.Workbook()
+        workbook.active.title = 'sheet1'
+        for row in rows:
+            workbook.active.append(row)
+        fpath = str(tmp_path / f'{name}.xlsx')
+        workbook.save(fpath)
+        return fpath
+    return make
+
+
+def test_compare_xlsx_identical(make_xlsx):
+    diff = compare_xlsx(make_xlsx(ROWS), make_xlsx(ROWS, 'actual'))
+    assert diff.identical
+    assert diff.cells_compared == 9 and diff.mismatch_count == 0
+
+
+def test_compare_xlsx_numeric_tolerance(make_xlsx):
+    """Tests numbers differing within the tolerance match, and others are
+    listed with their Excel coordinates.
+    """
+    rows = [ROWS[0], [datetime(2019, 1, 1), 1.12345, 1.1250], ROWS[2]]
+    expected, actual = make_xlsx(ROWS), make_xlsx(rows, 'actual')
+
+    diff = compare_xlsx(expected, actual)
+    assert not diff.identical
+    assert diff.mismatches == [(2, 2, 1.1234, 1.12345)]
+    assert diff.max_abs_diff == pytest.approx(5e-5)
+
+    assert compare_xlsx(expected, actual, atol=1e-4).identical
+    assert compare_xlsx(expected, actual, sheet='sheet1', rtol=1e-4).identical
+
+
+def test_compare_xlsx_values_of_other_kinds(make_xlsx):
+    """Tests strings, dates and empty cells must be equal, and never match a
+    number.
+    """
+    rows = [['date', 'Open', 1.125],
+            [datetime(2019, 1, 3), 1.1234, 1.1250],
+            [datetime(2019, 1, 2), 1.1250, 0]]
+    diff = compare_xlsx(make_xlsx(ROWS), make_xlsx(rows, 'actual'))
+    assert [(m.row, m.col) for m in diff.mismatches] == \
+        [(1, 3), (2, 1), (3, 3)]
+
+
+def test_compare_xlsx_shape_mismatch(make_xlsx):
+    """Tests the cells only one worksheet has count as mismatches, whichever
+    has more rows.
+    """
+    longer = ROWS + [[datetime(2019, 1, 3), 1.13, 1.14, 'extra']]
+    expected, actual = make_xlsx(ROWS), make_xlsx(longer, 'actual')
+
+    diff = compare_xlsx(expected, actual)
+    assert diff.expected_shape == (3, 3) and diff.actual_shape == (4, 4)
+    assert diff.mismatch_count == 4
+    assert not diff.identical
+
+    assert compare_xlsx(actual, expected).mismatch_count == 4
+
+
+def test_compare_xlsx_missing_sheet(make_xlsx):
+    fpath = make_xlsx(ROWS)
+    with pytest.raises(SheetNotFoundException):
+        compare_xlsx(fpath, fpath, sheet='sheet2')
+    with pytest.raises(SheetNotFoundException):
+        compare_xlsx(fpath, fpath, sheet=1)
@@ -0,0 +1,129 @@
+import pytest
+
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tests.context import ds
+from common.config import Config
+from ds.datacontainer import DataContainer, SourceNotLoadedError
+from pyfx import fixedpoint, read
+
+
+@pytest.fixture
+def config() -> Config:
+    return Config(Path.cwd() / 'tests' / 'testdata' / 'config'
+                  / 'cfg_default1.yml')
+
+
+def make_data(days: list, config: Config) -> DataContainer:
+    """Minute bars on `days` whose Close is the bar's minute of the day."""
+    index = pd.DatetimeIndex([
+        d + pd.Timedelta(minutes=m)
+        for d in pd.to_datetime(days) for m in range(1440)
+    ], name='datetime')
+    minute = (index.hour * 60 + index.minute).values.astype(float)
+    minute_df = pd.DataFrame({
+        'Open': minute, 'High': minute, 'Low': minute, 'Close': minute
+    }, index=index)
+
+    daily_df = pd.DataFrame({'Open': 1.0}, index=pd.to_datetime(days))
+    fix_df = pd.DataFrame({'EUR-USD': 1.0}, index=pd.to_datetime(days))
+
+    dfs = {read.MINUTE: minute_df, read.DAILY: daily_df, read.FIX: fix_df}
+    return DataContainer(dfs, 'EURUSD', config)
+
+
+@pytest.mark.parametrize('day, hourdelta', [
+    ('2018-03-05', 0),     # no DST period
+    ('2018-03-12', 1),     # hour ahead period
+    ('2018-10-29', -1),    # hour delay period
+])
+def test_datacontainer_dst_adjustment(config, day, hourdelta):
+    """Tests minutes within the time range are taken an hour later in hour
+    ahead periods, and an hour earlier in hour delay periods.
+    """
+    data = make_data([day], config)
+    df = data.minute_price_df
+
+    start = pd.Timestamp(day) + pd.Timedelta(hours=10, minutes=50)
+    expected_index = pd.date_range(start, periods=13, freq='min')
+    np.testing.assert_array_equal(df.index, expected_index)
+
+    source = expected_index + timedelta(hours=hourdelta)
+    np.testing.assert_array_equal(
+        df['Close'].values, source.hour * 60 + source.minute)
+
+
+def test_datacontainer_dst_disabled(config, monkeypatch):
+    """Tests no minutes are moved when daylight saving mode is disabled."""
+    monkeypatch.setattr(Config, 'should_enable_daylight_saving_mode', False)
+    df = make_data(['2018-03-12'], config).minute_price_df
+
+    np.testing.assert_array_equal(
+        df['Close'].values, df.index.hour * 60 + df.index.minute)
+
+
+def test_datacontainer_loads_views_lazily(config):
+    """Tests views are memoized, and only fail when their source is
+    actually needed.
+    """
+    minute_df = make_data(['2018-03-05'], config).full_minute_price_df
+    data = DataContainer({read.MINUTE: minute_df}, 'EURUSD', config)
+
+    assert data.minute_price_df is data.minute_price_df
+    assert data.minute_grid is data.minute_grid
+
+    with pytest.raises(SourceNotLoadedError):
+        data.daily_price_df
+
+
+def test_datacontainer_day_codes(config):
+    """Tests the cached day codes and minutes of day are compact and match
+    the minute index.
+    """
+    data = make_data(['2018-03-05', '2018-03-06'], config)
+    index = data.full_minute_price_df.index
+
+    assert data.day_codes.dtype == np.int32
+    assert data.minutes_of_day.dtype == np.int16
+    assert data.day_codes is data.day_codes
+
+    np.testing.assert_array_equal(
+        data.day_codes.astype('datetime64[D]'), index.normalize())
+    np.testing.assert_array_equal(
+        data.minutes_of_day, index.hour * 60 + index.minute)
+
+
+def test_datacontainer_compact_prices(config):
+    """Tests views of fixed-point source prices equal those of float ones,
+    while only the fixed-point minute prices, and grid, are held.
+    """
+    data = make_data(['2018-03-05', '2018-03-12'], config)
+    dfs = {read.MINUTE: fixedpoint.compact(data._source(read.MINUTE),
+                                           data.price_scale),
+           read.DAILY: data._source(read.DAILY),
+           read.FIX: data.fix_price_df}
+    compact = DataContainer(dfs, 'EURUSD', config)
+
+    assert compact.has_compact_prices and not data.has_compact_prices
+    assert compact.held_minute_price_df['Close'].dtype == np.int32
+    assert compact.full_minute_price_df is not \
+        compact.full_minute_price_df
+
+    for view in ['full_minute_price_df', 'minute_price_df']:
+        pd.testing.assert_frame_equal(getattr(compact, view),
+                                      getattr(data, view))
+    np.testing.assert_array_equal(compact.minute_values('Close'),
+                                  data.full_minute_price_df['Close'].values)
+
+    grid = compact.minute_grid
+    assert grid.values.dtype == np.int32
+    minutes = np.arange(1440)
+    np.testing.assert_array_equal(grid.bars(minutes),
+                                  data.minute_grid.bars(minutes))
+    np.testing.assert_array_equal(
+        grid.prices(minutes, ['Open', 'Close']),
+        data.minute_grid.prices(minutes, ['Open', 'Close']))
@@ -0,0 +1,74 @@
+import pytest
+
+from datetime import time
+
+import numpy as np
+import pandas as pd
+
+from tests.context import ds
+from ds.minutegrid import MinuteGrid
+
+
+@pytest.fixture
+def minute_df() -> pd.DataFrame:
+    """Three days of minute bars, with some bars missing."""
+    rng = np.random.RandomState(0)
+    index = pd.date_range('2018-03-09', periods=3 * 1440, freq='min')
+    index = index[rng.rand(len(index)) > 0.3]
+    return pd.DataFrame(rng.rand(len(index), 4), index=index,
+                        columns=['Open', 'High', 'Low', 'Close'])
+
+
+def test_minutegrid_shape(minute_df):
+    """Tests the grid holds one row per day, with a column per minute of the
+    day that has a bar.
+    """
+    grid = MinuteGrid(minute_df, ['Open', 'Close'])
+    minutes = np.unique(minute_df.index.hour * 60 + minute_df.index.minute)
+
+    assert grid.values.shape == (3, len(minutes), 2)
+    np.testing.assert_array_equal(grid.minutes, minutes)
+    assert grid.has_bar.sum() == len(minute_df)
+    assert list(grid.dates) == sorted(set(minute_df.index.date))
+
+
+def test_minutegrid_pruned_minutes(minute_df):
+    """Tests a grid of pruned minute data only has columns for the minutes
+    kept, and reads the others as without a bar.
+    """
+    kept = minute_df[minute_df.index.minute == 30]
+    grid = MinuteGrid(kept, ['Open', 'High', 'Low', 'Close'])
+
+    np.testing.assert_array_equal(
+        grid.minutes, np.unique(kept.index.hour * 60 + 30))
+    assert grid.at(time(10, 31)).empty
+    expected = kept.at_time(time(10, 30))
+    expected.index = expected.index.date
+    pd.testing.assert_frame_equal(grid.at(time(10, 30)), expected)
+
+    values, has_bar = grid.window(time(10, 29), time(11, 30))
+    assert values.shape == (3, 62, 4)
+    np.testing.assert_array_equal(has_bar.any(axis=0),
+                                  np.isin(np.arange(62), [1, 61]))
+    assert np.isnan(values[~has_bar]).all()
+
+
+def test_minutegrid_at_matches_at_time(minute_df):
+    """Tests prices at a time of day match `DataFrame.at_time`."""
+    grid = MinuteGrid(minute_df, ['Open', 'High', 'Low', 'Close'])
+
+    for t in [time(0, 0), time(10, 30), time(23, 59)]:
+        expected = minute_df.at_time(t)
+        expected.index = expected.index.date
+        pd.testing.assert_frame_equal(grid.at(t), expected)
+
+
+def test_minutegrid_window(minute_df):
+    """Tests a window spans both its start and end minute."""
+    grid = MinuteGrid(minute_df, ['Close'])
+    values, has_bar = grid.window(time(10, 49), time(11, 2))
+
+    assert values.shape == (3, 14, 1)
+    assert np.isnan(values[~has_bar]).all()
+    expected = minute_df.between_time(time(10, 49), time(11, 2))['Close']
+    np.testing.assert_array_equal(values[has_bar][:, 0], expected.values)
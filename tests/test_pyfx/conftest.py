@@ -0,0 +1,46 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from tests.context import pyfx
+from common.config import Config
+from ds.datacontainer import DataContainer
+from pyfx import analytics
+
+
+@pytest.fixture
+def compute_metrics():
+    """Makes a compute of the daily output of every metric, as `app.exec`
+    does, from the data in a DataContainer.
+    """
+    def make(config: Config):
+        def run(data: DataContainer) -> pd.DataFrame:
+            outputs = [
+                analytics.include_ohlc(data),
+                analytics.include_max_pips(data, config.benchmark_times),
+                analytics.include_max_pips(data, pdfx=True,
+                                           cp_name='EURUSD'),
+                analytics.include_minute_data(
+                    data, config.minutely_data_sections),
+                analytics.include_avgs(
+                    data, config.period_average_data_sections),
+            ]
+            for df in outputs:
+                df.index = pd.to_datetime(df.index)
+            df_master = pd.concat(outputs, axis=1).sort_index()
+            df_master.index = df_master.index.date
+            return df_master
+        return run
+    return make
+
+
+@pytest.fixture
+def assert_same_output():
+    """Asserts two daily outputs have the same columns, days and values."""
+    def check(got: pd.DataFrame, expected: pd.DataFrame):
+        assert list(got.columns) == list(expected.columns)
+        np.testing.assert_array_equal(got.index, expected.index)
+        pd.testing.assert_frame_equal(got.astype(object),
+                                      expected.astype(object))
+    return check
@@ -0,0 +1,218 @@
+import pytest
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tests.context import pyfx
+from common import const
+from common.config import Config
+from ds.datacontainer import DataContainer
+from ds.timeranges import DayTimeRange
+from pyfx import analytics, fixedpoint, minutestore, read
+
+
+@pytest.fixture
+def config() -> Config:
+    return Config(Path.cwd() / 'tests' / 'testdata' / 'config'
+                  / 'cfg_default1.yml')
+
+
+@pytest.fixture
+def data(config) -> DataContainer:
+    """Three weeks of synthetic EURUSD data around the March DST period,
+    with some minute bars missing.
+    """
+    rng = np.random.RandomState(0)
+
+    index = pd.date_range('2018-03-05', periods=21 * 1440, freq='min',
+                          name='datetime')
+    index = index[(index.dayofweek < 5) & (rng.rand(len(index)) > 0.05)]
+    close = (1.2 + rng.normal(0, 2e-4, len(index)).cumsum()).round(4)
+    minute_df = pd.DataFrame({
+        'Open': close, 'High': close + 1e-4, 'Low': close - 1e-4,
+        'Close': close
+    }, index=index)
+
+    days = pd.DatetimeIndex(sorted(set(index.normalize())), name='datetime')
+    daily_df = pd.DataFrame({
+        'Open': 1.2, 'High': 1.21, 'Low': 1.19, 'Close': 1.2
+    }, index=days[::-1])
+
+    fix_df = pd.DataFrame({'EUR-USD': np.linspace(1.19, 1.21, len(days))},
+                          index=days)
+
+    dfs = {read.MINUTE: minute_df, read.DAILY: daily_df, read.FIX: fix_df}
+    return DataContainer(dfs, 'EURUSD', config)
+
+
+def test_include_minute_data(data, config):
+    """Tests minute data matches per-minute `at_time` lookups, with columns
+    in minute-then-metric order.
+    """
+    sections = config.minutely_data_sections + [{
+        'range_start': config.time_range.start_time,
+        'range_end': config.time_range.end_time,
+        'include': const.OHLC,
+    }]
+
+    got = analytics.include_minute_data(data, sections)
+
+    expected = []
+    for section in sections:
+        if section['include'] == const.OHLC:
+            metric_types = ['Open', 'High', 'Low', 'Close']
+        else:
+            metric_types = [section['include']]
+        for t in DayTimeRange(section['range_start'], section['range_end']):
+            for metric_type in metric_types:
+                df = data.full_minute_price_df.at_time(t)[metric_type]\
+                    .to_frame()
+                df.index = df.index.date
+                df.columns = [f'{t}_{metric_type}']
+                expected.append(df)
+    expected = pd.concat(expected, axis=1, sort=True)
+
+    assert list(got.columns.get_level_values(1)) == list(expected.columns)
+    np.testing.assert_array_equal(got.index, expected.index)
+    np.testing.assert_array_equal(got.values, expected.values)
+
+
+def legacy_max_pip_block(data: DataContainer, benchmark: pd.Series):
+    """One benchmark's max pip block, computed day by day."""
+    df_min = data.minute_price_df
+    rows = []
+    for day, bench_price in benchmark.items():
+        closes = df_min.loc[df_min.index.date == day, 'Close'].dropna()
+        up = closes[closes == closes.max()].index[-1]
+        dn = closes[closes == closes.min()].index[-1]
+        rows.append([
+            bench_price,
+            max(round(10000 * (closes[up] - bench_price), 2), 0),
+            closes[up], up.time(),
+            min(round(10000 * (closes[dn] - bench_price), 2), 0),
+            closes[dn], dn.time(),
+        ])
+    return pd.DataFrame(rows, index=benchmark.index, columns=[
+        'BenchmarkPrice', 'MaxPipUp', 'PriceAtMaxPipUp', 'TimeAtMaxPipUp',
+        'MaxPipDown', 'PriceAtMaxPipDown', 'TimeAtMaxPipDown'])
+
+
+def test_include_max_pips(data, config):
+    """Tests every benchmark block matches a day by day computation."""
+    got = analytics.include_max_pips(data, config.benchmark_times)
+
+    assert list(got.columns.get_level_values(0).unique()) == \
+        [str(bt) for bt in config.benchmark_times]
+
+    for bt in config.benchmark_times:
+        benchmark = data.full_minute_price_df.at_time(bt)['Close']
+        benchmark.index = benchmark.index.date
+        expected = legacy_max_pip_block(data, benchmark)
+        pd.testing.assert_frame_equal(
+            got[str(bt)].loc[expected.index], expected, check_dtype=False)
+
+
+def test_include_max_pips_pdfx(data):
+    """Tests the PDFX block benchmarks against the previous day's fix."""
+    got = analytics.include_max_pips(data, pdfx=True, cp_name='EURUSD')['PDFX']
+
+    assert list(got.columns) == [
+        'CDFX', 'MaxPipUp', 'BenchmarkPrice', 'PriceAtMaxPipUp',
+        'MaxPipDown', 'TimeAtMaxPipUp', 'PriceAtMaxPipDown',
+        'TimeAtMaxPipDown']
+
+    fix = data.fix_price_df['EUR-USD']
+    pd.testing.assert_series_equal(got['BenchmarkPrice'],
+                                   fix.shift(1).rename('BenchmarkPrice'))
+
+    got = got.dropna(subset=['BenchmarkPrice'])
+    got.index = got.index.date
+    expected = legacy_max_pip_block(data, got['BenchmarkPrice'])
+    pd.testing.assert_frame_equal(got[expected.columns], expected,
+                                  check_dtype=False)
+
+
+def legacy_crossovers(data: DataContainer, thresholds: list,
+                      pip_factor: int) -> pd.DataFrame:
+    """Per-day crossover counts, computed on the merged daily-minute frame."""
+    daily_df = data.daily_price_df.copy()
+    minute_df = data.full_minute_price_df.copy()
+    minute_df['High_bf'] = minute_df.High.shift(1)
+    minute_df['Low_bf'] = minute_df.Low.shift(1)
+    daily_df['date'] = daily_df.index.date
+    minute_df['date'] = minute_df.index.date
+    minute_df = pd.merge(daily_df, minute_df, on='date', suffixes=('_d', ''))
+
+    above = minute_df['Open'] > minute_df['Open_d']
+    ans = {}
+    for t in thresholds:
+        upper = minute_df['Open_d'] + t / pip_factor
+        lower = minute_df['Open_d'] - t / pip_factor
+        ans[(f'a_n{t}', 'sum')] = ~above & (minute_df['Low'] < lower) \
+            & (minute_df['Low_bf'] > lower)
+        ans[(f'a_{t}', 'sum')] = above & (minute_df['High'] > upper) \
+            & (minute_df['High_bf'] < upper)
+    return pd.DataFrame(ans).groupby(minute_df['date'].values).sum()
+
+
+@pytest.mark.parametrize('cp_name', [None, 'USDJPY'])
+def test_include_crossovers(data, cp_name):
+    """Tests crossover counts match those of the merged frame, in pips of
+    the currency pair.
+    """
+    thresholds = [1, 5, 10, 20]
+    got = analytics.include_crossovers(data, thresholds, cp_name=cp_name)
+    expected = legacy_crossovers(data, thresholds,
+                                 100 if cp_name == 'USDJPY' else 10000)
+
+    assert list(got.columns) == list(expected.columns)
+    np.testing.assert_array_equal(got.index, expected.index)
+    np.testing.assert_array_equal(got.values, expected.values)
+    assert got.values.sum() > 0
+
+
+def test_include_max_pips_in_pair_pips(data, config):
+    """Tests max pips are in pips of the currency pair, and are the same
+    from fixed-point prices.
+    """
+    bt = config.benchmark_times[:1]
+    got = analytics.include_max_pips(data, bt)
+    jpy = analytics.include_max_pips(data, bt, cp_name='USDJPY')
+
+    pips = ['MaxPipUp', 'MaxPipDown']
+    np.testing.assert_allclose(jpy[str(bt[0])][pips].values,
+                               got[str(bt[0])][pips].values / 100,
+                               atol=0.01)
+
+    dfs = {read.MINUTE: fixedpoint.compact(data._source(read.MINUTE),
+                                           data.price_scale)}
+    compact = DataContainer(dfs, 'EURUSD', config)
+    pd.testing.assert_frame_equal(
+        analytics.include_max_pips(compact, bt), got)
+
+
+def test_metrics_on_required_minutes(data, config):
+    """Tests the metrics are the same from minute data holding only the
+    minutes of the day that the config requires.
+    """
+    minute_df = data._source(read.MINUTE)
+    times = minute_df.index.values.astype('datetime64[m]').astype(np.int64)
+    pruned = DataContainer({
+        read.MINUTE: minute_df[minutestore.at_minutes(
+            times, config.required_minutes)],
+        read.DAILY: data._source(read.DAILY),
+        read.FIX: data._source(read.FIX),
+    }, 'EURUSD', config)
+    assert len(pruned.full_minute_price_df) < len(minute_df) / 20
+
+    for metric in [
+            lambda d: analytics.include_max_pips(d, config.benchmark_times),
+            lambda d: analytics.include_max_pips(d, pdfx=True,
+                                                 cp_name='EURUSD'),
+            lambda d: analytics.include_minute_data(
+                d, config.minutely_data_sections),
+            lambda d: analytics.include_avgs(
+                d, config.period_average_data_sections)]:
+        pd.testing.assert_frame_equal(metric(pruned), metric(data))
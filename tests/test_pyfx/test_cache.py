@@ -0,0 +1,81 @@
+import pytest
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from tests.context import pyfx
+from pyfx.cache import FrameCache
+
+
+@pytest.fixture
+def price_df() -> pd.DataFrame:
+    index = pd.date_range('2018-01-01', periods=100, freq='min',
+                          name='datetime')
+    return pd.DataFrame({
+        'Open': np.linspace(1.1, 1.2, 100),
+        'Close': np.linspace(1.2, 1.3, 100),
+        'date': index.normalize(),
+    }, index=index)
+
+
+@pytest.fixture
+def src_fpath(tmp_path) -> str:
+    fpath = tmp_path / 'src.csv'
+    fpath.write_text('a,b\n1,2\n')
+    return str(fpath)
+
+
+def test_cache_roundtrip(tmp_path, price_df, src_fpath):
+    """Tests a stored frame is loaded back identically."""
+    cache = FrameCache(tmp_path / 'cache', max_bytes=2 ** 30)
+    key = cache.key(src_fpath, 'minute', 1)
+
+    assert cache.load(key) is None
+    assert cache.store(key, price_df)
+    pd.testing.assert_frame_equal(cache.load(key), price_df,
+                                  check_freq=False)
+
+
+def test_cache_key_invalidation(tmp_path, src_fpath):
+    """Tests the key changes with the source file, reader version and
+    reader params.
+    """
+    cache = FrameCache(tmp_path / 'cache', max_bytes=2 ** 30)
+    key = cache.key(src_fpath, 'minute', 1)
+
+    assert key == cache.key(src_fpath, 'minute', 1)
+    assert key != cache.key(src_fpath, 'minute', 2)
+    assert key != cache.key(src_fpath, 'daily', 1)
+    assert key != cache.key(src_fpath, 'minute', 1, cp_name='EURUSD')
+
+    with open(src_fpath, 'a') as f:
+        f.write('3,4\n')
+    assert key != cache.key(src_fpath, 'minute', 1)
+
+
+def test_cache_evicts_least_recently_used(tmp_path, price_df, src_fpath):
+    """Tests older entries are evicted once the size limit is exceeded."""
+    probe = FrameCache(tmp_path / 'probe', max_bytes=2 ** 30)
+    probe.store('probe', price_df)
+    entry_size = sum(e.stat().st_size
+                     for e in os.scandir(tmp_path / 'probe' / 'probe'))
+
+    cache = FrameCache(tmp_path / 'cache', max_bytes=int(entry_size * 2.5))
+    for i in range(3):
+        cache.store('entry{}'.format(i), price_df)
+        os.utime(tmp_path / 'cache' / 'entry{}'.format(i) / 'meta.json',
+                 (i, i))
+
+    cache.evict()
+    assert cache.load('entry0') is None
+    assert cache.load('entry2') is not None
+
+
+def test_cache_skips_object_columns(tmp_path, price_df):
+    """Tests frames holding object columns are not cached."""
+    cache = FrameCache(tmp_path / 'cache', max_bytes=2 ** 30)
+    price_df['label'] = 'x'
+    assert not cache.store('key', price_df)
+    assert cache.load('key') is None
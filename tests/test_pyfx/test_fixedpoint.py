@@ -0,0 +1,61 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from tests.context import pyfx
+from pyfx import fixedpoint
+
+
+@pytest.mark.parametrize('cp_name, scale', [
+    ('EURUSD', 100000),
+    ('USDJPY', 1000),
+])
+def test_price_scale(cp_name, scale):
+    assert fixedpoint.price_scale(cp_name) == scale
+
+
+def test_round_trip_gives_parsed_floats():
+    """Tests prices converted back are the floats parsed from the quotes,
+    and missing prices stay missing.
+    """
+    quotes = ['1.12345', '0.00001', '1.10000', '2.99999', '1.23457']
+    prices = np.array([float(q) for q in quotes] + [np.nan])
+
+    fixed = fixedpoint.to_fixed(prices, 100000)
+    assert fixed.dtype == np.int32
+    assert fixed[-1] == fixedpoint.MISSING
+
+    np.testing.assert_array_equal(fixedpoint.to_float(fixed, 100000), prices)
+
+
+def test_to_fixed_overflow():
+    with pytest.raises(OverflowError):
+        fixedpoint.to_fixed([1e5], 100000)
+
+
+def test_compact_and_expand():
+    """Tests only OHLC columns are converted, and the index is shared."""
+    index = pd.date_range('2018-03-05', periods=3, freq='min')
+    df = pd.DataFrame({'Open': [110.123, np.nan, 110.2],
+                       'Close': [110.1, 110.125, 110.0],
+                       'Volume': [1, 2, 3]}, index=index)
+
+    compact = fixedpoint.compact(df, 1000)
+    assert fixedpoint.is_compact(compact)
+    assert compact.index is df.index
+    assert list(compact.dtypes) == [np.int32, np.int32, df['Volume'].dtype]
+
+    expanded = fixedpoint.expand(compact, 1000)
+    assert not fixedpoint.is_compact(expanded)
+    pd.testing.assert_frame_equal(expanded, df)
+
+
+def test_pip_difference():
+    """Tests pips are exact to 1/10 pip, and NaN where a price is missing."""
+    got = fixedpoint.pip_difference([1.10013, 1.1, np.nan],
+                                    [1.1, 1.10013, 1.1], 100000)
+    np.testing.assert_array_equal(got, [1.3, -1.3, np.nan])
+
+    got = fixedpoint.pip_difference([110.125], [110.1], 1000)
+    np.testing.assert_array_equal(got, [2.5])
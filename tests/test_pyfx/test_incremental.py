@@ -0,0 +1,69 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from tests.context import pyfx
+from common.config import Config
+from ds.datacontainer import DataContainer
+from pyfx import incremental, read
+
+
+@pytest.fixture
+def config(tmp_path, make_config) -> Config:
+    return make_config(incremental={'enabled': True,
+                                    'dir': str(tmp_path / 'state')})
+
+
+def until(sources: dict, end: str) -> dict:
+    """`sources` up to and including the day `end`."""
+    return {src: df[df.index < pd.Timestamp(end) + pd.Timedelta(days=1)]
+            for src, df in sources.items()}
+
+
+def test_incremental_update_matches_full_run(config, make_sources,
+                                            compute_metrics,
+                                            assert_same_output):
+    """Tests merging recomputed days into the kept output gives the output
+    of a full run, and that only the changed days are recomputed.
+    """
+    updated = make_sources(15)
+    incremental.update('EURUSD', config, until(updated, '2018-03-18'),
+                       compute_metrics(config))
+
+    # A day is appended, a day's minutes and a fix are revised.
+    minute_df = updated[read.MINUTE]
+    minute_df.loc['2018-03-07 10:55', 'Close'] += 0.01
+    updated[read.FIX].loc['2018-03-09', 'EUR-USD'] += 0.01
+
+    computed = []
+    run = compute_metrics(config)
+
+    def tracked(data):
+        computed.append(data.day_codes)
+        return run(data)
+
+    got = incremental.update('EURUSD', config, updated, tracked)
+    expected = run(DataContainer(updated, 'EURUSD', config))
+    assert_same_output(got, expected)
+
+    # The revised minute and fix days, the fix day after the revised one
+    # (across the weekend), and the appended day.
+    recomputed = set(np.unique(computed[0]).astype('datetime64[D]')
+                     .astype(str))
+    assert recomputed == {'2018-03-07', '2018-03-09', '2018-03-10',
+                          '2018-03-11', '2018-03-12', '2018-03-19'}
+
+
+def test_incremental_update_without_changes(config, make_sources,
+                                           compute_metrics,
+                                           assert_same_output):
+    """Tests a rerun on unchanged data serves the kept output."""
+    sources = make_sources(7)
+    first = incremental.update('EURUSD', config, sources, compute_metrics(config))
+
+    def fail(data):
+        raise AssertionError("No day should be recomputed")
+
+    assert_same_output(
+        incremental.update('EURUSD', config, sources, fail), first)
@@ -0,0 +1,81 @@
+import pytest
+
+from datetime import time
+
+import numpy as np
+import pandas as pd
+
+from tests.context import pyfx
+from ds.timeranges import DayTimeRange
+from pyfx import kernels
+
+
+@pytest.fixture
+def close() -> pd.Series:
+    """Ten days of coarse-grained closes, so extrema are often tied, with
+    some bars missing and some prices NaN.
+    """
+    rng = np.random.RandomState(1)
+    index = pd.date_range('2018-03-01', periods=10 * 1440, freq='min')
+    values = rng.randint(0, 4, len(index)).astype(float)
+    values[rng.rand(len(index)) < 0.05] = np.nan
+    keep = rng.rand(len(index)) > 0.05
+    return pd.Series(values[keep], index=index[keep])
+
+
+def legacy_window_stats(close: pd.Series, window: DayTimeRange):
+    """Per-day stats of `window` the way `include_avgs` used to compute them.
+    """
+    filtered = close.between_time(window.start_time, window.end_time)
+    days = filtered.index.date
+    mean = filtered.groupby(days).mean()
+
+    def last_time(func):
+        hits = filtered[filtered == filtered.groupby(days).transform(func)]
+        times = pd.Series(hits.index.time, index=hits.index.date)
+        return times[~times.index.duplicated(keep='last')]\
+            .reindex(mean.index)
+
+    return mean, last_time(min), last_time(max)
+
+
+def test_window_stats_matches_groupby(close):
+    """Tests means and latter-on-ties extrema match a pandas groupby, for
+    overlapping windows.
+    """
+    windows = [DayTimeRange(time(10, 58), time(11, 2)),
+               DayTimeRange(time(10, 0), time(11, 0)),
+               DayTimeRange(time(0, 0), time(23, 59))]
+
+    stats = kernels.window_stats(close.values,
+                                 kernels.day_codes(close.index),
+                                 kernels.minute_of_day(close.index), windows)
+
+    for window, stat in zip(windows, stats):
+        mean, min_time, max_time = legacy_window_stats(close, window)
+
+        assert list(kernels.codes_to_dates(stat.days)) == list(mean.index)
+        np.testing.assert_array_equal(stat.mean, mean.values)
+        for positions, expected in [(stat.argmin, min_time),
+                                    (stat.argmax, max_time)]:
+            got = [close.index[p].time() if p >= 0 else None
+                   for p in positions]
+            assert got == [t if isinstance(t, time) else None
+                           for t in expected]
+
+
+def test_window_stats_without_rows():
+    """Tests windows without any bars yield empty stats."""
+    index = pd.date_range('2018-03-01', periods=60, freq='min')
+    stats = kernels.window_stats(np.ones(60), kernels.day_codes(index),
+                                 kernels.minute_of_day(index),
+                                 [DayTimeRange(time(10), time(11))])
+    assert len(stats) == 1 and len(stats[0].days) == 0
+
+
+def test_date_codes_inverts_codes_to_dates(close):
+    codes = np.unique(kernels.day_codes(close.index)).astype(np.int64)
+    dates = kernels.codes_to_dates(codes)
+
+    assert list(kernels.date_codes(dates)) == list(codes)
+    assert list(kernels.date_codes(pd.Index(dates))) == list(codes)
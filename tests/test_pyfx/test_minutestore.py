@@ -0,0 +1,99 @@
+import pytest
+
+import os
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from tests.context import pyfx
+from ds.timeranges import DateRange
+from pyfx import minutestore, read
+
+
+@pytest.fixture
+def minute_csv(tmp_path) -> str:
+    """Ten days of minute bars at irregular times, weekends missing."""
+    rng = np.random.RandomState(0)
+    index = pd.date_range('2018-01-01', '2018-01-10 23:59', freq='min')
+    index = index[(index.dayofweek < 5) & (rng.rand(len(index)) > 0.3)]
+    close = (1.2 + rng.normal(0, 2e-4, len(index)).cumsum()).round(5)
+
+    fpath = tmp_path / 'EURUSD_Minute.csv'
+    pd.DataFrame({
+        'Local time': index.strftime('%d.%m.%Y %H:%M:%S.000 GMT-0500'),
+        'Open': close, 'High': close + 1e-4, 'Low': close - 1e-4,
+        'Close': close, 'Volume': 0,
+    }).to_csv(fpath, index=False)
+    return str(fpath)
+
+
+def test_store_round_trip(minute_csv):
+    """Tests the store holds the csv's bars, converted in chunks that split
+    days, with an offset for each day.
+    """
+    store_dir = read.convert_minute_data(minute_csv, chunksize=1000)
+    assert store_dir == minutestore.store_path(minute_csv)
+
+    store = minutestore.MinuteStore(store_dir)
+    full = read._read_and_process_minute_data(minute_csv, 'EURUSD')
+
+    pd.testing.assert_frame_equal(store.to_frame(), full)
+    np.testing.assert_array_equal(
+        store.days, np.unique(full.index.values.astype('datetime64[D]')))
+
+
+@pytest.mark.parametrize('start, end', [
+    (date(2018, 1, 3), date(2018, 1, 5)),
+    (date(2018, 1, 6), date(2018, 1, 8)),      # starts on a weekend
+    (date(2018, 1, 6), date(2018, 1, 7)),      # no bars
+    (date(2017, 12, 1), date(2019, 1, 1)),
+])
+def test_store_date_range(minute_csv, start, end):
+    """Tests a date range reads the same bars from the store as from the
+    csv, as views of the memory map.
+    """
+    store = minutestore.MinuteStore(read.convert_minute_data(minute_csv))
+    date_range = DateRange(start, end)
+
+    expected = read._read_and_process_minute_data(
+        minute_csv, 'EURUSD', date_range=date_range)
+    pd.testing.assert_frame_equal(
+        read._read_minute_store(store, date_range), expected)
+
+    views = store.slice(date_range.start_date_dt, date_range.end_date_dt)
+    assert len(views['Close']) == len(expected)
+    if len(expected):
+        assert isinstance(views['Close'].base, np.memmap)
+
+
+def test_read_data_uses_store(minute_csv, monkeypatch):
+    """Tests `read_data` reads minute data from an up to date store, and
+    from the csv once it changes.
+    """
+    read.convert_minute_data(minute_csv)
+    expected = read.read_data({read.MINUTE: minute_csv}, 'EURUSD')[read.MINUTE]
+
+    def read_csv(*args, **kwargs):
+        raise AssertionError("Read the csv")
+
+    with monkeypatch.context() as m:
+        m.setattr(read, '_read_and_process_minute_data', read_csv)
+        got = read.read_data({read.MINUTE: minute_csv}, 'EURUSD')
+        pd.testing.assert_frame_equal(got[read.MINUTE], expected)
+
+    stat = os.stat(minute_csv)
+    os.utime(minute_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert minutestore.find_store(minute_csv) is None
+
+
+def test_store_rejects_unordered_bars(tmp_path):
+    fpath = tmp_path / 'EURUSD_Minute.csv'
+    fpath.write_text(
+        "Local time,Open,High,Low,Close,Volume\n"
+        "02.03.2018 00:00:00.000 GMT-0500,1.15,1.25,1.05,1.2,20\n"
+        "01.03.2018 23:59:00.000 GMT-0500,1.1,1.2,1.0,1.15,10\n")
+
+    with pytest.raises(ValueError):
+        read.convert_minute_data(str(fpath))
+    assert not os.path.exists(minutestore.store_path(str(fpath)))
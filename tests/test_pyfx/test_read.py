@@ -0,0 +1,173 @@
+import pytest
+
+from datetime import date, datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from tests.context import pyfx
+from ds.timeranges import DateRange
+from pyfx import read
+
+
+def test_parse_local_time():
+    """Tests the fixed-width parser agrees with `pd.to_datetime`, and ignores
+    anything after the seconds field.
+    """
+    index = pd.date_range('1999-12-31 22:00', '2024-03-01 02:00', freq='7h')
+    values = index.strftime('%d.%m.%Y %H:%M:%S.000 GMT-0500').values\
+        .astype(object)
+
+    parsed = read._parse_local_time(values)
+    np.testing.assert_array_equal(parsed, index.values)
+
+
+def test_parse_local_time_falls_back_on_other_layouts():
+    """Tests values not following the fixed-width layout are still parsed, or
+    rejected, by `pd.to_datetime`.
+    """
+    values = np.array(['1.2.2018 10:30:00', '02.01.2018 10:31:00'],
+                      dtype=object)
+    np.testing.assert_array_equal(
+        read._parse_local_time(values),
+        np.array(['2018-02-01T10:30', '2018-01-02T10:31'],
+                 dtype='datetime64[ns]'))
+
+    for invalid in ['31.02.2018 10:30:00', '28.02.2018 24:00:00',
+                    'not a time']:
+        with pytest.raises(ValueError):
+            read._parse_local_time(np.array([invalid], dtype=object))
+
+
+def test_read_minute_data(tmp_path):
+    """Tests the minute reader drops `Volume` and indexes by datetime."""
+    fpath = tmp_path / 'EURUSD_Minute.csv'
+    fpath.write_text(
+        "Local time,Open,High,Low,Close,Volume\n"
+        "01.03.2018 23:59:00.000 GMT-0500,1.1,1.2,1.0,1.15,10\n"
+        "02.03.2018 00:00:00.000 GMT-0500,1.15,1.25,1.05,1.2,20\n")
+
+    df = read._read_and_process_minute_data(str(fpath), 'EURUSD')
+
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close']
+    assert df.index.name == 'datetime'
+    assert df.index[0] == pd.Timestamp('2018-03-01 23:59')
+    assert df.index[1] == pd.Timestamp('2018-03-02 00:00')
+
+
+def test_read_minute_data_date_range_pushdown(tmp_path):
+    """Tests rows outside of the date range are dropped while streaming, with
+    the same bounds as slicing the full frame by the range.
+    """
+    index = pd.date_range('2018-01-01', '2018-01-10', freq='30min')
+    fpath = tmp_path / 'EURUSD_Minute.csv'
+    pd.DataFrame({
+        'Local time': index.strftime('%d.%m.%Y %H:%M:%S.000 GMT-0500'),
+        'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': 1.0, 'Volume': 0,
+    }).to_csv(fpath, index=False)
+    date_range = DateRange(date(2018, 1, 3), date(2018, 1, 5))
+
+    full = read._read_and_process_minute_data(str(fpath), 'EURUSD')
+    pushed_down = read._read_and_process_minute_data(
+        str(fpath), 'EURUSD', date_range=date_range, chunksize=7)
+
+    pd.testing.assert_frame_equal(
+        pushed_down,
+        full.loc[date_range.start_date:date_range.end_date])
+
+
+def test_read_daily_data(tmp_path):
+    """Tests the daily reader keeps the Bid columns and the days within the
+    date range, truncating timestamps to dates.
+    """
+    header = ['Date'] + [
+        'EUR/USD({}, {}){}'.format(metric, side, '*' if side == 'Bid' else '')
+        for side in ['Ask', 'Bid']
+        for metric in ['Open', 'High', 'Low', 'Close']
+    ] + ['Tick Volume(EUR/USD)']
+    rows = [
+        [datetime(2018, 1, day, 17)] + [day + i / 10 for i in range(8)] + [0]
+        for day in [4, 3, 2, 1]
+    ]
+
+    fpath = tmp_path / 'EURUSD_Daily.xlsx'
+    workbook = openpyxl.Workbook()
+    for row in [header] + rows:
+        workbook.active.append(row)
+    workbook.save(fpath)
+
+    df = read._read_and_process_daily_data(
+        str(fpath), 'EURUSD', date_range=DateRange(date(2018, 1, 2),
+                                                   date(2018, 1, 3)))
+
+    assert list(df.columns) == ['Open', 'High', 'Low', 'Close']
+    assert list(df.index) == [pd.Timestamp('2018-01-03'),
+                              pd.Timestamp('2018-01-02')]
+    assert list(df.loc['2018-01-03']) == [3.4, 3.5, 3.6, 3.7]
+
+
+def test_read_minute_data_minutes_pushdown(tmp_path):
+    """Tests only the bars at the given minutes of the day are kept, from
+    the csv as from its store.
+    """
+    index = pd.date_range('2018-01-01', '2018-01-10', freq='min')
+    fpath = tmp_path / 'EURUSD_Minute.csv'
+    pd.DataFrame({
+        'Local time': index.strftime('%d.%m.%Y %H:%M:%S.000 GMT-0500'),
+        'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': np.arange(len(index)),
+        'Volume': 0,
+    }).to_csv(fpath, index=False)
+    date_range = DateRange(date(2018, 1, 3), date(2018, 1, 5))
+    minutes = {0, 59, 650, 1439}
+
+    full = read._read_and_process_minute_data(str(fpath), 'EURUSD')
+    full = full.loc[date_range.start_date_dt:date_range.end_date_dt]
+    expected = full[np.isin(full.index.hour * 60 + full.index.minute,
+                            list(minutes))]
+
+    pd.testing.assert_frame_equal(
+        read.read_data({read.MINUTE: str(fpath)}, 'EURUSD',
+                       date_range=date_range, minutes=minutes)[read.MINUTE],
+        expected)
+
+    read.convert_minute_data(str(fpath))
+    pd.testing.assert_frame_equal(
+        read.read_data({read.MINUTE: str(fpath)}, 'EURUSD',
+                       date_range=date_range, minutes=minutes)[read.MINUTE],
+        expected)
+
+
+def test_read_minute_chunks(tmp_path):
+    """Tests the chunks of minute data add up to the minute data `read_data`
+    reads, from the csv as from its store, and that a csv out of
+    chronological order is rejected.
+    """
+    index = pd.date_range('2018-01-01', '2018-01-10', freq='7min')
+    fpath = tmp_path / 'EURUSD_Minute.csv'
+    pd.DataFrame({
+        'Local time': index.strftime('%d.%m.%Y %H:%M:%S.000 GMT-0500'),
+        'Open': 1.0, 'High': 1.0, 'Low': 1.0, 'Close': np.arange(len(index)),
+        'Volume': 0,
+    }).to_csv(fpath, index=False)
+    date_range = DateRange(date(2018, 1, 3), date(2018, 1, 5))
+    minutes = set(range(0, 1440, 3))
+
+    expected = read.read_data({read.MINUTE: str(fpath)}, 'EURUSD',
+                              date_range=date_range,
+                              minutes=minutes)[read.MINUTE]
+
+    for convert in [False, True]:
+        if convert:
+            read.convert_minute_data(str(fpath))
+        chunks = list(read.read_minute_chunks(
+            str(fpath), date_range=date_range, minutes=minutes,
+            chunksize=100))
+        assert len(chunks) > 1
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+    unordered = tmp_path / 'USDJPY_Minute.csv'
+    lines = fpath.read_text().splitlines()
+    unordered.write_text('\n'.join(lines[:1] + lines[:0:-1]) + '\n')
+    with pytest.raises(ValueError):
+        list(read.read_minute_chunks(str(unordered), chunksize=100))
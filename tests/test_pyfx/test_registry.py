@@ -0,0 +1,56 @@
+import pytest
+
+import pandas as pd
+
+from tests.context import pyfx
+from pyfx.registry import DatasetRegistry
+
+
+@pytest.fixture
+def registry() -> DatasetRegistry:
+    registry = DatasetRegistry()
+    registry.clear()
+    yield registry
+    registry.clear()
+
+
+def test_registry_is_process_wide(registry):
+    """Tests every `DatasetRegistry()` call returns the same registry."""
+    assert DatasetRegistry() is registry
+
+
+def test_registry_loads_shared_dataset_once(registry, tmp_path):
+    """Tests shared datasets are loaded once and counted as hits afterwards,
+    while other datasets are loaded on every lookup.
+    """
+    shared, unshared = str(tmp_path / 'fix.csv'), str(tmp_path / 'min.csv')
+    registry.share([shared])
+    loads = []
+
+    def loader():
+        loads.append(1)
+        return pd.DataFrame({'a': [1.0]})
+
+    first = registry.get(shared, loader)
+    for _ in range(3):
+        assert registry.get(str(tmp_path / '.' / 'fix.csv'), loader) is first
+    registry.get(unshared, loader)
+    registry.get(unshared, loader)
+
+    assert len(loads) == 3
+    assert registry.hits == 3
+    assert registry.misses == 3
+
+
+def test_registry_keys_on_params(registry, tmp_path):
+    """Tests the same file read with different reader params is held
+    separately.
+    """
+    fpath = str(tmp_path / 'fix.csv')
+    registry.share([fpath])
+
+    a = registry.get(fpath, lambda: pd.DataFrame({'a': [1.0]}), params=1)
+    b = registry.get(fpath, lambda: pd.DataFrame({'a': [2.0]}), params=2)
+
+    assert a is not b
+    assert registry.get(fpath, lambda: None, params=1) is a
@@ -0,0 +1,62 @@
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from tests.context import pyfx
+from ds.datacontainer import DataContainer
+from pyfx import analytics, read, streaming
+
+
+def chunks(df: pd.DataFrame, size: int):
+    for i in range(0, len(df), size):
+        yield df.iloc[i:i + size]
+
+
+@pytest.mark.parametrize('block_days', [1, 3])
+@pytest.mark.parametrize('time_shift', [None, 3])
+def test_stream_matches_full_run(make_config, make_sources, compute_metrics,
+                                 assert_same_output, block_days, time_shift):
+    """Tests streaming the minute data in blocks of days gives the output of
+    a full run, including on days without minute data.
+    """
+    config = make_config(time_shift={
+        'should_shift_time': True, 'hour_delta': time_shift
+    }) if time_shift else make_config()
+    sources = make_sources(12, minute_gap=('2018-03-09', '2018-03-11'))
+    run = compute_metrics(config)
+
+    blocks = []
+
+    def tracked(data):
+        blocks.append(np.unique(data.day_codes))
+        return run(data)
+
+    price_dfs = {src: df for src, df in sources.items() if src != read.MINUTE}
+    got = pd.concat(streaming.stream(
+        'EURUSD', config, price_dfs, chunks(sources[read.MINUTE], 500),
+        tracked, block_days=block_days))
+
+    assert_same_output(
+        got, run(DataContainer(sources, 'EURUSD', config)))
+    assert max(len(days) for days in blocks) == block_days
+
+
+def test_stream_without_minute_data(make_config, make_sources,
+                                    assert_same_output):
+    """Tests the daily data is computed at once if no metric needs minute
+    data.
+    """
+    config = make_config()
+    sources = make_sources(5)
+    del sources[read.MINUTE], sources[read.FIX]
+
+    def run(data):
+        df_master = analytics.include_ohlc(data).sort_index()
+        df_master.index = pd.to_datetime(df_master.index).date
+        return df_master
+
+    got = list(streaming.stream('EURUSD', config, sources, None, run))
+
+    assert len(got) == 1
+    assert_same_output(got[0], run(DataContainer(sources, 'EURUSD', config)))
@@ -0,0 +1,94 @@
+import pytest
+
+from datetime import date, time
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from tests.context import pyfx
+from pyfx import write
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    """An output-like frame: dates by two-level columns, with gaps."""
+    columns = pd.MultiIndex.from_tuples([
+        ('10:30:00', 'BenchmarkPrice'), ('10:30:00', 'TimeAtMaxPipUp'),
+        ('OHLC', 'Open'), ('OHLC', 'Close'), ('11:00:00_Close', 'Close'),
+    ])
+    return pd.DataFrame([
+        [1.2, time(10, 31), 1.1, 1.3, np.nan],
+        [np.nan, np.nan, 1.2, 1.25, 1.22],
+        [1.21, time(10, 50), 1.0, 1.1, 1.19],
+    ], index=[date(2018, 3, 5), date(2018, 3, 6), date(2018, 3, 7)],
+        columns=columns)
+
+
+def read_sheets(fpath) -> dict:
+    workbook = openpyxl.load_workbook(fpath)
+    return {ws.title: ([[c.value for c in row] for row in ws.iter_rows()],
+                       sorted(str(r) for r in ws.merged_cells.ranges))
+            for ws in workbook.worksheets}
+
+
+def test_stream_writer_matches_to_excel(df, tmp_path):
+    """Tests the streamed workbook holds the cells and merged headers that
+    `DataFrame.to_excel` writes.
+    """
+    expected_fpath = tmp_path / 'expected.xlsx'
+    with pd.ExcelWriter(expected_fpath, engine='xlsxwriter') as writer:
+        df.to_excel(writer, sheet_name='sheet1')
+
+    fpath = write.df_to_xlsx(df, 'got', dir=str(tmp_path) + '/',
+                             sheet_name='sheet1')
+
+    assert read_sheets(fpath) == read_sheets(expected_fpath)
+
+
+def test_stream_writer_appends_rows(df, tmp_path):
+    """Tests appending a frame in parts writes the same workbook."""
+    whole, parts = tmp_path / 'whole.xlsx', tmp_path / 'parts.xlsx'
+    with write.XlsxStreamWriter(str(whole)) as writer:
+        writer.open_sheet('sheet1', df.columns).append(df)
+    with write.XlsxStreamWriter(str(parts)) as writer:
+        sheet = writer.open_sheet('sheet1', df.columns)
+        sheet.append(df.iloc[:1])
+        sheet.append(df.iloc[1:])
+
+    assert read_sheets(parts) == read_sheets(whole)
+
+
+def test_stream_writer_splits_wide_tables(df, tmp_path, monkeypatch):
+    """Tests tables wider than a worksheet continue on further worksheets,
+    keeping column groups whole.
+    """
+    monkeypatch.setattr(write, 'EXCEL_MAX_COLS', 5)
+    fpath = tmp_path / 'wide.xlsx'
+    with write.XlsxStreamWriter(str(fpath)) as writer:
+        writer.open_sheet('sheet1', df.columns).append(df)
+
+    sheets = read_sheets(fpath)
+    assert list(sheets) == ['sheet1', 'sheet1_2']
+    assert sheets['sheet1'][0][0] == [None, '10:30:00', None, 'OHLC', None]
+    assert sheets['sheet1_2'][0][0] == [None, '11:00:00_Close']
+    assert [row[1] for row in sheets['sheet1_2'][0][3:]] == \
+        [None, 1.22, 1.19]
+
+
+def test_check_xlsx_consistency(df, tmp_path):
+    """Tests outputs within the tolerance pass, and others raise when
+    strict.
+    """
+    benchmark = write.df_to_xlsx(df, 'benchmark', dir=str(tmp_path) + '/')
+    df = df.copy()
+    df[('OHLC', 'Open')] += 1e-6
+
+    lenient = write.check_xlsx_consistency(benchmark, atol=1e-5,
+                                           strict=True)(write.df_to_xlsx)
+    assert lenient(df, 'lenient', dir=str(tmp_path) + '/')
+
+    strict = write.check_xlsx_consistency(benchmark,
+                                          strict=True)(write.df_to_xlsx)
+    with pytest.raises(write.XlsxInconsistencyError):
+        strict(df, 'strict', dir=str(tmp_path) + '/')